@@ -8,9 +8,15 @@ import threading
 import time
 import os
 from typing import Optional
-import winsound
 from config import *
 
+try:
+    import winsound
+    WINSOUND_AVAILABLE = True
+except ImportError:
+    # 非Windows平台（如运行基准测试时）没有winsound
+    WINSOUND_AVAILABLE = False
+
 
 class AudioManager:
     """声音管理器"""
@@ -159,6 +165,9 @@ class AudioManager:
 
     def play_system_beep(self):
         """播放系统蜂鸣声"""
+        if not WINSOUND_AVAILABLE:
+            return
+
         try:
             # Windows系统声音
             winsound.MessageBeep(winsound.MB_ICONEXCLAMATION)
@@ -0,0 +1,546 @@
+# -*- coding: utf-8 -*-
+"""
+MySoloKeeper 热点路径基准测试
+使用固定的合成输入和录制的模型响应测量关键路径耗时，并与基线比较
+
+运行前先用模拟窗口后端做行为检查，检查失败时不运行基准测试
+
+用法:
+    python benchmark.py                    # 运行并与基线比较，出现回归时返回非零退出码
+    python benchmark.py --save-baseline    # 运行并把结果保存为新基线
+    python benchmark.py --only pose        # 只运行名称包含 pose 的用例
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+from types import SimpleNamespace
+
+# 基准测试不需要真正发声
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+
+from config import *
+
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_TOLERANCE = 1.5  # 超过基线耗时的倍数即视为回归
+CONFIRM_RUNS = 2  # 疑似回归时的复测次数，排除偶发的系统抖动
+RANDOM_SEED = 20240601
+
+# 录制的 SmolVLM 响应样本（覆盖 JSON、代码块、单对象、纯文本和空结果）
+RECORDED_RESPONSES = [
+    '{"humans": [{"x": 212, "y": 88, "width": 198, "height": 356}]}',
+    '```json\n{"humans": [{"x": 40, "y": 120, "width": 160, "height": 300}, '
+    '{"x": 380, "y": 100, "width": 170, "height": 330}]}\n```',
+    '{"humans": []}',
+    'The person is at {"x": 150, "y": 60, "width": 220, "height": 400} in the image.',
+    'x: 100, y: 80, width: 200, height: 320',
+    'There is no human in this image.',
+    '{"faces": [{"x": 260, "y": 90, "width": 120, "height": 150}]}',
+    '{"humans": [{"x": 600, "y": 10, "width": 300, "height": 500}, {"x": "a", "y": 0, "width": 1, "height": 1}]}',
+]
+
+
+def make_synthetic_frame(width: int = CAMERA_WIDTH, height: int = CAMERA_HEIGHT) -> np.ndarray:
+    """生成固定的合成BGR帧（渐变背景 + 噪声 + 人形色块）"""
+    rng = np.random.default_rng(RANDOM_SEED)
+    gradient = np.linspace(40, 200, width, dtype=np.float32)
+    frame = np.empty((height, width, 3), dtype=np.float32)
+    frame[:] = gradient[np.newaxis, :, np.newaxis]
+    frame += rng.normal(0, 12, size=frame.shape)
+
+    # 模拟一个坐在画面中间的人
+    frame[height // 5:height - 20, width // 3:width // 3 + width // 4] = (60, 90, 150)
+    frame[height // 10:height // 4, width // 3 + width // 16:width // 3 + width // 6] = (120, 160, 210)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def make_synthetic_landmarks(seed: int = RANDOM_SEED):
+    """生成固定的33个姿态关键点（结构与MediaPipe结果一致）"""
+    rng = np.random.default_rng(seed)
+    points = []
+    for i in range(33):
+        points.append(SimpleNamespace(
+            x=float(rng.uniform(0.3, 0.7)),
+            y=float(rng.uniform(0.1, 0.95)),
+            z=float(rng.uniform(-0.5, 0.5)),
+            visibility=float(0.9 if i < 25 else rng.uniform(0.0, 0.6))
+        ))
+    return SimpleNamespace(landmark=points)
+
+
+def make_synthetic_boxes(count: int, seed: int = RANDOM_SEED) -> list:
+    """生成固定的人类检测结果"""
+    from detection import Detection
+    rng = np.random.default_rng(seed)
+    boxes = []
+    for _ in range(count):
+        width = int(rng.integers(60, 200))
+        height = int(rng.integers(100, 300))
+        x = int(rng.integers(0, CAMERA_WIDTH - width))
+        y = int(rng.integers(0, CAMERA_HEIGHT - height))
+        boxes.append(Detection.from_pixels(x, y, width, height, CAMERA_WIDTH, CAMERA_HEIGHT,
+                                           confidence=float(rng.uniform(0.4, 0.95))))
+    return boxes
+
+
+_shared = {}
+
+
+def _camera_handler():
+    """共享一个摄像头处理器，避免重复初始化MediaPipe"""
+    if 'camera_handler' not in _shared:
+        from camera_handler import CameraHandler
+        handler = CameraHandler()
+        handler.current_frame = make_synthetic_frame()
+        _shared['camera_handler'] = handler
+    return _shared['camera_handler']
+
+
+# ---------------------------------------------------------------------------
+# 基准测试用例：每个 setup 函数返回一个无参可调用对象
+# ---------------------------------------------------------------------------
+
+def setup_capture_frame_as_jpeg():
+    handler = _camera_handler()
+    return lambda: handler.capture_frame_as_jpeg()
+
+
+def setup_base64_payload():
+    from smolvlm_client import SmolVLMClient
+    client = SmolVLMClient()
+    frame_data = _camera_handler().capture_frame_as_jpeg()
+
+    def run():
+        width, height = client.get_image_dimensions_from_data(frame_data)
+        client.encode_image_to_base64(frame_data)
+
+    return run
+
+
+def setup_parse_response():
+    from coordinate_processor import CoordinateProcessor
+    processor = CoordinateProcessor(CAMERA_WIDTH, CAMERA_HEIGHT)
+
+    def run():
+        for response in RECORDED_RESPONSES:
+            processor.parse_human_activity_response(response)
+
+    return run
+
+
+def setup_process_humans():
+    from coordinate_processor import CoordinateProcessor
+    processor = CoordinateProcessor(CAMERA_WIDTH, CAMERA_HEIGHT)
+
+    def run():
+        processor.reset()
+        for response in RECORDED_RESPONSES:
+            processor.process_humans(response)
+
+    return run
+
+
+def setup_smooth_many_boxes():
+    from coordinate_processor import CoordinateProcessor
+    processor = CoordinateProcessor(CAMERA_WIDTH, CAMERA_HEIGHT)
+    previous = make_synthetic_boxes(50, seed=1)
+    current = make_synthetic_boxes(50, seed=2)
+
+    def run():
+        processor.reset()
+        processor.previous_humans = list(previous)
+        processor.smooth_human_coordinates(current)
+
+    return run
+
+
+def setup_landmarks_to_array():
+    from pose_processing import landmarks_to_array
+    landmarks = make_synthetic_landmarks()
+    return lambda: landmarks_to_array(landmarks)
+
+
+def setup_pose_detection():
+    from detectors import pose_detection
+    from pose_processing import landmarks_to_array
+    landmark_array = landmarks_to_array(make_synthetic_landmarks())
+    frame_shape = (CAMERA_HEIGHT, CAMERA_WIDTH, 3)
+    return lambda: pose_detection(landmark_array, frame_shape, MEDIAPIPE_ONLY_MIN_POSE_LANDMARKS)
+
+
+def setup_pose_presence():
+    from detection_strategies import calculate_pose_presence_batch
+    from pose_processing import landmarks_to_array
+    landmarks = make_synthetic_landmarks()
+    pose_data = {'landmarks': landmarks, 'landmark_array': landmarks_to_array(landmarks)}
+    boxes = make_synthetic_boxes(10)
+    frame_shape = (CAMERA_HEIGHT, CAMERA_WIDTH, 3)
+    return lambda: calculate_pose_presence_batch(boxes, pose_data, frame_shape)
+
+
+def _setup_compose(blur_level: float, same_frame: bool = False):
+    from display_compositor import DisplayCompositor
+    import detection_strategies  # 导入时注册检测模式（合成器按模式决定绘制方式）
+    compositor = DisplayCompositor(_camera_handler())
+    # 合成器会缓存同一帧的背景，默认交替使用两帧以测量每帧都重新计算的情况
+    frames = [make_synthetic_frame()] if same_frame else [make_synthetic_frame(), make_synthetic_frame()]
+    humans = make_synthetic_boxes(3)
+    faces = make_synthetic_boxes(2, seed=3)
+    counter = itertools.count()
+
+    def run():
+        frame = frames[next(counter) % len(frames)]
+        compositor.compose(frame, "HYBRID", blur_level, humans, faces, None)
+
+    return run
+
+
+def setup_compose_no_blur():
+    return _setup_compose(0.0)
+
+
+def setup_compose_max_blur():
+    return _setup_compose(CAMERA_BLUR_MAX)
+
+
+def setup_compose_blur_cached():
+    return _setup_compose(CAMERA_BLUR_MAX, same_frame=True)
+
+
+def setup_process_list():
+    import psutil
+    from process_manager import ProcessManager
+    from window_backend import FakeWindowBackend
+
+    # 合成的桌面：部分真实进程各有几个窗口，另有大量属于其他进程的窗口
+    backend = FakeWindowBackend()
+    for index, pid in enumerate(psutil.pids()[:30]):
+        for window in range(3):
+            backend.add_window(pid, f"窗口 {index}-{window}")
+    for index in range(500):
+        backend.add_window(10_000_000 + index, f"后台窗口 {index}")
+
+    manager = ProcessManager(window_backend=backend)
+    return lambda: manager.get_running_processes()
+
+
+def setup_minimize_windows():
+    import os
+    from process_manager import ProcessManager
+    from window_backend import FakeWindowBackend
+
+    # 目标进程有 8 个窗口，每个窗口处理最小化请求模拟需要 5 ms
+    backend = FakeWindowBackend(minimize_delay=0.005)
+    pid = os.getpid()
+    handles = [backend.add_window(pid, f"窗口 {index}") for index in range(8)]
+    manager = ProcessManager(window_backend=backend)
+
+    # 直接测量最小化一组窗口的耗时（不包含查找窗口和控制台输出）
+    def minimize():
+        for hwnd in handles:
+            backend.restore(hwnd)
+        manager._minimize_handles(handles)
+
+    # 正常响应的窗口应在等待时间内完成最小化，不应走强制最小化
+    fallbacks = manager.perf_monitor.get_counter("minimize_fallbacks")
+    minimize()
+    assert manager.perf_monitor.get_counter("minimize_fallbacks") == fallbacks, "响应正常的窗口被强制最小化"
+    return minimize
+
+
+def setup_create_beep_sound():
+    from audio_manager import AudioManager
+    manager = AudioManager()
+    return lambda: manager.create_beep_sound()
+
+
+# ---------------------------------------------------------------------------
+# 行为检查：用模拟窗口后端验证窗口逻辑，在基准测试之前运行
+# ---------------------------------------------------------------------------
+
+def check_single_enumeration():
+    import psutil
+    from process_manager import ProcessManager
+    from window_backend import FakeWindowBackend
+
+    backend = FakeWindowBackend()
+    for index, pid in enumerate(psutil.pids()[:5]):
+        backend.add_window(pid, f"窗口 {index}")
+    backend.add_window(10_000_000, "后台窗口")
+
+    manager = ProcessManager(window_backend=backend)
+    manager.get_running_processes()
+    assert backend.enum_count == 1, f"获取进程列表枚举了 {backend.enum_count} 次窗口"
+
+
+def check_window_index():
+    import os
+    from process_manager import ProcessManager
+    from window_backend import FakeWindowBackend
+
+    backend = FakeWindowBackend()
+    pid = os.getpid()
+    first = backend.add_window(pid, "窗口 1")
+    second = backend.add_window(pid, "窗口 2")
+    manager = ProcessManager(window_backend=backend)
+    manager.add_monitored_process(pid, "check")
+
+    # 索引中的句柄都有效时直接使用，不枚举窗口
+    enum_count = backend.enum_count
+    assert manager._get_valid_window_handles(pid) == [first, second], "索引中的句柄不正确"
+    assert backend.enum_count == enum_count, "索引有效时仍然枚举了窗口"
+
+    # 关闭一个窗口、打开一个新窗口：失效的句柄触发一次重建，新窗口被加入索引
+    rebuilds = manager.perf_monitor.get_counter("window_index_rebuilds")
+    backend.close_window(first)
+    third = backend.add_window(pid, "窗口 3")
+    assert manager._get_valid_window_handles(pid) == [second, third], "重建后的索引不正确"
+    assert manager.perf_monitor.get_counter("window_index_rebuilds") == rebuilds + 1, "句柄失效时没有重建索引"
+    assert backend.enum_count == enum_count + 1, "重建索引枚举了不止一次窗口"
+
+    # 移除监控后，用旧的枚举结果刷新索引不会把进程重新加入
+    window_map = manager.build_window_map()
+    manager.remove_monitored_process(pid)
+    manager._update_window_index_from_map(window_map, [pid])
+    assert pid not in manager.window_index, "已移除的进程被重新加入索引"
+
+
+def check_monitored_minimize():
+    import os
+    from process_manager import ProcessManager
+    from window_backend import FakeWindowBackend
+
+    backend = FakeWindowBackend()
+    pids = [os.getpid(), os.getppid()]
+    handles = {pid: [backend.add_window(pid, f"窗口 {pid}-{index}") for index in range(2)] for pid in pids}
+    manager = ProcessManager(window_backend=backend)
+    for pid in pids:
+        manager.add_monitored_process(pid, "check")
+
+    # 两个进程各有一个句柄失效：所有进程统一重建一次索引
+    for pid in pids:
+        backend.close_window(handles[pid][0])
+    enum_count = backend.enum_count
+    assert manager.minimize_monitored_processes() == len(pids), "没有最小化所有被监控的进程"
+    assert backend.enum_count == enum_count + 1, f"最小化时枚举了 {backend.enum_count - enum_count} 次窗口"
+    assert all(backend.is_minimized(handles[pid][1]) for pid in pids), "仍有窗口未最小化"
+
+
+def check_minimize_fallbacks():
+    import os
+    from process_manager import ProcessManager
+    from window_backend import FakeWindowBackend
+
+    backend = FakeWindowBackend(minimize_delay=0.005)
+    pid = os.getpid()
+    responsive = [backend.add_window(pid, f"窗口 {index}") for index in range(4)]
+    hung = [backend.add_window(pid, f"无响应窗口 {index}", responsive=False) for index in range(2)]
+    minimized = backend.add_window(pid, "已最小化窗口", minimized=True)
+    handles = responsive + hung + [minimized]
+    manager = ProcessManager(window_backend=backend)
+
+    # 只有无响应的窗口走强制最小化；原本已最小化的窗口也计为成功
+    fallbacks = manager.perf_monitor.get_counter("minimize_fallbacks")
+    assert manager._minimize_handles(handles) == len(handles), "最小化的窗口数不正确"
+    assert manager.perf_monitor.get_counter("minimize_fallbacks") == fallbacks + len(hung), "强制最小化计数不正确"
+    assert all(backend.is_minimized(hwnd) for hwnd in handles), "仍有窗口未最小化"
+
+
+# (名称, 检查函数)
+CHECKS = [
+    ("process.single_enumeration", check_single_enumeration),
+    ("process.window_index", check_window_index),
+    ("process.monitored_minimize", check_monitored_minimize),
+    ("process.minimize_fallbacks", check_minimize_fallbacks),
+]
+
+
+def run_checks(only: str = None) -> list:
+    """运行行为检查，返回失败的检查列表"""
+    failures = []
+    for name, check in CHECKS:
+        if only and only not in name:
+            continue
+
+        try:
+            # 被检查的代码会打印日志，只在失败时显示
+            with contextlib.redirect_stdout(io.StringIO()):
+                check()
+        except ImportError as e:
+            print(f"- 跳过 {name}: 缺少依赖 ({e})")
+            continue
+        except AssertionError as e:
+            failures.append(name)
+            print(f"  {name:<32} 失败: {e}")
+            continue
+        print(f"  {name:<32} 通过")
+
+    return failures
+
+
+# (名称, setup函数, 每轮调用次数)
+BENCHMARKS = [
+    ("camera.capture_frame_as_jpeg", setup_capture_frame_as_jpeg, 50),
+    ("smolvlm.base64_payload", setup_base64_payload, 50),
+    ("coordinate.parse_response", setup_parse_response, 200),
+    ("coordinate.process_humans", setup_process_humans, 200),
+    ("coordinate.smooth_50_boxes", setup_smooth_many_boxes, 20),
+    ("pose.landmarks_to_array", setup_landmarks_to_array, 500),
+    ("detectors.pose_detection", setup_pose_detection, 500),
+    ("strategies.pose_presence_10", setup_pose_presence, 200),
+    ("display.compose_no_blur", setup_compose_no_blur, 20),
+    ("display.compose_max_blur", setup_compose_max_blur, 10),
+    ("display.compose_blur_cached", setup_compose_blur_cached, 20),
+    ("process.list_530_windows", setup_process_list, 5),
+    ("process.minimize_8_windows", setup_minimize_windows, 5),
+    ("audio.create_beep_sound", setup_create_beep_sound, 2),
+]
+
+
+def time_callable(func, number: int, repeat: int, min_round_time: float = 0.05) -> float:
+    """返回多轮测量中每次调用的最短耗时（秒），最短值受系统噪声影响最小"""
+    func()  # 预热
+
+    # 保证每轮至少运行 min_round_time 秒，降低计时误差
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    elapsed = time.perf_counter() - start
+    if 0 < elapsed < min_round_time:
+        number = int(number * min_round_time / elapsed) + 1
+
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - start) / number)
+    return min(rounds)
+
+
+def machine_info() -> dict:
+    """记录运行环境，基线只在相同环境下可比"""
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'python': platform.python_version(),
+        'numpy': np.__version__
+    }
+
+
+def load_baseline(path: str) -> dict:
+    """加载基线文件"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def run_benchmarks(only: str = None, repeat: int = 7) -> tuple:
+    """运行所有基准测试，返回 ({名称: 秒}, {名称: (可调用对象, 调用次数)})"""
+    results = {}
+    cases = {}
+    for name, setup, number in BENCHMARKS:
+        if only and only not in name:
+            continue
+
+        try:
+            func = setup()
+        except ImportError as e:
+            print(f"- 跳过 {name}: 缺少依赖 ({e})")
+            continue
+
+        seconds = time_callable(func, number, repeat)
+        results[name] = seconds
+        cases[name] = (func, number)
+        print(f"  {name:<32} {seconds * 1000:10.3f} ms")
+
+    return results, cases
+
+
+def compare_with_baseline(results: dict, cases: dict, baseline: dict,
+                          tolerance: float, repeat: int = 7) -> list:
+    """与基线比较，疑似回归的用例会复测确认，返回回归的用例列表"""
+    regressions = []
+    baseline_results = baseline.get('results', {})
+
+    print(f"\n与基线比较（容差 {tolerance:.2f}x）:")
+    for name, seconds in results.items():
+        if name not in baseline_results:
+            print(f"  {name:<32} 无基线")
+            continue
+
+        reference = baseline_results[name]
+        func, number = cases[name]
+        for _ in range(CONFIRM_RUNS):
+            if reference <= 0 or seconds <= reference * tolerance:
+                break
+            seconds = min(seconds, time_callable(func, number, repeat))
+
+        ratio = seconds / reference if reference > 0 else float('inf')
+        status = "回归" if ratio > tolerance else "正常"
+        print(f"  {name:<32} {ratio:6.2f}x  {status}")
+        if ratio > tolerance:
+            regressions.append(name)
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MySoloKeeper 热点路径基准测试")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="基线文件路径")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="回归判定倍数")
+    parser.add_argument("--only", default=None, help="只运行名称包含该字符串的用例")
+    parser.add_argument("--repeat", type=int, default=7, help="每个用例的测量轮数")
+    args = parser.parse_args()
+
+    print("运行行为检查...")
+    failures = run_checks(args.only)
+    if failures:
+        print(f"\n行为检查失败: {', '.join(failures)}")
+        return 1
+
+    print("\n运行基准测试...")
+    results, cases = run_benchmarks(args.only, args.repeat)
+
+    if args.save_baseline:
+        baseline = load_baseline(args.baseline)
+        merged = baseline.get('results', {}) if args.only else {}
+        merged.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'machine': machine_info(), 'results': merged}, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\n基线已保存到 {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print(f"\n未找到基线文件 {args.baseline}，请先运行 --save-baseline")
+        return 0
+
+    if baseline.get('machine') != machine_info():
+        print("\n注意: 基线来自不同的运行环境，比较结果仅供参考")
+        print(f"  基线环境: {baseline.get('machine')}")
+        print(f"  当前环境: {machine_info()}")
+
+    regressions = compare_with_baseline(results, cases, baseline, args.tolerance, args.repeat)
+    if regressions:
+        print(f"\n性能回归: {', '.join(regressions)}")
+        return 1
+
+    print("\n未发现性能回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
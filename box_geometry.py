@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+检测框几何运算模块
+所有函数都以 (N, 4) 数组 [x, y, width, height] 表示一组检测框
+"""
+
+import numpy as np
+from typing import List, Tuple
+
+
+def box_areas(boxes: np.ndarray) -> np.ndarray:
+    """计算每个检测框的面积"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return boxes[:, 2] * boxes[:, 3]
+
+
+def intersection_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """计算两组检测框两两之间的相交面积 (N, M)"""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+
+    left = np.maximum(a[:, np.newaxis, 0], b[np.newaxis, :, 0])
+    top = np.maximum(a[:, np.newaxis, 1], b[np.newaxis, :, 1])
+    right = np.minimum((a[:, 0] + a[:, 2])[:, np.newaxis], (b[:, 0] + b[:, 2])[np.newaxis, :])
+    bottom = np.minimum((a[:, 1] + a[:, 3])[:, np.newaxis], (b[:, 1] + b[:, 3])[np.newaxis, :])
+
+    return np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """逐元素相除，分母为0时结果为0"""
+    result = np.zeros_like(numerator, dtype=np.float64)
+    np.divide(numerator, denominator, out=result, where=denominator > 0)
+    return result
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """计算两组检测框两两之间的交并比 (N, M)"""
+    intersection = intersection_matrix(boxes_a, boxes_b)
+    union = box_areas(boxes_a)[:, np.newaxis] + box_areas(boxes_b)[np.newaxis, :] - intersection
+    return _safe_divide(intersection, union)
+
+
+def overlap_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """计算 boxes_b 中每个框被 boxes_a 覆盖的比例 (N, M)，即 相交面积 / b的面积"""
+    intersection = intersection_matrix(boxes_a, boxes_b)
+    areas_b = np.broadcast_to(box_areas(boxes_b)[np.newaxis, :], intersection.shape)
+    return _safe_divide(intersection, areas_b)
+
+
+def containment_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """计算相交面积占较小框面积的比例 (N, M)，用于发现嵌套的检测框（如人脸框在姿态框内）"""
+    intersection = intersection_matrix(boxes_a, boxes_b)
+    smaller = np.minimum(box_areas(boxes_a)[:, np.newaxis], box_areas(boxes_b)[np.newaxis, :])
+    return _safe_divide(intersection, smaller)
+
+
+def similarity_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray,
+                      canvas_width: float, canvas_height: float) -> np.ndarray:
+    """计算两组检测框两两之间的相似度 (N, M)，综合中心点距离（权重0.7）和面积比（权重0.3）"""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+
+    # 中心点距离：分别计算 dx、dy 再用 hypot，比 linalg.norm 少一次中间数组
+    dx = (a[:, 0] + a[:, 2] / 2)[:, np.newaxis] - (b[:, 0] + b[:, 2] / 2)[np.newaxis, :]
+    dy = (a[:, 1] + a[:, 3] / 2)[:, np.newaxis] - (b[:, 1] + b[:, 3] / 2)[np.newaxis, :]
+    normalized_distance = 1 - np.hypot(dx, dy) / np.hypot(canvas_width, canvas_height)
+
+    areas_a = (a[:, 2] * a[:, 3])[:, np.newaxis]
+    areas_b = (b[:, 2] * b[:, 3])[np.newaxis, :]
+    area_ratio = _safe_divide(np.minimum(areas_a, areas_b), np.maximum(areas_a, areas_b))
+
+    return normalized_distance * 0.7 + area_ratio * 0.3
+
+
+def clip_boxes(boxes: np.ndarray, width: float, height: float) -> np.ndarray:
+    """将检测框裁剪到画面 [0, width] x [0, height] 范围内"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    x1 = np.clip(boxes[:, 0], 0, width)
+    y1 = np.clip(boxes[:, 1], 0, height)
+    x2 = np.clip(boxes[:, 0] + boxes[:, 2], 0, width)
+    y2 = np.clip(boxes[:, 1] + boxes[:, 3], 0, height)
+    return np.stack([x1, y1, x2 - x1, y2 - y1], axis=1)
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, threshold: float,
+                        metric: str = "iou") -> List[int]:
+    """非极大值抑制，返回保留的检测框索引（按分数从高到低）
+
+    metric 为 "iou" 时使用交并比；为 "containment" 时使用相交面积占较小框的比例，
+    可以合并同一个人的嵌套框（人脸框与姿态框）。
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+    if len(boxes) == 0:
+        return []
+
+    if metric == "iou":
+        pairwise = iou_matrix(boxes, boxes)
+    elif metric == "containment":
+        pairwise = containment_matrix(boxes, boxes)
+    else:
+        raise ValueError(f"未知的NMS度量: {metric}")
+
+    order = np.argsort(-scores, kind="stable")
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    keep = []
+
+    for index in order:
+        if suppressed[index]:
+            continue
+        keep.append(int(index))
+        suppressed |= pairwise[index] > threshold
+
+    return keep
+
+
+def greedy_assignment(scores: np.ndarray, threshold: float) -> List[Tuple[int, int]]:
+    """按分数从高到低贪心求解一对一匹配，返回 (行索引, 列索引) 列表
+
+    只考虑分数大于阈值的配对；每一行、每一列最多被匹配一次，
+    避免多个当前检测框同时匹配到同一个历史检测框。
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    if scores.ndim != 2 or scores.size == 0:
+        return []
+
+    rows, cols = np.nonzero(scores > threshold)
+    order = np.argsort(-scores[rows, cols], kind="stable")
+    max_pairs = min(scores.shape)
+    used_rows = np.zeros(scores.shape[0], dtype=bool)
+    used_cols = np.zeros(scores.shape[1], dtype=bool)
+    pairs = []
+
+    for index in order:
+        row, col = rows[index], cols[index]
+        if used_rows[row] or used_cols[col]:
+            continue
+        used_rows[row] = True
+        used_cols[col] = True
+        pairs.append((int(row), int(col)))
+        if len(pairs) == max_pairs:
+            break
+
+    return pairs
@@ -7,8 +7,13 @@ import cv2
 import numpy as np
 import threading
 import time
-from typing import Optional, Callable, Tuple
+from typing import Optional, Callable, Tuple, List
 from config import *
+from performance_monitor import perf_monitor
+from pose_processing import landmarks_to_array
+from box_geometry import clip_boxes
+from detection import Detection, DetectionSource
+from frame_pyramid import FramePyramid, as_pyramid, as_bgr
 
 # 尝试导入MediaPipe，如果失败则禁用相关功能
 try:
@@ -28,8 +33,11 @@ class CameraHandler:
         self.cap = None
         self.is_running = False
         self.current_frame = None
+        self.current_pyramid = None  # 当前帧的预处理缓存，检测线程和显示线程共享
+        self.frame_seq = 0  # 帧序号，每捕获一帧递增
         self.frame_lock = threading.Lock()
         self.capture_thread = None
+        self.perf_monitor = perf_monitor
 
         # MediaPipe 检测器
         self.face_detection = None
@@ -133,14 +141,22 @@ class CameraHandler:
             try:
                 ret, frame = self.cap.read()
                 if ret:
+                    frame = frame.copy()
+                    frame.flags.writeable = False  # 各线程共享同一帧，不允许原地修改
                     with self.frame_lock:
-                        self.current_frame = frame.copy()
+                        self.current_frame = frame
+                        self.frame_seq += 1
+                        self.current_pyramid = FramePyramid(frame, self.frame_seq)
+                    self.perf_monitor.tick("capture")
+                    self.perf_monitor.increment("frames_captured")
                 else:
                     print("读取摄像头帧失败")
+                    self.perf_monitor.increment("dropped_frames")
                     time.sleep(0.1)
 
             except Exception as e:
                 print(f"摄像头捕获循环错误: {e}")
+                self.perf_monitor.increment("errors", labels={'component': 'camera'})
                 time.sleep(0.1)
 
     def get_current_frame(self) -> Optional[np.ndarray]:
@@ -148,16 +164,27 @@ class CameraHandler:
         with self.frame_lock:
             return self.current_frame.copy() if self.current_frame is not None else None
 
+    def get_current_pyramid(self) -> Optional[FramePyramid]:
+        """获取当前帧的预处理缓存（不复制，图像为只读），帧序号为 pyramid.seq"""
+        with self.frame_lock:
+            return self.current_pyramid
+
     def capture_frame_as_jpeg(self, quality: int = 80) -> Optional[bytes]:
         """捕获当前帧并编码为JPEG格式"""
         frame = self.get_current_frame()
         if frame is None:
             return None
 
+        return self.encode_frame_as_jpeg(frame, quality)
+
+    def encode_frame_as_jpeg(self, frame, quality: int = 80, downscale: int = 1) -> Optional[bytes]:
+        """将指定帧（或裁剪区域）编码为JPEG格式，downscale 为缩小倍数（1、2、4）"""
         try:
+            image = as_pyramid(frame).scaled(downscale) if downscale > 1 else as_bgr(frame)
+
             # 编码为JPEG
             encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
-            result, encoded_img = cv2.imencode('.jpg', frame, encode_param)
+            result, encoded_img = cv2.imencode('.jpg', image, encode_param)
 
             if result:
                 return encoded_img.tobytes()
@@ -169,67 +196,65 @@ class CameraHandler:
             print(f"帧编码错误: {e}")
             return None
 
-    def detect_faces_with_mediapipe(self, frame: np.ndarray) -> list:
-        """使用MediaPipe检测人脸"""
+    def detect_faces_with_mediapipe(self, frame) -> List[Detection]:
+        """使用MediaPipe检测人脸，返回归一化坐标的检测结果；frame 可以是BGR图像或 FramePyramid"""
         if not self.face_detection:
             return []
 
         try:
-            # 转换BGR到RGB
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = self.face_detection.process(rgb_frame)
+            # RGB图像取自帧预处理缓存，同一帧只转换一次
+            rgb_frame = as_pyramid(frame).rgb()
+            with self.perf_monitor.measure("mediapipe_face"):
+                results = self.face_detection.process(rgb_frame)
 
             faces = []
             if results.detections:
-                h, w, _ = frame.shape
-                for detection in results.detections:
-                    bbox = detection.location_data.relative_bounding_box
-
-                    # 转换相对坐标到绝对坐标
-                    x = int(bbox.xmin * w)
-                    y = int(bbox.ymin * h)
-                    width = int(bbox.width * w)
-                    height = int(bbox.height * h)
-
-                    # 确保坐标在有效范围内
-                    x = max(0, x)
-                    y = max(0, y)
-                    width = min(width, w - x)
-                    height = min(height, h - y)
+                relative_boxes = [
+                    [bbox.xmin, bbox.ymin, bbox.width, bbox.height]
+                    for bbox in (detection.location_data.relative_bounding_box
+                                 for detection in results.detections)
+                ]
 
+                # MediaPipe直接给出相对坐标，只需裁剪到画面范围内
+                boxes = clip_boxes(relative_boxes, 1.0, 1.0)
+
+                for (x, y, width, height), detection in zip(boxes.tolist(), results.detections):
                     if width > 0 and height > 0:
-                        faces.append({
-                            'x': x,
-                            'y': y,
-                            'width': width,
-                            'height': height,
-                            'confidence': detection.score[0]
-                        })
+                        faces.append(Detection(
+                            x, y, width, height,
+                            confidence=detection.score[0],
+                            source=DetectionSource.MEDIAPIPE_FACE
+                        ))
 
             return faces
 
         except Exception as e:
             print(f"MediaPipe人脸检测错误: {e}")
+            self.perf_monitor.increment("errors", labels={'component': 'mediapipe_face'})
             return []
 
-    def detect_pose_with_mediapipe(self, frame: np.ndarray) -> dict:
-        """使用MediaPipe检测人体姿态"""
+    def detect_pose_with_mediapipe(self, frame) -> dict:
+        """使用MediaPipe检测人体姿态；frame 可以是BGR图像或 FramePyramid"""
         if not self.pose_detection:
             return {}
 
         try:
-            # 转换BGR到RGB
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = self.pose_detection.process(rgb_frame)
+            # RGB图像取自帧预处理缓存，同一帧只转换一次
+            rgb_frame = as_pyramid(frame).rgb()
+            with self.perf_monitor.measure("mediapipe_pose"):
+                results = self.pose_detection.process(rgb_frame)
 
             pose_data = {
                 'landmarks': None,
+                'landmark_array': None,  # (33, 4) float32: x, y, z, visibility
                 'world_landmarks': None,
                 'segmentation_mask': None
             }
 
             if results.pose_landmarks:
                 pose_data['landmarks'] = results.pose_landmarks
+                # 只转换一次，后续的可见度统计、边界框和框内比例都基于该数组
+                pose_data['landmark_array'] = landmarks_to_array(results.pose_landmarks)
 
             if results.pose_world_landmarks:
                 pose_data['world_landmarks'] = results.pose_world_landmarks
@@ -241,39 +266,66 @@ class CameraHandler:
 
         except Exception as e:
             print(f"MediaPipe姿态检测错误: {e}")
+            self.perf_monitor.increment("errors", labels={'component': 'mediapipe_pose'})
             return {}
 
-    def draw_face_boxes(self, frame: np.ndarray, faces: list,
+    def draw_face_boxes(self, frame: np.ndarray, faces: List[Detection],
                        color: Tuple[int, int, int] = (0, 0, 255),
-                       thickness: int = 2) -> np.ndarray:
-        """在帧上绘制人脸框"""
+                       thickness: int = 2, in_place: bool = False) -> np.ndarray:
+        """在帧上绘制检测框，检测结果坐标按当前帧尺寸换算；in_place 为True时直接在传入的帧上绘制"""
         if not faces:
             return frame
 
-        result_frame = frame.copy()
+        result_frame = frame if in_place else frame.copy()
+        frame_height, frame_width = frame.shape[:2]
 
         for face in faces:
             try:
-                x = int(face['x'])
-                y = int(face['y'])
-                width = int(face['width'])
-                height = int(face['height'])
+                x, y, width, height = face.to_pixels(frame_width, frame_height)
 
                 # 绘制矩形框
                 cv2.rectangle(result_frame, (x, y), (x + width, y + height), color, thickness)
 
                 # 如果有置信度信息，显示它
-                if 'confidence' in face:
-                    confidence_text = f"{face['confidence']:.2f}"
+                if face.confidence is not None:
+                    confidence_text = f"{face.confidence:.2f}"
                     cv2.putText(result_frame, confidence_text, (x, y - 10),
                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
 
-            except (KeyError, ValueError, TypeError) as e:
+            except (AttributeError, ValueError, TypeError) as e:
                 print(f"绘制人脸框错误: {e}")
                 continue
 
         return result_frame
 
+    def draw_performance_hud(self, frame: np.ndarray, lines: list) -> np.ndarray:
+        """在帧左上角绘制性能信息叠加层（原地绘制）"""
+        if not lines:
+            return frame
+
+        try:
+            font = cv2.FONT_HERSHEY_SIMPLEX
+            font_scale = 0.4
+            line_height = 14
+            padding = 4
+
+            text_width = max(cv2.getTextSize(line, font, font_scale, 1)[0][0] for line in lines)
+            box_width = min(frame.shape[1], text_width + padding * 2)
+            box_height = min(frame.shape[0], line_height * len(lines) + padding * 2)
+
+            # 半透明背景，保证文字在任意画面上可读
+            region = frame[:box_height, :box_width]
+            region[:] = (region * 0.4).astype(region.dtype)
+
+            for i, line in enumerate(lines):
+                y = padding + line_height * (i + 1) - 3
+                cv2.putText(frame, line, (padding, y), font, font_scale, (255, 255, 255), 1, cv2.LINE_AA)
+
+        except Exception as e:
+            print(f"绘制性能信息错误: {e}")
+
+        return frame
+
     def draw_pose_landmarks(self, frame: np.ndarray, pose_data: dict) -> np.ndarray:
         """在帧上绘制人体姿态骨骼"""
         if not pose_data or not pose_data.get('landmarks'):
@@ -13,6 +13,7 @@ GITHUB_URL = "https://github.com/RusianHu/MySoloKeeper"
 # SmolVLM API 配置
 SMOLVLM_BASE_URL = "http://localhost:8080"
 SMOLVLM_ENDPOINT = "/v1/chat/completions"
+SMOLVLM_IMAGE_DOWNSCALE = 1  # 发送给SmolVLM前将画面缩小的倍数（1、2、4），缩小后编码和推理更快
 
 # 摄像头配置
 CAMERA_WIDTH = 640
@@ -40,19 +41,50 @@ COORDINATE REQUIREMENTS:
 
 If no human activity is detected, return {{"humans": []}}. DO NOT describe the image. DO NOT add any other text. ONLY return the JSON. NEVER make up coordinates if you don't see any human activity."""
 
+# 候选区域确认提示词：只需回答是否有人，不需要坐标，输出很短
+HUMAN_CONFIRMATION_PROMPT = """Does this image show a real human (face or body)? Answer ONLY with JSON: {"human": true} or {"human": false}. DO NOT add any other text."""
+
 # 坐标处理配置
 MIN_HUMAN_SIZE = 30  # 最小人类检测尺寸（像素）
 MAX_HUMAN_SIZE_RATIO = 0.95  # 最大人类检测尺寸比例
 HUMAN_ASPECT_RATIO_MIN = 0.3  # 人类宽高比最小值
 HUMAN_ASPECT_RATIO_MAX = 3.0  # 人类宽高比最大值
-SMOOTHING_WEIGHT = 0.3  # 坐标平滑权重
+SMOOTHING_TIME_CONSTANT = 2.8  # 坐标平滑时间常数（秒），检测间隔为1秒时当前帧权重约为0.3
 SIMILARITY_THRESHOLD = 0.7  # 人类相似度阈值
-MAX_NO_HUMAN_COUNT = 3  # 连续无人类检测次数阈值
+NO_HUMAN_HOLD_TIME = 3.0  # 未检测到人类时继续保留上一次检测框的时间（秒）
+
+# 多目标跟踪配置（坐标为归一化值，时间单位为秒）
+TRACKER_ENABLED = True  # 预览画面显示跟踪器预测的检测框，两次检测之间平滑移动
+TRACKER_MAX_AGE = 3.0  # 跟踪目标超过该时间未被检测匹配则在下次更新时移除
+TRACKER_MIN_HITS = 1  # 跟踪目标至少被检测到的次数，达到后才显示
+TRACKER_MAX_PREDICTION_TIME = 1.0  # 最多向前外推的时间，避免速度估计偏差导致检测框飘走
+TRACKER_PROCESS_NOISE = 0.05  # 过程噪声（加速度标准差）
+TRACKER_MEASUREMENT_NOISE = 0.02  # 观测噪声（检测框位置标准差）
+TRACKER_INITIAL_VELOCITY_VARIANCE = 0.01  # 新目标速度的初始方差
 
 # 检测间隔配置（秒）
 DETECTION_INTERVALS = [0.1, 0.25, 0.5, 1, 2, 3, 5]
 DEFAULT_INTERVAL = 1.0
 
+# 守护动作配置
+GUARD_ACTION_COOLDOWN = 3.0  # 守护动作成功后的冷却时间（秒），期间的检测不再触发守护
+WINDOW_INDEX_REFRESH_INTERVAL = 2.0  # 后台刷新被守护进程窗口句柄索引的间隔（秒）
+MINIMIZE_VERIFY_TIMEOUT = 0.2  # 等待窗口处理最小化请求的最长时间（秒），超时仍未最小化的窗口改为强制最小化
+MINIMIZE_POLL_INTERVAL = 0.005  # 等待期间检查窗口是否已最小化的间隔（秒）
+
+# 守护目标配置
+GUARD_TARGET_MODES = {
+    "PROCESS": "单个进程",
+    "TREE": "进程树（含子进程）",
+    "NAME": "同名进程"
+}
+DEFAULT_GUARD_TARGET_MODE = "TREE"  # 多进程应用（浏览器、Electron等）的窗口常在子进程中
+PROCESS_WATCH_INTERVAL = 1.0  # 扫描守护目标进程的间隔（秒），用于发现新的子进程和目标重启
+
+# 进程列表配置
+PROCESS_LIST_AUTO_REFRESH_INTERVAL = 0  # 自动刷新进程列表的间隔（秒），0 表示只手动刷新
+PROCESS_LIST_RENDER_BATCH = 100  # 进程列表每批插入的行数，滚动到已显示行的末尾附近时再插入下一批
+
 # 声音配置
 ALERT_SOUND_FILE = "alert.wav"  # 可选的自定义声音文件
 USE_SYSTEM_SOUND = True  # 是否使用系统声音
@@ -98,7 +130,10 @@ COLORS = COLORS_DARK
 DETECTION_MODES = {
     "MEDIAPIPE_ONLY": "MediaPipe独立检测",
     "SMOLVLM_ONLY": "SmolVLM独立检测",
-    "HYBRID": "混合模式"
+    "HYBRID": "混合模式",
+    "GATED": "置信度门控模式",
+    "OPENCV_ONLY": "OpenCV低功耗检测",
+    "AUTO": "自动模式"
 }
 DEFAULT_DETECTION_MODE = "MEDIAPIPE_ONLY"  # 默认使用MediaPipe独立检测
 
@@ -111,6 +146,30 @@ MEDIAPIPE_ONLY_FACE_CONFIDENCE_THRESHOLD = 0.6  # 人脸检测置信度阈值
 MEDIAPIPE_ONLY_POSE_VISIBILITY_THRESHOLD = 0.5   # 姿态关键点可见度阈值
 MEDIAPIPE_ONLY_MIN_POSE_LANDMARKS = 5            # 最少需要的可见姿态关键点数量
 MEDIAPIPE_ONLY_REQUIRE_BOTH = False              # 是否需要同时检测到人脸和姿态才触发守护
+MEDIAPIPE_DEDUP_THRESHOLD = 0.6                  # 人脸框与姿态框的嵌套比例超过该值时视为同一个人
+MEDIAPIPE_FACE_EARLY_EXIT = True                 # 先运行人脸检测，人脸已满足触发条件时跳过姿态检测（需要 REQUIRE_BOTH = False）
+MEDIAPIPE_PREVIEW_POSE_INTERVAL = 0.2            # 预览画面骨骼线的姿态检测刷新间隔（秒），两次之间复用上一次结果
+
+# 置信度门控模式：MediaPipe结果明确时直接采用，只有处于不确定区间时才调用SmolVLM
+GATING_FACE_CONFIDENCE_BAND = 0.15  # 人脸置信度在 MEDIAPIPE_ONLY_FACE_CONFIDENCE_THRESHOLD ± 该值范围内视为不确定
+GATING_POSE_LANDMARK_BAND = 3       # 可见姿态关键点数量在 MEDIAPIPE_ONLY_MIN_POSE_LANDMARKS ± 该值范围内视为不确定
+
+# OpenCV 预筛选配置（使用OpenCV自带的Haar级联/HOG检测器，无需下载模型）
+PREFILTER_ENABLED = False  # 是否在MediaPipe/SmolVLM之前运行预筛选，未检测到目标时跳过后续检测
+PREFILTER_METHOD = "haar_face"  # "haar_face"（Haar级联人脸）或 "hog_people"（HOG行人）
+PREFILTER_SCALE = 0.5  # 预筛选前的缩放比例
+PREFILTER_FULL_CHECK_INTERVAL = 5.0  # 即使预筛选未触发，也至少每隔该时间（秒）运行一次后续检测
+PREFILTER_MIN_FACE_SIZE = (24, 24)  # Haar人脸最小尺寸（缩放后的像素）
+PREFILTER_HOG_MIN_WEIGHT = 0.5  # HOG检测结果的最小权重
+
+# 检测器注册表与自动模式配置
+AUTO_LATENCY_BUDGET = 0.2  # 自动模式每次检测的期望耗时预算（秒），按实测耗时和命中率选择级联
+AUTO_REPLAN_INTERVAL = 30.0  # 自动模式重新选择级联的间隔（秒）
+AUTO_MAX_GATE_STAGES = 1  # 最终检测器之前最多加入的过滤阶段数量（过滤阶段越多漏检风险越大）
+DETECTOR_STATS_SMOOTHING = 0.1  # 检测器耗时和命中率的滑动平均系数
+DETECTOR_PRIOR_HIT_RATE = 0.5  # 检测器尚无实测数据时假定的命中率
+AUTO_PROBE_INTERVAL = 5.0  # 自动模式试运行一个未选中检测器的间隔（秒），使其统计保持更新
+AUTO_STATS_DECAY = 0.2  # 每次重新选择级联时，未选中且超出预算（不会试运行）的检测器统计向先验值回归的比例
 
 # MediaPipe 辅助检测参数
 MEDIAPIPE_FACE_OVERLAP_THRESHOLD = 0.3  # 人脸重叠度阈值（0.0-1.0）
@@ -119,8 +178,35 @@ MEDIAPIPE_CONFIDENCE_BOOST = 0.2  # 验证通过时的置信度提升
 MEDIAPIPE_CONFIDENCE_PENALTY = 0.1  # 验证失败时的置信度降低
 MEDIAPIPE_FINAL_CONFIDENCE_THRESHOLD = 0.3  # 最终保留检测结果的置信度阈值
 
+# 局部区域（ROI）跟踪配置：检测到人后只在其周围区域运行MediaPipe
+ROI_TRACKING_ENABLED = True  # 是否启用局部区域检测
+ROI_PADDING = 0.25  # 区域相对检测框尺寸向外扩展的比例
+ROI_MIN_SIZE = 0.3  # 区域最小边长（占画面比例），保证检测器有足够上下文
+ROI_MAX_AREA = 0.7  # 区域面积超过画面该比例时直接使用全画面
+ROI_FULL_SCAN_INTERVAL = 10  # 连续使用局部区域检测的最大次数，之后进行一次全画面检测
+
+# 混合模式候选区域级联：MediaPipe提出候选区域，只把不确定的候选区域裁剪后交给SmolVLM确认
+HYBRID_CANDIDATE_CASCADE = True  # False 时使用原来的 SmolVLM全画面检测 + MediaPipe验证
+CASCADE_ACCEPT_CONFIDENCE = 0.8  # 候选置信度达到该值时直接接受，不再调用SmolVLM
+CASCADE_MIN_POSE_LANDMARKS = 3  # 姿态作为候选区域所需的最少可见关键点数量
+CASCADE_CROP_PADDING = 0.3  # 裁剪区域相对候选框尺寸向外扩展的比例
+CASCADE_CROP_MIN_SIZE = 0.25  # 裁剪区域最小边长（占画面比例）
+CASCADE_MAX_CROPS = 3  # 每次检测最多发送给SmolVLM确认的候选区域数量
+CASCADE_CONFIRM_MAX_TOKENS = 16  # 确认请求的最大输出长度
+
 # 摄像头模糊度配置
 CAMERA_BLUR_MIN = 0.0  # 最小模糊度（无模糊）
 CAMERA_BLUR_MAX = 20.0  # 最大模糊度
 CAMERA_BLUR_DEFAULT = 0.0  # 默认模糊度（无模糊）
 CAMERA_BLUR_STEPS = 200  # 模糊度滑块步数
+CAMERA_BLUR_MIN_SCALED_SIGMA = 2.0  # 大半径模糊先缩小画面再模糊，缩小后的模糊半径不低于该值
+CAMERA_BLUR_MAX_DOWNSCALE = 8  # 模糊前最多缩小的倍数（2的幂）
+
+# 性能信息叠加层配置
+SHOW_PERFORMANCE_HUD = False  # 是否默认在预览画面上显示性能信息
+
+# 本地指标端点配置（Prometheus 文本格式）
+METRICS_ENABLED = False  # 是否启用指标端点（默认关闭）
+METRICS_HOST = "127.0.0.1"  # 仅绑定本机地址
+METRICS_PORT = 9108  # 指标端口，访问 http://127.0.0.1:9108/metrics
+METRICS_LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]  # 延迟直方图分桶（秒）
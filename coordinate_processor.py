@@ -4,10 +4,13 @@
 """
 
 import json
-import re
 import math
+import re
+import time
 from typing import List, Dict, Optional, Tuple
 from config import *
+from box_geometry import similarity_matrix, greedy_assignment
+from detection import Detection, DetectionSource, detections_to_array, detections_to_pixel_array
 
 
 class CoordinateProcessor:
@@ -17,10 +20,14 @@ class CoordinateProcessor:
         self.canvas_width = canvas_width
         self.canvas_height = canvas_height
         self.previous_humans = []
-        self.no_human_counter = 0
+        self.last_human_time = None  # 最近一次检测到人类的时间戳（即 previous_humans 对应的时间）
+
+    def is_valid_human_coordinate(self, human: Dict, canvas_width: Optional[int] = None,
+                                  canvas_height: Optional[int] = None) -> bool:
+        """验证人类检测坐标是否合理，画布尺寸默认为处理器的画布尺寸"""
+        canvas_width = self.canvas_width if canvas_width is None else canvas_width
+        canvas_height = self.canvas_height if canvas_height is None else canvas_height
 
-    def is_valid_human_coordinate(self, human: Dict) -> bool:
-        """验证人类检测坐标是否合理"""
         try:
             # 检查坐标是否为数字
             if not all(isinstance(human.get(key), (int, float)) for key in ['x', 'y', 'width', 'height']):
@@ -33,15 +40,15 @@ class CoordinateProcessor:
                 return False
 
             # 检查坐标是否在画布范围内
-            if x + width > self.canvas_width or y + height > self.canvas_height:
+            if x + width > canvas_width or y + height > canvas_height:
                 return False
 
             # 检查人类检测框大小是否合理
             if width < MIN_HUMAN_SIZE or height < MIN_HUMAN_SIZE:
                 return False
 
-            if (width > self.canvas_width * MAX_HUMAN_SIZE_RATIO or
-                height > self.canvas_height * MAX_HUMAN_SIZE_RATIO):
+            if (width > canvas_width * MAX_HUMAN_SIZE_RATIO or
+                height > canvas_height * MAX_HUMAN_SIZE_RATIO):
                 return False
 
             # 检查宽高比是否合理
@@ -58,105 +65,101 @@ class CoordinateProcessor:
         """验证人脸坐标是否合理（保持向后兼容）"""
         return self.is_valid_human_coordinate(face)
 
-    def calculate_human_similarity(self, human1: Dict, human2: Dict) -> float:
+    def calculate_human_similarity(self, human1: Detection, human2: Detection) -> float:
         """计算两个人类检测框的相似度（0-1之间，1表示完全相同）"""
         try:
-            # 计算中心点距离
-            center1_x = human1['x'] + human1['width'] / 2
-            center1_y = human1['y'] + human1['height'] / 2
-            center2_x = human2['x'] + human2['width'] / 2
-            center2_y = human2['y'] + human2['height'] / 2
-
-            # 计算中心点距离与画布对角线的比值（归一化）
-            canvas_diagonal = math.sqrt(self.canvas_width**2 + self.canvas_height**2)
-            center_distance = math.sqrt((center1_x - center2_x)**2 + (center1_y - center2_y)**2)
-            normalized_distance = 1 - (center_distance / canvas_diagonal)
-
-            # 计算大小相似度
-            area1 = human1['width'] * human1['height']
-            area2 = human2['width'] * human2['height']
-            area_ratio = min(area1, area2) / max(area1, area2)
-
-            # 综合相似度（距离和大小各占权重）
-            return normalized_distance * 0.7 + area_ratio * 0.3
-
-        except (KeyError, TypeError, ZeroDivisionError):
+            return float(self.calculate_similarity_matrix([human1], [human2])[0, 0])
+        except (AttributeError, TypeError, ValueError):
             return 0.0
 
-    def calculate_face_similarity(self, face1: Dict, face2: Dict) -> float:
+    def calculate_similarity_matrix(self, humans1: List[Detection], humans2: List[Detection]):
+        """批量计算两组人类检测框两两之间的相似度矩阵 (N, M)"""
+        # 综合相似度：中心点距离（按画布对角线归一化）和面积比，在像素坐标下计算
+        return similarity_matrix(
+            detections_to_pixel_array(humans1, self.canvas_width, self.canvas_height),
+            detections_to_pixel_array(humans2, self.canvas_width, self.canvas_height),
+            self.canvas_width, self.canvas_height
+        )
+
+    def calculate_face_similarity(self, face1: Detection, face2: Detection) -> float:
         """计算两个人脸框的相似度（保持向后兼容）"""
         return self.calculate_human_similarity(face1, face2)
 
-    def find_most_similar_human(self, human: Dict, human_array: List[Dict]) -> Optional[Dict]:
+    def find_most_similar_human(self, human: Detection, human_array: List[Detection]) -> Optional[Detection]:
         """查找最相似的人类检测"""
-        max_similarity = 0
-        most_similar_human = None
+        if not human_array:
+            return None
 
-        for candidate_human in human_array:
-            similarity = self.calculate_human_similarity(human, candidate_human)
-            if similarity > max_similarity:
-                max_similarity = similarity
-                most_similar_human = candidate_human
+        similarities = self.calculate_similarity_matrix([human], human_array)[0]
+        best_index = int(similarities.argmax())
 
         # 只有相似度大于阈值才认为是相似的人类检测
-        return most_similar_human if max_similarity > SIMILARITY_THRESHOLD else None
+        return human_array[best_index] if similarities[best_index] > SIMILARITY_THRESHOLD else None
 
-    def find_most_similar_face(self, face: Dict, face_array: List[Dict]) -> Optional[Dict]:
+    def find_most_similar_face(self, face: Detection, face_array: List[Detection]) -> Optional[Detection]:
         """查找最相似的人脸（保持向后兼容）"""
         return self.find_most_similar_human(face, face_array)
 
-    def smooth_human_coordinates(self, current_humans: List[Dict]) -> List[Dict]:
-        """平滑人类检测坐标，减少抖动"""
-        # 如果没有当前人类检测，增加无人类计数器
-        if not current_humans:
-            self.no_human_counter += 1
+    def smoothing_weight(self, elapsed: float) -> float:
+        """根据距上次检测的时间计算当前帧权重，间隔越长当前帧权重越大"""
+        return 1.0 - math.exp(-max(0.0, elapsed) / SMOOTHING_TIME_CONSTANT)
 
-            # 如果连续多次没有检测到人类，才清除之前的检测框
-            if self.no_human_counter >= MAX_NO_HUMAN_COUNT:
+    def smooth_human_coordinates(self, current_humans: List[Detection],
+                                 timestamp: Optional[float] = None) -> List[Detection]:
+        """平滑人类检测坐标，减少抖动
+
+        平滑权重和无人类保留时间都按时间计算，检测间隔变化时行为保持一致。
+        timestamp 为检测对应帧的单调时钟时间，默认为当前时间。
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        # 如果没有当前人类检测
+        if not current_humans:
+            # 如果超过保留时间没有检测到人类，才清除之前的检测框
+            if self.last_human_time is None or timestamp - self.last_human_time >= NO_HUMAN_HOLD_TIME:
                 self.previous_humans = []
                 return []
             else:
                 # 否则继续使用之前的检测框
                 return self.previous_humans
 
-        # 重置无人类计数器
-        self.no_human_counter = 0
+        # 平滑权重按保留的检测框的实际年龄计算（中间没有检测到人类的帧不计入）
+        elapsed = 0.0 if self.last_human_time is None else timestamp - self.last_human_time
+        self.last_human_time = timestamp
 
         # 如果之前没有人类检测，直接使用当前检测
         if not self.previous_humans:
             self.previous_humans = current_humans.copy()
             return current_humans
 
-        # 平滑处理：将当前检测与之前检测进行匹配和平均
-        smoothed_humans = []
-
-        # 处理当前检测到的每个人类
-        for current_human in current_humans:
-            # 查找之前帧中最相似的人类检测
-            similar_previous_human = self.find_most_similar_human(current_human, self.previous_humans)
-
-            if similar_previous_human:
-                # 如果找到相似的检测，进行平滑处理（加权平均）
-                weight = SMOOTHING_WEIGHT  # 当前帧权重
-                smoothed_human = {
-                    'x': round(current_human['x'] * weight + similar_previous_human['x'] * (1 - weight)),
-                    'y': round(current_human['y'] * weight + similar_previous_human['y'] * (1 - weight)),
-                    'width': round(current_human['width'] * weight + similar_previous_human['width'] * (1 - weight)),
-                    'height': round(current_human['height'] * weight + similar_previous_human['height'] * (1 - weight))
-                }
-                smoothed_humans.append(smoothed_human)
-            else:
-                # 如果没有找到相似的检测，直接使用当前检测
-                smoothed_humans.append(current_human)
+        # 平滑处理：一次性计算相似度矩阵，全局求解一对一匹配后加权平均
+        similarities = self.calculate_similarity_matrix(current_humans, self.previous_humans)
+        matches = greedy_assignment(similarities, SIMILARITY_THRESHOLD)
+        smoothed_humans = list(current_humans)
+
+        if matches:
+            current_indices, previous_indices = (list(indices) for indices in zip(*matches))
+            current_boxes = detections_to_array([current_humans[i] for i in current_indices])
+            previous_boxes = detections_to_array([self.previous_humans[i] for i in previous_indices])
+
+            weight = self.smoothing_weight(elapsed)  # 当前帧权重
+            blended = current_boxes * weight + previous_boxes * (1 - weight)
+
+            for current_index, (x, y, width, height) in zip(current_indices, blended.tolist()):
+                smoothed_humans[current_index] = current_humans[current_index].replace(
+                    x=x, y=y, width=width, height=height
+                )
 
         # 更新previous_humans用于下一次比较
         self.previous_humans = smoothed_humans.copy()
 
         return smoothed_humans
 
-    def smooth_face_coordinates(self, current_faces: List[Dict]) -> List[Dict]:
+    def smooth_face_coordinates(self, current_faces: List[Detection],
+                                timestamp: Optional[float] = None) -> List[Detection]:
         """平滑人脸坐标，减少抖动（保持向后兼容）"""
-        return self.smooth_human_coordinates(current_faces)
+        return self.smooth_human_coordinates(current_faces, timestamp)
 
     def parse_human_activity_response(self, response: str) -> List[Dict]:
         """解析SmolVLM返回的JSON响应，提取人类活动检测坐标"""
@@ -252,27 +255,48 @@ class CoordinateProcessor:
         """解析SmolVLM返回的JSON响应，提取人脸坐标（保持向后兼容）"""
         return self.parse_human_activity_response(response)
 
-    def process_humans(self, response: str) -> List[Dict]:
-        """处理人类活动检测响应，返回经过验证和平滑的人类检测坐标"""
-        # 解析响应
-        raw_humans = self.parse_human_activity_response(response)
-
-        # 过滤有效坐标
-        valid_humans = [human for human in raw_humans if self.is_valid_human_coordinate(human)]
+    def to_detection(self, human: Dict, canvas_width: Optional[int] = None,
+                     canvas_height: Optional[int] = None) -> Detection:
+        """将已验证的像素坐标字典转换为归一化的检测结果"""
+        canvas_width = self.canvas_width if canvas_width is None else canvas_width
+        canvas_height = self.canvas_height if canvas_height is None else canvas_height
+        confidence = human.get('confidence')
+        return Detection.from_pixels(
+            human['x'], human['y'], human['width'], human['height'],
+            canvas_width, canvas_height,
+            confidence=confidence if isinstance(confidence, (int, float)) else None,
+            source=DetectionSource.SMOLVLM
+        )
+
+    def parse_detections(self, response: str, canvas_width: Optional[int] = None,
+                         canvas_height: Optional[int] = None) -> List[Detection]:
+        """解析并验证响应，返回相对指定画布的检测结果（不做平滑）"""
+        # 只在解析边界做一次类型检查，之后统一使用检测结果对象
+        return [self.to_detection(human, canvas_width, canvas_height)
+                for human in self.parse_human_activity_response(response)
+                if self.is_valid_human_coordinate(human, canvas_width, canvas_height)]
+
+    def process_humans(self, response: str, timestamp: Optional[float] = None) -> List[Detection]:
+        """处理人类活动检测响应，返回经过验证和平滑的人类检测结果
+
+        timestamp 应为发送给SmolVLM的帧的采集时间，避免推理延迟影响平滑
+        """
+        # 解析响应并过滤有效坐标
+        valid_humans = self.parse_detections(response)
 
         # 应用平滑处理
-        smoothed_humans = self.smooth_human_coordinates(valid_humans)
+        smoothed_humans = self.smooth_human_coordinates(valid_humans, timestamp)
 
         return smoothed_humans
 
-    def process_faces(self, response: str) -> List[Dict]:
+    def process_faces(self, response: str, timestamp: Optional[float] = None) -> List[Detection]:
         """处理人脸检测响应，返回经过验证和平滑的人脸坐标（保持向后兼容）"""
-        return self.process_humans(response)
+        return self.process_humans(response, timestamp)
 
     def reset(self):
         """重置处理器状态"""
         self.previous_humans = []
-        self.no_human_counter = 0
+        self.last_human_time = None
         # 保持向后兼容
         self.previous_faces = []
         self.no_face_counter = 0
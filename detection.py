@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+检测结果数据结构模块
+"""
+
+from enum import Enum
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class DetectionSource(Enum):
+    """检测结果来源"""
+    MEDIAPIPE_FACE = "mediapipe_face"
+    MEDIAPIPE_POSE = "mediapipe_pose"
+    SMOLVLM = "smolvlm"
+    HYBRID = "hybrid"
+    OPENCV_FACE = "opencv_face"
+    OPENCV_PEOPLE = "opencv_people"
+
+
+class Detection:
+    """单个检测结果，坐标为相对画面尺寸归一化的浮点数（0-1）"""
+
+    __slots__ = ('x', 'y', 'width', 'height', 'confidence', 'source', 'track_id',
+                 'mediapipe_verified', 'face_confidence', 'pose_confidence')
+
+    def __init__(self, x: float, y: float, width: float, height: float,
+                 confidence: Optional[float] = None,
+                 source: DetectionSource = DetectionSource.SMOLVLM,
+                 track_id: Optional[int] = None,
+                 mediapipe_verified: Optional[bool] = None,
+                 face_confidence: float = 0.0,
+                 pose_confidence: float = 0.0):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.confidence = confidence  # None 表示检测器未给出置信度
+        self.source = source
+        self.track_id = track_id
+        self.mediapipe_verified = mediapipe_verified  # None 表示未经过MediaPipe验证
+        self.face_confidence = face_confidence
+        self.pose_confidence = pose_confidence
+
+    @classmethod
+    def from_pixels(cls, x: float, y: float, width: float, height: float,
+                    frame_width: int, frame_height: int, **kwargs) -> 'Detection':
+        """从像素坐标创建检测结果"""
+        return cls(x / frame_width, y / frame_height, width / frame_width, height / frame_height, **kwargs)
+
+    def to_pixels(self, frame_width: int, frame_height: int) -> Tuple[int, int, int, int]:
+        """转换为指定尺寸画面上的整数像素坐标 (x, y, width, height)"""
+        return (int(self.x * frame_width), int(self.y * frame_height),
+                int(self.width * frame_width), int(self.height * frame_height))
+
+    def replace(self, **changes) -> 'Detection':
+        """返回修改了部分字段的副本"""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return Detection(**values)
+
+    def __repr__(self) -> str:
+        return (f"Detection(x={self.x:.3f}, y={self.y:.3f}, width={self.width:.3f}, "
+                f"height={self.height:.3f}, confidence={self.confidence}, "
+                f"source={self.source.value}, track_id={self.track_id})")
+
+
+def detections_to_array(detections: Sequence[Detection]) -> np.ndarray:
+    """将检测结果转换为 (N, 4) 归一化坐标数组 [x, y, width, height]"""
+    if not detections:
+        return np.zeros((0, 4), dtype=np.float64)
+    return np.array([(d.x, d.y, d.width, d.height) for d in detections], dtype=np.float64)
+
+
+def detections_to_pixel_array(detections: Sequence[Detection], frame_width: int,
+                              frame_height: int) -> np.ndarray:
+    """将检测结果转换为 (N, 4) 像素坐标数组"""
+    scale = np.array([frame_width, frame_height, frame_width, frame_height], dtype=np.float64)
+    return detections_to_array(detections) * scale
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+检测模式注册表模块
+每个检测模式登记使用的检测器、检测函数和预览画面的绘制方式，
+界面和预览合成器只按模式键查找，新增模式不需要修改界面代码
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from detection import Detection
+
+# 检测函数 (检测上下文, 帧, 帧采集时间) -> 检测结果
+DetectionStrategy = Callable[..., List[Detection]]
+
+
+class DetectionMode:
+    """检测模式描述：界面状态和预览画面的绘制方式都由模式使用的检测器推导"""
+
+    def __init__(self, key: str, detectors: Sequence[str], strategy: DetectionStrategy,
+                 overlay: str, box_color: Tuple[int, int, int]):
+        """
+        detectors: 模式使用的检测器名称
+        strategy: 检测函数，参数为 (检测上下文, 帧, 帧采集时间)
+        overlay: 预览画面绘制方式，"mediapipe"（人脸框和骨骼线）、"detections"（检测结果）
+                 或 "combined"（检测结果 + 较细的MediaPipe辅助结果）
+        box_color: 检测结果框的颜色（BGR格式）
+        """
+        self.key = key
+        self.detectors = tuple(detectors)
+        self.strategy = strategy
+        self.overlay = overlay
+        self.box_color = box_color
+
+    @property
+    def uses_mediapipe(self) -> bool:
+        """是否使用MediaPipe（状态栏显示MediaPipe状态，预览画面绘制MediaPipe结果）"""
+        return any(name.startswith("mediapipe") for name in self.detectors)
+
+    @property
+    def uses_smolvlm(self) -> bool:
+        """是否使用SmolVLM（状态栏检测SmolVLM连接）"""
+        return "smolvlm" in self.detectors
+
+    @property
+    def runs_prefilter(self) -> bool:
+        """模式本身是否运行OpenCV检测器（此时检测循环不再另外做预筛选）"""
+        return "opencv" in self.detectors
+
+
+class DetectionModeRegistry:
+    """检测模式注册表，按模式键保存检测模式"""
+
+    def __init__(self):
+        self.modes: Dict[str, DetectionMode] = {}
+
+    def register(self, key: str, detectors: Sequence[str], strategy: DetectionStrategy,
+                 overlay: str = "combined", box_color: Tuple[int, int, int] = (255, 0, 0)):
+        """注册检测模式"""
+        self.modes[key] = DetectionMode(key, detectors, strategy, overlay, box_color)
+
+    def get(self, key: str) -> Optional[DetectionMode]:
+        """按模式键获取检测模式，未注册时返回None"""
+        return self.modes.get(key)
+
+    def keys(self) -> List[str]:
+        """已注册的模式键"""
+        return list(self.modes)
+
+
+mode_registry = DetectionModeRegistry()
+
+
+def register_mode(key: str, detectors: Sequence[str], overlay: str = "combined",
+                  box_color: Tuple[int, int, int] = (255, 0, 0)):
+    """函数装饰器：将检测函数注册为检测模式（显示名称见 config.DETECTION_MODES）"""
+    def decorator(strategy):
+        mode_registry.register(key, detectors, strategy, overlay, box_color)
+        return strategy
+    return decorator
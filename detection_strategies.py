@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+检测策略模块
+各检测模式的检测函数，以及它们共用的MediaPipe局部区域检测、候选框合并、SmolVLM确认等步骤；
+检测函数通过 detection_modes.register_mode 注册，新增模式只需在这里添加一个函数
+"""
+
+import time
+import numpy as np
+from typing import Dict, List, Optional
+from config import *
+from box_geometry import overlap_matrix, non_max_suppression, box_areas, containment_matrix
+from detection import Detection, DetectionSource, detections_to_array, detections_to_pixel_array
+from detection_modes import register_mode
+from detectors import Detector, AutoCascade, detector_registry, pose_detection
+from performance_monitor import perf_monitor
+from pose_processing import landmarks_to_array, pose_presence_ratios
+from roi_tracking import region_around
+
+
+def get_landmark_array(pose_data):
+    """获取姿态关键点数组，优先使用检测时已转换好的结果"""
+    landmark_array = pose_data.get('landmark_array')
+    if landmark_array is None:
+        landmark_array = landmarks_to_array(pose_data['landmarks'])
+        pose_data['landmark_array'] = landmark_array
+    return landmark_array
+
+
+def calculate_face_overlap_batch(human_boxes, mediapipe_faces):
+    """批量计算每个人类检测框与MediaPipe人脸的最大重叠度（相交面积 / 人脸面积）"""
+    if not human_boxes or not mediapipe_faces:
+        return np.zeros(len(human_boxes))
+
+    try:
+        # 重叠比例与坐标缩放无关，直接使用归一化坐标计算
+        overlaps = overlap_matrix(detections_to_array(human_boxes), detections_to_array(mediapipe_faces))
+        return overlaps.max(axis=1)
+
+    except Exception as e:
+        print(f"计算人脸重叠度错误: {e}")
+        return np.zeros(len(human_boxes))
+
+
+def calculate_pose_presence_batch(human_boxes, pose_data, frame_shape):
+    """批量计算每个人类检测框内可见姿态关键点的比例"""
+    if not human_boxes or not pose_data or not pose_data.get('landmarks'):
+        return np.zeros(len(human_boxes))
+
+    try:
+        boxes = detections_to_pixel_array(human_boxes, frame_shape[1], frame_shape[0])
+        # 只考虑可见的关键点
+        return pose_presence_ratios(get_landmark_array(pose_data), boxes, frame_shape,
+                                    visibility_threshold=0.5)
+
+    except Exception as e:
+        print(f"计算姿态存在度错误: {e}")
+        return np.zeros(len(human_boxes))
+
+
+def build_mediapipe_candidates(frame, faces, pose_data, face_threshold, min_pose_landmarks):
+    """将MediaPipe人脸和姿态结果转换为检测结果，人脸按置信度、姿态按可见关键点数量过滤"""
+    humans = [face for face in faces if face.confidence >= face_threshold]
+
+    if pose_data and pose_data.get('landmarks'):
+        # 可见关键点足够多时添加姿态区域
+        pose_human = pose_detection(get_landmark_array(pose_data), frame.shape, min_pose_landmarks)
+        if pose_human:
+            humans.append(pose_human)
+
+    return humans
+
+
+def merge_nested_detections(humans):
+    """合并同一个人的嵌套检测框（如人脸框在姿态框内）
+
+    保留面积较大的外框，避免人物区域缩小成人脸框；外框的置信度取嵌套框中的最大值。
+    """
+    if len(humans) <= 1:
+        return humans
+
+    boxes = detections_to_array(humans)
+    keep = non_max_suppression(boxes, box_areas(boxes), MEDIAPIPE_DEDUP_THRESHOLD, metric="containment")
+
+    nested = containment_matrix(boxes[keep], boxes) > MEDIAPIPE_DEDUP_THRESHOLD
+    confidences = np.array([human.confidence or 0.0 for human in humans])
+    merged = []
+    for row, index in enumerate(keep):
+        confidence = float(confidences[nested[row]].max(initial=confidences[index]))
+        human = humans[index]
+        merged.append(human.replace(confidence=confidence) if confidence > confidences[index] else human)
+    return merged
+
+
+def pose_needed_for_decision(faces):
+    """人脸检测结果不足以做出判定时才需要运行姿态检测"""
+    if MEDIAPIPE_ONLY_REQUIRE_BOTH or not MEDIAPIPE_FACE_EARLY_EXIT:
+        return True
+    return not any(face.confidence >= MEDIAPIPE_ONLY_FACE_CONFIDENCE_THRESHOLD for face in faces)
+
+
+class DetectionContext:
+    """检测函数共享的组件和状态：摄像头、SmolVLM客户端、跟踪器、ROI调度器和已创建的检测器"""
+
+    def __init__(self, components: Dict, detectors: Dict[str, Detector]):
+        self.camera_handler = components['camera_handler']
+        self.smolvlm_client = components['smolvlm_client']
+        self.tracker = components['tracker']
+        self.roi_scheduler = components['roi_scheduler']
+        self.detectors = detectors
+        self.auto_cascade = AutoCascade(detectors)
+        self.perf_monitor = perf_monitor
+
+    def reset(self):
+        """停止检测时调用：下次检测从全画面开始，自动模式重新选择级联"""
+        self.roi_scheduler.reset()
+        self.auto_cascade.reset()
+
+    def detect_mediapipe_in_roi(self, frame, timestamp=None, pose_needed=None):
+        """运行MediaPipe人脸和姿态检测，已有跟踪目标时只在其周围的局部区域内检测
+
+        返回的人脸框和 pose_data['landmark_array'] 均为整个画面的归一化坐标；
+        pose_data['landmarks'] 保持MediaPipe原始输出（相对检测区域）。
+        pose_needed(faces) 返回False时跳过姿态检测，pose_data 为None。
+        """
+        region = None
+        if ROI_TRACKING_ENABLED:
+            frame_height, frame_width = frame.shape[:2]
+            tracked = self.tracker.predict(timestamp if timestamp is not None else time.monotonic())
+            region = self.roi_scheduler.select_region(tracked, frame_width, frame_height)
+
+        if region is None:
+            self.perf_monitor.increment("mediapipe_scans", labels={'region': 'full'})
+            faces = self.camera_handler.detect_faces_with_mediapipe(frame)
+            if not self._should_run_pose(faces, pose_needed):
+                return faces, None
+            return faces, self.camera_handler.detect_pose_with_mediapipe(frame)
+
+        self.perf_monitor.increment("mediapipe_scans", labels={'region': 'roi'})
+        crop = region.crop(frame)
+        faces = region.map_detections(self.camera_handler.detect_faces_with_mediapipe(crop))
+        if not self._should_run_pose(faces, pose_needed):
+            return faces, None
+        pose_data = self.camera_handler.detect_pose_with_mediapipe(crop)
+        if pose_data and pose_data.get('landmark_array') is not None:
+            pose_data['landmark_array'] = region.map_landmark_array(pose_data['landmark_array'])
+        return faces, pose_data
+
+    def _should_run_pose(self, faces, pose_needed):
+        """判断是否运行姿态检测并记录运行/跳过次数"""
+        run = pose_needed is None or pose_needed(faces)
+        self.perf_monitor.increment("pose_evaluations", labels={'result': 'run' if run else 'skipped'})
+        return run
+
+    def confirm_candidates_with_smolvlm(self, frame, candidates):
+        """将候选区域裁剪后逐个发送给SmolVLM确认（只问是否有人），返回确认后的候选框"""
+        confirmed = []
+        frame_height, frame_width = frame.shape[:2]
+
+        # 置信度高的候选优先确认，限制每次检测的请求数量
+        candidates = sorted(candidates, key=lambda candidate: candidate.confidence, reverse=True)
+        for candidate in candidates[:CASCADE_MAX_CROPS]:
+            region = region_around([candidate], frame_width, frame_height,
+                                   padding=CASCADE_CROP_PADDING, min_size=CASCADE_CROP_MIN_SIZE)
+            if region is None:
+                continue
+
+            crop_data = self.camera_handler.encode_frame_as_jpeg(region.crop(frame))
+            if crop_data is None:
+                continue
+
+            # 只需要是/否的回答：输出很短，也不受检测框尺寸校验影响（裁剪区域大部分是人）
+            is_human = self.smolvlm_client.confirm_human(self.smolvlm_client.encode_image_to_base64(crop_data))
+
+            if is_human:
+                # SmolVLM确认后沿用MediaPipe给出的候选框（已经是整个画面的坐标）
+                confidence = min(1.0, candidate.confidence + MEDIAPIPE_CONFIDENCE_BOOST)
+                confirmed.append(
+                    candidate.replace(confidence=confidence, source=DetectionSource.HYBRID, mediapipe_verified=True)
+                )
+                self.perf_monitor.increment("cascade_candidates", labels={'result': 'confirmed'})
+            else:
+                self.perf_monitor.increment("cascade_candidates", labels={'result': 'rejected'})
+
+        return confirmed
+
+    def enhance_detection_with_mediapipe(self, frame, smolvlm_humans):
+        """使用MediaPipe增强SmolVLM的检测结果"""
+        try:
+            # 获取MediaPipe检测结果
+            mediapipe_faces = self.camera_handler.detect_faces_with_mediapipe(frame)
+            pose_data = self.camera_handler.detect_pose_with_mediapipe(frame)
+
+            enhanced_humans = []
+
+            # 一次性计算所有检测框的人脸重叠度和姿态存在度
+            face_confidences = calculate_face_overlap_batch(smolvlm_humans, mediapipe_faces)
+            pose_confidences = calculate_pose_presence_batch(smolvlm_humans, pose_data, frame.shape)
+
+            for human, face_confidence, pose_confidence in zip(smolvlm_humans, face_confidences, pose_confidences):
+                # 1. 人脸验证：SmolVLM检测的区域是否有MediaPipe检测到的人脸
+                face_confidence = float(face_confidence)
+
+                # 2. 姿态验证：是否有人体姿态
+                pose_confidence = float(pose_confidence)
+
+                # 3. 综合置信度计算
+                original_confidence = human.confidence if human.confidence is not None else 0.5
+
+                # 如果MediaPipe也检测到相关特征，提高置信度
+                if (face_confidence > MEDIAPIPE_FACE_OVERLAP_THRESHOLD or
+                    pose_confidence > MEDIAPIPE_POSE_PRESENCE_THRESHOLD):
+                    enhanced_confidence = min(1.0, original_confidence + MEDIAPIPE_CONFIDENCE_BOOST)
+                    enhanced_human = human.replace(
+                        confidence=enhanced_confidence,
+                        mediapipe_verified=True,
+                        face_confidence=face_confidence,
+                        pose_confidence=pose_confidence
+                    )
+                    print(f"MediaPipe验证通过: 人脸{face_confidence:.2f}, 姿态{pose_confidence:.2f}")
+                else:
+                    # 如果MediaPipe没有检测到相关特征，降低置信度
+                    enhanced_confidence = max(0.1, original_confidence - MEDIAPIPE_CONFIDENCE_PENALTY)
+                    enhanced_human = human.replace(confidence=enhanced_confidence, mediapipe_verified=False)
+                    print(f"MediaPipe验证失败: 人脸{face_confidence:.2f}, 姿态{pose_confidence:.2f}")
+
+                # 只保留置信度较高的检测结果
+                if enhanced_confidence > MEDIAPIPE_FINAL_CONFIDENCE_THRESHOLD:
+                    enhanced_humans.append(enhanced_human)
+
+            return enhanced_humans
+
+        except Exception as e:
+            print(f"MediaPipe辅助检测错误: {e}")
+            return smolvlm_humans  # 出错时返回原始结果
+
+
+# ---------------------------------------------------------------------------
+# 各检测模式的检测函数 (context, frame, timestamp) -> List[Detection]
+# ---------------------------------------------------------------------------
+
+@register_mode("MEDIAPIPE_ONLY", ["mediapipe_face", "mediapipe_pose"], overlay="mediapipe",
+               box_color=(0, 255, 0))  # 绿色
+def detect_with_mediapipe_only(context: DetectionContext, frame, timestamp: Optional[float] = None) -> List[Detection]:
+    """仅使用MediaPipe进行检测"""
+    try:
+        # 先做人脸检测，人脸已满足触发条件时跳过较慢的姿态检测（有跟踪目标时只检测其周围区域）
+        faces, pose_data = context.detect_mediapipe_in_roi(frame, timestamp, pose_needed=pose_needed_for_decision)
+
+        # 应用人脸置信度阈值和姿态可见关键点数量阈值
+        humans = build_mediapipe_candidates(
+            frame, faces, pose_data,
+            MEDIAPIPE_ONLY_FACE_CONFIDENCE_THRESHOLD, MEDIAPIPE_ONLY_MIN_POSE_LANDMARKS
+        )
+        face_detected = any(human.source == DetectionSource.MEDIAPIPE_FACE for human in humans)
+        pose_detected = any(human.source == DetectionSource.MEDIAPIPE_POSE for human in humans)
+
+        # 目标丢失时下一次回退到全画面检测
+        context.roi_scheduler.report(face_detected or pose_detected)
+
+        # 根据配置决定是否需要同时检测到人脸和姿态
+        if MEDIAPIPE_ONLY_REQUIRE_BOTH:
+            if not (face_detected and pose_detected):
+                return []  # 需要同时检测到才返回结果
+
+        # 合并同一个人的人脸框和姿态框（人脸框通常嵌套在姿态框内）
+        humans = merge_nested_detections(humans)
+
+        # 打印检测状态（用于调试）
+        if humans:
+            detection_info = []
+            if face_detected:
+                detection_info.append("人脸")
+            if pose_detected:
+                detection_info.append("姿态")
+            print(f"MediaPipe独立检测触发: {', '.join(detection_info)}")
+
+        return humans
+
+    except Exception as e:
+        print(f"MediaPipe独立检测错误: {e}")
+        return []
+
+
+@register_mode("SMOLVLM_ONLY", ["smolvlm"], overlay="detections", box_color=(255, 0, 0))  # 蓝色
+def detect_with_smolvlm_only(context: DetectionContext, frame, timestamp: Optional[float] = None) -> List[Detection]:
+    """仅使用SmolVLM进行检测，timestamp 为帧采集时间（用于按时间平滑）"""
+    return context.detectors['smolvlm'].detect(frame, timestamp)
+
+
+@register_mode("OPENCV_ONLY", ["opencv"], overlay="detections", box_color=(0, 255, 255))  # 黄色
+def detect_with_opencv_only(context: DetectionContext, frame, timestamp: Optional[float] = None) -> List[Detection]:
+    """低功耗模式：只使用OpenCV预筛选检测器"""
+    return context.detectors['opencv'].detect(frame, timestamp)
+
+
+@register_mode("HYBRID", ["mediapipe_face", "mediapipe_pose", "smolvlm"])
+def detect_with_hybrid(context: DetectionContext, frame, timestamp: Optional[float] = None) -> List[Detection]:
+    """混合模式：按 HYBRID_CANDIDATE_CASCADE 选择候选区域级联或SmolVLM + MediaPipe验证"""
+    if HYBRID_CANDIDATE_CASCADE:
+        return detect_with_candidate_cascade(context, frame, timestamp)
+    return detect_with_hybrid_verification(context, frame, timestamp)
+
+
+def detect_with_hybrid_verification(context: DetectionContext, frame,
+                                    timestamp: Optional[float] = None) -> List[Detection]:
+    """混合模式：SmolVLM + MediaPipe验证"""
+    try:
+        # 首先使用SmolVLM检测
+        smolvlm_humans = detect_with_smolvlm_only(context, frame, timestamp)
+
+        if not smolvlm_humans:
+            return []
+
+        # 使用MediaPipe进行验证和增强
+        enhanced_humans = context.enhance_detection_with_mediapipe(frame, smolvlm_humans)
+
+        # 复制后再修改来源，避免改动坐标处理器中保存的上一轮检测结果
+        return [human.replace(source=DetectionSource.HYBRID) for human in enhanced_humans]
+
+    except Exception as e:
+        print(f"混合模式检测错误: {e}")
+        return []
+
+
+def detect_with_candidate_cascade(context: DetectionContext, frame,
+                                  timestamp: Optional[float] = None) -> List[Detection]:
+    """混合模式（级联）：MediaPipe提出候选区域，高置信度候选直接接受，
+    不确定的候选裁剪后交给SmolVLM确认；没有候选区域时不调用SmolVLM"""
+    try:
+        faces, pose_data = context.detect_mediapipe_in_roi(frame, timestamp)
+        candidates = merge_nested_detections(build_mediapipe_candidates(
+            frame, faces, pose_data, MEDIAPIPE_CONFIDENCE, CASCADE_MIN_POSE_LANDMARKS
+        ))
+        context.roi_scheduler.report(bool(candidates))
+
+        if not candidates:
+            return []
+
+        accepted = [candidate for candidate in candidates
+                    if candidate.confidence >= CASCADE_ACCEPT_CONFIDENCE]
+        uncertain = [candidate for candidate in candidates
+                     if candidate.confidence < CASCADE_ACCEPT_CONFIDENCE]
+        context.perf_monitor.increment("cascade_candidates", len(accepted), labels={'result': 'accepted'})
+
+        return accepted + context.confirm_candidates_with_smolvlm(frame, uncertain)
+
+    except Exception as e:
+        print(f"候选区域级联检测错误: {e}")
+        return []
+
+
+@register_mode("GATED", ["mediapipe_face", "mediapipe_pose", "smolvlm"])
+def detect_with_confidence_gating(context: DetectionContext, frame,
+                                  timestamp: Optional[float] = None) -> List[Detection]:
+    """置信度门控模式：MediaPipe结果明确时直接接受或拒绝，
+    人脸置信度或可见关键点数量处于阈值附近的不确定区间时才调用SmolVLM"""
+    try:
+        faces, pose_data = context.detect_mediapipe_in_roi(frame, timestamp)
+
+        # 高于不确定区间上限：直接接受
+        confident = build_mediapipe_candidates(
+            frame, faces, pose_data,
+            MEDIAPIPE_ONLY_FACE_CONFIDENCE_THRESHOLD + GATING_FACE_CONFIDENCE_BAND,
+            MEDIAPIPE_ONLY_MIN_POSE_LANDMARKS + GATING_POSE_LANDMARK_BAND
+        )
+        if confident:
+            context.roi_scheduler.report(True)
+            context.perf_monitor.increment("gating_decisions", labels={'decision': 'accepted'})
+            return merge_nested_detections(confident)
+
+        # 低于不确定区间下限：直接判定为无人
+        ambiguous = build_mediapipe_candidates(
+            frame, faces, pose_data,
+            MEDIAPIPE_ONLY_FACE_CONFIDENCE_THRESHOLD - GATING_FACE_CONFIDENCE_BAND,
+            max(1, MEDIAPIPE_ONLY_MIN_POSE_LANDMARKS - GATING_POSE_LANDMARK_BAND)
+        )
+        context.roi_scheduler.report(bool(ambiguous))
+        if not ambiguous:
+            context.perf_monitor.increment("gating_decisions", labels={'decision': 'rejected'})
+            return []
+
+        # 处于不确定区间：由SmolVLM对整个画面做最终判断
+        context.perf_monitor.increment("gating_decisions", labels={'decision': 'smolvlm'})
+        return detect_with_smolvlm_only(context, frame, timestamp)
+
+    except Exception as e:
+        print(f"置信度门控检测错误: {e}")
+        return []
+
+
+# 自动模式可以使用所有已注册的检测器（包括OpenCV，级联中已含预筛选阶段）
+@register_mode("AUTO", detector_registry.names())
+def detect_with_auto_cascade(context: DetectionContext, frame, timestamp: Optional[float] = None) -> List[Detection]:
+    """自动模式：按实测耗时和命中率选择的级联"""
+    return context.auto_cascade.detect(frame, timestamp)
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+检测器注册表模块
+将MediaPipe人脸、MediaPipe姿态、SmolVLM、OpenCV预筛选等检测器统一为可组合的检测阶段，
+记录每个阶段实测的耗时和命中率，并据此为自动模式选择满足延迟预算的级联
+"""
+
+import time
+import threading
+from abc import ABC, abstractmethod
+from itertools import combinations
+from typing import Callable, Dict, List, Optional
+from config import *
+from detection import Detection, DetectionSource
+from frame_pyramid import as_pyramid
+from performance_monitor import perf_monitor
+from pose_processing import count_visible_landmarks, pose_bounding_box
+
+
+def pose_detection(landmark_array, frame_shape, min_visible_landmarks: int) -> Optional[Detection]:
+    """根据姿态关键点生成检测结果，可见关键点不足时返回None"""
+    visible_landmarks = count_visible_landmarks(landmark_array, MEDIAPIPE_ONLY_POSE_VISIBILITY_THRESHOLD)
+    if visible_landmarks < min_visible_landmarks:
+        return None
+
+    # 只考虑可见度高的关键点，至少需要3个关键点
+    pose_box = pose_bounding_box(landmark_array, frame_shape, visibility_threshold=0.5, margin=20, min_points=3)
+    if not pose_box:
+        return None
+
+    frame_height, frame_width = frame_shape[:2]
+    return Detection.from_pixels(
+        pose_box['x'], pose_box['y'], pose_box['width'], pose_box['height'],
+        frame_width, frame_height,
+        confidence=min(0.9, visible_landmarks / 20.0),  # 基于可见关键点数量的置信度
+        source=DetectionSource.MEDIAPIPE_POSE
+    )
+
+
+class DetectorStats:
+    """检测阶段的实测统计：指数滑动平均的耗时和命中率"""
+
+    def __init__(self, cost_hint: float, smoothing: float = DETECTOR_STATS_SMOOTHING):
+        self.smoothing = smoothing
+        self.calls = 0
+        self.prior_latency = cost_hint
+        self.latency = cost_hint
+        self.hit_rate = DETECTOR_PRIOR_HIT_RATE
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float, hit: bool):
+        """记录一次运行结果"""
+        with self.lock:
+            if self.calls == 0:
+                self.latency = seconds
+            else:
+                self.latency += (seconds - self.latency) * self.smoothing
+            self.hit_rate += ((1.0 if hit else 0.0) - self.hit_rate) * self.smoothing
+            self.calls += 1
+
+    def decay(self, weight: float):
+        """统计向先验值回归，长时间未运行的检测器可以重新获得被选中的机会"""
+        with self.lock:
+            self.latency += (self.prior_latency - self.latency) * weight
+            self.hit_rate += (DETECTOR_PRIOR_HIT_RATE - self.hit_rate) * weight
+
+
+class Detector(ABC):
+    """检测器接口，子类实现 _detect()，需要时覆盖 available()"""
+
+    name = ""
+    accuracy = 1        # 精度等级，数值越大越准确
+    cost_hint = 0.05    # 尚无实测数据时假定的单次耗时（秒）
+
+    def __init__(self, components: Dict):
+        self.components = components
+        self.stats = DetectorStats(self.cost_hint)
+        self.perf_monitor = perf_monitor
+
+    def available(self) -> bool:
+        """检测器在当前环境下是否可用"""
+        return True
+
+    @abstractmethod
+    def _detect(self, frame, timestamp: Optional[float]) -> List[Detection]:
+        """运行一次检测，返回整个画面的检测结果"""
+
+    def detect(self, frame, timestamp: Optional[float] = None) -> List[Detection]:
+        """运行检测并记录耗时和命中情况"""
+        start = time.perf_counter()
+        try:
+            detections = self._detect(frame, timestamp)
+        except Exception as e:
+            print(f"检测器 {self.name} 错误: {e}")
+            self.perf_monitor.increment("errors", labels={'component': self.name})
+            detections = []
+
+        elapsed = time.perf_counter() - start
+        hit = bool(detections)
+        self.stats.record(elapsed, hit)
+        self.perf_monitor.record_latency(f"detector_{self.name}", elapsed)
+        self.perf_monitor.increment("detector_runs", labels={'detector': self.name, 'result': 'hit' if hit else 'miss'})
+        return detections
+
+    @property
+    def expected_latency(self) -> float:
+        """实测（或假定）的单次耗时"""
+        return self.stats.latency
+
+
+class DetectorRegistry:
+    """检测器注册表，按名称保存检测器工厂（检测模式见 detection_modes）"""
+
+    def __init__(self):
+        self.factories: Dict[str, Callable[[Dict], Detector]] = {}
+
+    def register(self, name: str, factory: Callable[[Dict], Detector]):
+        """注册检测器工厂"""
+        self.factories[name] = factory
+
+    def names(self) -> List[str]:
+        """已注册的检测器名称"""
+        return list(self.factories)
+
+    def create_all(self, components: Dict) -> Dict[str, Detector]:
+        """用共享组件（摄像头、SmolVLM客户端等）创建所有已注册的检测器"""
+        detectors = {}
+        for name, factory in self.factories.items():
+            try:
+                detectors[name] = factory(components)
+            except Exception as e:
+                print(f"创建检测器 {name} 失败: {e}")
+        return detectors
+
+
+detector_registry = DetectorRegistry()
+
+
+def register_detector(name: str):
+    """类装饰器：将检测器类注册到全局注册表"""
+    def decorator(cls):
+        cls.name = name
+        detector_registry.register(name, cls)
+        return cls
+    return decorator
+
+
+@register_detector("opencv")
+class OpenCVDetector(Detector):
+    """OpenCV Haar/HOG 检测器"""
+
+    accuracy = 1
+    cost_hint = 0.01
+
+    def available(self) -> bool:
+        return self.components['prefilter'].available
+
+    def _detect(self, frame, timestamp):
+        return self.components['prefilter'].detect(frame)
+
+
+@register_detector("mediapipe_face")
+class MediaPipeFaceDetector(Detector):
+    """MediaPipe 人脸检测器"""
+
+    accuracy = 2
+    cost_hint = 0.01
+
+    def available(self) -> bool:
+        return self.components['camera_handler'].face_detection is not None
+
+    def _detect(self, frame, timestamp):
+        faces = self.components['camera_handler'].detect_faces_with_mediapipe(frame)
+        return [face for face in faces if face.confidence >= MEDIAPIPE_ONLY_FACE_CONFIDENCE_THRESHOLD]
+
+
+@register_detector("mediapipe_pose")
+class MediaPipePoseDetector(Detector):
+    """MediaPipe 姿态检测器，输出包围可见关键点的检测框"""
+
+    accuracy = 2
+    cost_hint = 0.04
+
+    def available(self) -> bool:
+        return self.components['camera_handler'].pose_detection is not None
+
+    def _detect(self, frame, timestamp):
+        pose_data = self.components['camera_handler'].detect_pose_with_mediapipe(frame)
+        if not pose_data or pose_data.get('landmark_array') is None:
+            return []
+        detection = pose_detection(pose_data['landmark_array'], frame.shape, MEDIAPIPE_ONLY_MIN_POSE_LANDMARKS)
+        return [detection] if detection else []
+
+
+@register_detector("smolvlm")
+class SmolVLMDetector(Detector):
+    """SmolVLM 全画面人类活动检测器（结果经过坐标验证和平滑）"""
+
+    accuracy = 3
+    cost_hint = 2.0
+
+    def _detect(self, frame, timestamp):
+        camera_handler = self.components['camera_handler']
+        smolvlm_client = self.components['smolvlm_client']
+        coordinate_processor = self.components['coordinate_processor']
+
+        frame_data = camera_handler.encode_frame_as_jpeg(frame, downscale=SMOLVLM_IMAGE_DOWNSCALE)
+        if frame_data is None:
+            return []
+
+        # 更新坐标处理器的画布尺寸（与实际发送的图像尺寸一致）
+        image_height, image_width = as_pyramid(frame).scaled(SMOLVLM_IMAGE_DOWNSCALE).shape[:2]
+        coordinate_processor.canvas_width = image_width
+        coordinate_processor.canvas_height = image_height
+
+        # 发送到SmolVLM进行人类活动检测
+        response = smolvlm_client.detect_human_activity(
+            smolvlm_client.encode_image_to_base64(frame_data),
+            image_width,
+            image_height
+        )
+        if not response:
+            return []
+
+        return coordinate_processor.process_humans(response, timestamp)
+
+
+def expected_cascade_latency(stages: List[Detector]) -> float:
+    """级联的期望耗时：每个阶段只有在前面的阶段都命中时才会运行"""
+    total = 0.0
+    reach_probability = 1.0
+    for stage in stages:
+        total += reach_probability * stage.expected_latency
+        reach_probability *= stage.stats.hit_rate
+    return total
+
+
+def select_cascade(detectors: List[Detector], latency_budget: float,
+                   max_gate_stages: int = AUTO_MAX_GATE_STAGES) -> List[Detector]:
+    """选择满足延迟预算的级联
+
+    优先选择精度最高的最终阶段（精度相同时选实测命中率高的，再选耗时短的）；
+    对同一个最终阶段，先尝试单独运行，超出预算时再在前面加入更便宜的检测器作为过滤阶段
+    （加入的阶段越少越好）。都无法满足预算时使用最便宜的单个检测器。
+    """
+    available = [detector for detector in detectors if detector.available()]
+    if not available:
+        return []
+
+    for final in sorted(available, key=lambda d: (-d.accuracy, -d.stats.hit_rate, d.expected_latency)):
+        gates = [d for d in available if d is not final and d.expected_latency < final.expected_latency]
+        for gate_count in range(min(len(gates), max_gate_stages) + 1):
+            best, best_latency = None, None
+            for combo in combinations(gates, gate_count):
+                stages = sorted(combo, key=lambda d: d.expected_latency) + [final]
+                latency = expected_cascade_latency(stages)
+                if latency <= latency_budget and (best is None or latency < best_latency):
+                    best, best_latency = stages, latency
+            if best:
+                return best
+
+    return [min(available, key=lambda d: d.expected_latency)]
+
+
+class AutoCascade:
+    """自动模式：按实测耗时和命中率定期重新选择级联，前面的阶段未命中时提前结束
+
+    未选中的检测器不会随级联运行，为了让统计反映当前情况：预算内的检测器每隔
+    probe_interval 秒轮流试运行一次；超出预算的检测器在每次重新选择时向先验值回归。
+    """
+
+    def __init__(self, detectors: Dict[str, Detector], latency_budget: float = AUTO_LATENCY_BUDGET,
+                 replan_interval: float = AUTO_REPLAN_INTERVAL, probe_interval: float = AUTO_PROBE_INTERVAL,
+                 stats_decay: float = AUTO_STATS_DECAY):
+        self.detectors = detectors
+        self.latency_budget = latency_budget
+        self.replan_interval = replan_interval
+        self.probe_interval = probe_interval
+        self.stats_decay = stats_decay
+        self.stages: List[Detector] = []
+        self.last_plan_time = None
+        self.last_probe_time = None
+        self.last_probed: Dict[str, float] = {}  # 各检测器上次试运行的时间
+
+    def plan(self, timestamp: float) -> List[Detector]:
+        """必要时重新选择级联"""
+        if self.last_plan_time is None or timestamp - self.last_plan_time >= self.replan_interval:
+            if self.last_plan_time is not None:
+                for detector in self._unselected():
+                    if detector.expected_latency > self.latency_budget:
+                        detector.stats.decay(self.stats_decay)
+            stages = select_cascade(list(self.detectors.values()), self.latency_budget)
+            if [s.name for s in stages] != [s.name for s in self.stages]:
+                print(f"自动模式检测流程: {' → '.join(s.name for s in stages) or '无可用检测器'}")
+            self.stages = stages
+            self.last_plan_time = timestamp
+        return self.stages
+
+    def detect(self, frame, timestamp: Optional[float] = None) -> List[Detection]:
+        """按当前级联运行检测，返回最后一个阶段的结果"""
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        detections = []
+        for stage in self.plan(timestamp):
+            detections = stage.detect(frame, timestamp)
+            if not detections:
+                break
+
+        self._probe(frame, timestamp)
+        return detections
+
+    def _unselected(self) -> List[Detector]:
+        """可用但不在当前级联中的检测器"""
+        return [detector for detector in self.detectors.values()
+                if detector not in self.stages and detector.available()]
+
+    def _probe(self, frame, timestamp: float):
+        """到达试运行间隔时，在同一帧上运行最久未试运行的、预算内的未选中检测器"""
+        if self.last_probe_time is not None and timestamp - self.last_probe_time < self.probe_interval:
+            return
+        self.last_probe_time = timestamp
+
+        candidates = [detector for detector in self._unselected()
+                      if detector.expected_latency <= self.latency_budget]
+        if not candidates:
+            return
+
+        detector = min(candidates, key=lambda d: self.last_probed.get(d.name, float('-inf')))
+        self.last_probed[detector.name] = timestamp
+        detector.detect(frame, timestamp)  # 只更新统计，结果不使用
+
+    def reset(self):
+        """下次检测时重新选择级联"""
+        self.last_plan_time = None
+        self.last_probe_time = None
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+预览画面合成模块
+"""
+
+import math
+import cv2
+import numpy as np
+from typing import Optional, List, Tuple
+from config import *
+from detection import Detection
+from frame_pyramid import as_pyramid, as_bgr
+from performance_monitor import perf_monitor
+from detection_modes import mode_registry
+
+
+def _bgr_to_rgb_color(color: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    """BGR颜色转换为RGB颜色（预览画面在RGB图像上绘制）"""
+    return color[2], color[1], color[0]
+
+
+def blur_downscale_factor(sigma: float, min_scaled_sigma: float = CAMERA_BLUR_MIN_SCALED_SIGMA,
+                          max_factor: int = CAMERA_BLUR_MAX_DOWNSCALE) -> int:
+    """模糊前的缩小倍数：缩小后剩余的模糊半径不低于 min_scaled_sigma 的最大2的幂"""
+    factor = 1
+    while factor * 2 <= max_factor and sigma / (factor * 2) >= min_scaled_sigma:
+        factor *= 2
+    return factor
+
+
+def box_blur_size(sigma: float) -> int:
+    """三次盒式滤波近似标准差为 sigma 的高斯模糊时使用的（奇数）盒宽度"""
+    ideal_width = math.sqrt(4 * sigma * sigma + 1)
+    return 2 * int(round((ideal_width - 1) / 2)) + 1
+
+
+class DisplayCompositor:
+    """预览画面合成器，负责缩放、模糊和绘制检测结果
+
+    全程在RGB图像上处理：RGB图像取自帧预处理缓存（与MediaPipe共用，不再单独转换），
+    缩放和模糊直接写入预先分配的缓冲区，检测框和骨骼线原地绘制在缓冲区上。
+    """
+
+    def __init__(self, camera_handler, display_width: int = CAMERA_WIDTH,
+                 display_height: int = CAMERA_HEIGHT):
+        self.camera_handler = camera_handler
+        self.display_width = display_width
+        self.display_height = display_height
+        self.canvas = np.empty((display_height, display_width, 3), dtype=np.uint8)  # 输出缓冲区
+        self.background = np.empty_like(self.canvas)  # 缩放、模糊后的背景，同一帧重复显示时直接复用
+        self.background_key = None  # (源帧, 模糊度)，源帧不变时不重新计算背景
+        self.blur_buffers = {}  # 各尺寸下模糊用的两个中间缓冲区
+        self.pose_landmark_style = None  # 转换为RGB颜色的姿态关键点绘制样式
+
+    def compose(self, frame, mode: str, blur_level: float,
+                detected_humans: List[Detection], mediapipe_faces: List[Detection],
+                pose_data: Optional[dict], hud_lines: Optional[List[str]] = None) -> np.ndarray:
+        """合成一帧预览画面，返回RGB图像；frame 可以是BGR图像或 FramePyramid
+
+        返回值是合成器内部的缓冲区，下一次调用 compose 时会被覆盖。
+        """
+        # 缩放（尺寸不变时跳过）和模糊（仅影响背景，不影响检测框），同一帧只计算一次
+        canvas = self.canvas
+        np.copyto(canvas, self._get_background(frame, blur_level))
+
+        # 在模糊后的图像上绘制清晰的检测结果（检测框为归一化坐标，按显示尺寸直接换算）
+        detection_mode = mode_registry.get(mode)
+        if detection_mode is not None:
+            if detection_mode.overlay == "mediapipe":
+                # MediaPipe独立模式：绘制人脸和姿态
+                if mediapipe_faces:
+                    self._draw_boxes(canvas, mediapipe_faces, color=detection_mode.box_color, thickness=2)
+            elif detected_humans:
+                # 其他模式：绘制检测结果（颜色由模式决定，BGR格式）
+                self._draw_boxes(canvas, detected_humans, color=detection_mode.box_color, thickness=2)
+
+            if detection_mode.overlay == "combined" and mediapipe_faces:
+                # 显示MediaPipe辅助检测结果（较细的绿色框）
+                self._draw_boxes(canvas, mediapipe_faces, color=(0, 255, 0), thickness=1)  # 绿色
+
+            # 姿态检测
+            if detection_mode.overlay != "detections" and pose_data and pose_data.get('landmarks'):
+                self._draw_pose_landmarks(canvas, pose_data)
+
+        # 性能信息叠加层
+        if hud_lines:
+            self.camera_handler.draw_performance_hud(canvas, hud_lines)
+
+        return canvas
+
+    def _get_background(self, frame, blur_level: float) -> np.ndarray:
+        """缩放、模糊后的背景画面，源帧和模糊度都未变化时直接返回上一次的结果"""
+        key = (as_bgr(frame), blur_level)
+        if self.background_key is not None and self.background_key[0] is key[0] and self.background_key[1] == blur_level:
+            perf_monitor.record_cache("background", True)
+            return self.background
+
+        pyramid = as_pyramid(frame)
+        display_size = (self.display_width, self.display_height)
+        frame_height, frame_width = pyramid.shape[:2]
+
+        if blur_level <= 0:
+            # 不模糊：尺寸相同时直接使用RGB图像（取自帧预处理缓存，与MediaPipe共用）
+            if (frame_width, frame_height) == display_size:
+                self.background_key = None
+                return pyramid.rgb()
+            interpolation = cv2.INTER_AREA if frame_width > self.display_width else cv2.INTER_LINEAR
+            cv2.resize(pyramid.rgb(), display_size, dst=self.background, interpolation=interpolation)
+
+        else:
+            # 大半径模糊：在帧预处理缓存的缩小图上用小半径模糊，再放大到显示尺寸，
+            # 缩小和放大本身也有平滑作用，视觉上与全尺寸模糊几乎没有差别
+            factor = blur_downscale_factor(blur_level)
+            source = pyramid.rgb(factor)
+            blurred = self._box_blur(source, blur_level / factor)
+            if blurred.shape[1::-1] == display_size:
+                np.copyto(self.background, blurred)
+            else:
+                cv2.resize(blurred, display_size, dst=self.background, interpolation=cv2.INTER_LINEAR)
+
+        perf_monitor.record_cache("background", False)
+        self.background_key = key
+        return self.background
+
+    def _box_blur(self, source: np.ndarray, sigma: float) -> np.ndarray:
+        """与PIL GaussianBlur相同，用三次盒式滤波近似高斯模糊（sigma 即PIL的radius），
+        耗时与模糊程度无关；结果写入按尺寸复用的缓冲区"""
+        buffers = self.blur_buffers.get(source.shape)
+        if buffers is None:
+            buffers = (np.empty_like(source), np.empty_like(source))
+            self.blur_buffers[source.shape] = buffers
+        first, second = buffers
+
+        size = (box_blur_size(sigma),) * 2
+        cv2.blur(source, size, dst=first)
+        cv2.blur(first, size, dst=second)
+        cv2.blur(second, size, dst=first)
+        return first
+
+    def _draw_boxes(self, canvas: np.ndarray, detections: List[Detection],
+                    color: Tuple[int, int, int], thickness: int):
+        """在缓冲区上原地绘制检测框，color 为BGR格式"""
+        self.camera_handler.draw_face_boxes(
+            canvas, detections, color=_bgr_to_rgb_color(color), thickness=thickness, in_place=True
+        )
+
+    def _draw_pose_landmarks(self, frame, pose_data):
+        """在缩放后的帧上原地绘制姿态关键点"""
+        if not pose_data or not pose_data.get('landmarks'):
+            return frame
+
+        try:
+            # MediaPipe坐标是相对的(0-1)，直接绘制即可
+            camera_handler = self.camera_handler
+            if camera_handler.mp_drawing and camera_handler.mp_drawing_styles and camera_handler.mp_pose:
+                camera_handler.mp_drawing.draw_landmarks(
+                    frame,
+                    pose_data['landmarks'],
+                    camera_handler.mp_pose.POSE_CONNECTIONS,
+                    landmark_drawing_spec=self._get_pose_landmark_style()
+                )
+
+        except Exception as e:
+            print(f"绘制姿态关键点错误: {e}")
+
+        return frame
+
+    def _get_pose_landmark_style(self):
+        """MediaPipe默认姿态样式的颜色是BGR格式，转换为RGB后缓存"""
+        if self.pose_landmark_style is None:
+            drawing = self.camera_handler.mp_drawing
+            default_style = self.camera_handler.mp_drawing_styles.get_default_pose_landmarks_style()
+            self.pose_landmark_style = {
+                landmark: drawing.DrawingSpec(
+                    color=_bgr_to_rgb_color(spec.color),
+                    thickness=spec.thickness,
+                    circle_radius=spec.circle_radius
+                )
+                for landmark, spec in default_style.items()
+            }
+        return self.pose_landmark_style
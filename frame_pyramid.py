@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+帧预处理缓存模块
+每帧只保存一份原始BGR图像，RGB、灰度图和1/2、1/4缩小图在第一次使用时计算并缓存，
+检测器、编码器和预览画面共享同一份结果，每种转换每帧最多计算一次
+"""
+
+import threading
+import cv2
+import numpy as np
+from typing import Dict, Optional, Tuple
+from performance_monitor import perf_monitor
+
+# 颜色空间 -> 从BGR转换的OpenCV代码（BGR本身不需要转换）
+_COLOR_CONVERSIONS = {
+    'bgr': None,
+    'rgb': cv2.COLOR_BGR2RGB,
+    'gray': cv2.COLOR_BGR2GRAY,
+}
+
+
+class FramePyramid:
+    """单帧的预处理结果缓存
+
+    缓存的图像在多个线程间共享，均被设为只读，调用方需要修改时应先复制。
+    """
+
+    __slots__ = ('bgr', 'seq', '_cache', '_lock', '_parent', '_parent_box')
+
+    def __init__(self, bgr: np.ndarray, seq: Optional[int] = None,
+                 parent: Optional['FramePyramid'] = None,
+                 parent_box: Optional[Tuple[int, int, int, int]] = None):
+        self.bgr = bgr
+        self.seq = seq
+        self._cache: Dict[Tuple[str, int], np.ndarray] = {('bgr', 1): bgr}
+        self._lock = threading.Lock()
+        self._parent = parent          # 裁剪区域所属的整帧
+        self._parent_box = parent_box  # 在整帧中的像素区域 (x1, y1, x2, y2)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """原始BGR图像的形状，与 np.ndarray.shape 一致"""
+        return self.bgr.shape
+
+    def get(self, color: str = 'bgr', factor: int = 1) -> np.ndarray:
+        """获取指定颜色空间、缩小 factor 倍的图像（factor 为1、2、4等2的幂）"""
+        if color not in _COLOR_CONVERSIONS:
+            raise ValueError(f"未知的颜色空间: {color}")
+        if factor < 1 or factor & (factor - 1):
+            raise ValueError(f"缩小倍数必须是2的幂: {factor}")
+
+        key = (color, factor)
+        with self._lock:
+            image = self._cache.get(key)
+            hit = image is not None
+            if not hit:
+                image = self._compute(color, factor)
+                image.flags.writeable = False
+                self._cache[key] = image
+        perf_monitor.record_cache("frame", hit)
+        return image
+
+    def rgb(self, factor: int = 1) -> np.ndarray:
+        """RGB图像（MediaPipe、预览画面使用）"""
+        return self.get('rgb', factor)
+
+    def gray(self, factor: int = 1) -> np.ndarray:
+        """灰度图像（OpenCV预筛选使用）"""
+        return self.get('gray', factor)
+
+    def scaled(self, factor: int) -> np.ndarray:
+        """缩小后的BGR图像（JPEG编码使用）"""
+        return self.get('bgr', factor)
+
+    def crop(self, pixel_box: Tuple[int, int, int, int]) -> 'FramePyramid':
+        """裁剪出局部区域，区域的原尺寸RGB/灰度图直接取自整帧的缓存结果"""
+        x1, y1, x2, y2 = pixel_box
+        return FramePyramid(self.bgr[y1:y2, x1:x2], self.seq, parent=self, parent_box=pixel_box)
+
+    def _compute(self, color: str, factor: int) -> np.ndarray:
+        """计算一张派生图像（调用时已持有锁）"""
+        if factor == 1:
+            if self._parent is not None:
+                x1, y1, x2, y2 = self._parent_box
+                # MediaPipe需要内存连续的图像，裁剪视图复制一次（比重新转换颜色空间便宜）
+                return np.ascontiguousarray(self._parent.get(color)[y1:y2, x1:x2])
+            return cv2.cvtColor(self.bgr, _COLOR_CONVERSIONS[color])
+
+        # 逐级缩小：1/4 由 1/2 计算，1/2 由原尺寸计算
+        larger = self._cache.get((color, factor // 2))
+        if larger is None:
+            larger = self._compute(color, factor // 2)
+            larger.flags.writeable = False
+            self._cache[(color, factor // 2)] = larger
+        height, width = larger.shape[:2]
+        return cv2.resize(larger, (max(1, width // 2), max(1, height // 2)), interpolation=cv2.INTER_AREA)
+
+
+def as_pyramid(frame) -> FramePyramid:
+    """将BGR图像包装为 FramePyramid，已经是 FramePyramid 时原样返回"""
+    if isinstance(frame, FramePyramid):
+        return frame
+    return FramePyramid(frame)
+
+
+def as_bgr(frame) -> np.ndarray:
+    """取出原始BGR图像"""
+    if isinstance(frame, FramePyramid):
+        return frame.bgr
+    return frame
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+守护动作执行模块
+在独立线程中执行最小化窗口等守护动作，检测线程只提交请求、不等待窗口操作完成。
+执行期间收到的多次请求合并为一次，冷却时间内的请求直接丢弃。
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+from config import *
+from performance_monitor import perf_monitor
+
+
+class GuardActionExecutor:
+    """守护动作执行器（单个工作线程 + 只保存最新请求的合并队列）"""
+
+    def __init__(self, action: Callable[[int], bool], cooldown: float = GUARD_ACTION_COOLDOWN,
+                 on_result: Optional[Callable[[int, bool], None]] = None):
+        """
+        action: 对指定PID执行守护动作，成功返回True
+        on_result: 每次执行完成后在工作线程中回调 (pid, success)
+        """
+        self.action = action
+        self.cooldown = cooldown
+        self.on_result = on_result
+        self.pending_pid = None  # 等待执行的目标PID，新请求直接覆盖
+        self.pending_time = None  # 合并的请求中第一个请求的提交时间（time.monotonic）
+        self.last_hide_latency = None  # 上次成功执行时从提交请求到完成的耗时（秒）
+        self.last_success_time = None  # 上次成功执行的时间（time.monotonic）
+        self.condition = threading.Condition()
+        self.worker = None
+        self.running = False
+        self.perf_monitor = perf_monitor
+
+    def start(self):
+        """启动工作线程"""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def stop(self, timeout: float = 2.0):
+        """停止工作线程，丢弃尚未执行的请求"""
+        with self.condition:
+            self.running = False
+            self.pending_pid = None
+            self.pending_time = None
+            self.condition.notify_all()
+        if self.worker and self.worker is not threading.current_thread():
+            self.worker.join(timeout=timeout)
+        self.worker = None
+
+    def submit(self, pid: int) -> bool:
+        """提交守护请求，立即返回；返回False表示请求因冷却被丢弃"""
+        with self.condition:
+            remaining = self.cooldown_remaining()
+            if remaining > 0:
+                print(f"守护动作冷却中，剩余 {remaining:.1f} 秒")
+                self.perf_monitor.increment("cooldown_suppressions")
+                return False
+
+            if self.pending_pid is not None:
+                # 上一个请求还没有执行，合并为一次（隐藏耗时从第一个请求算起）
+                self.perf_monitor.increment("guard_coalesced")
+            else:
+                self.pending_time = time.monotonic()
+            self.pending_pid = pid
+            self.condition.notify()
+        return True
+
+    def cooldown_remaining(self) -> float:
+        """距离冷却结束的剩余秒数"""
+        if self.last_success_time is None:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.last_success_time))
+
+    def reset(self):
+        """清除冷却状态和尚未执行的请求"""
+        with self.condition:
+            self.pending_pid = None
+            self.pending_time = None
+            self.last_success_time = None
+
+    def _run(self):
+        """工作线程：取出最新的请求并执行"""
+        while True:
+            with self.condition:
+                while self.running and self.pending_pid is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                pid = self.pending_pid
+                submit_time = self.pending_time
+                self.pending_pid = None
+                self.pending_time = None
+
+                # 等待期间进入冷却（上一次执行刚成功）的请求直接丢弃
+                if self.cooldown_remaining() > 0:
+                    self.perf_monitor.increment("cooldown_suppressions")
+                    continue
+
+            print(f"触发守护动作 - 目标进程PID: {pid}")
+            self.perf_monitor.increment("guard_triggers")
+            success = False
+            try:
+                with self.perf_monitor.measure("guard_action"):
+                    success = bool(self.action(pid))
+            except Exception as e:
+                print(f"执行守护动作错误: {e}")
+                self.perf_monitor.increment("errors", labels={'component': 'guard'})
+
+            if success:
+                # 隐藏耗时：从检测线程提交请求到窗口最小化完成
+                hide_latency = time.monotonic() - submit_time
+                self.last_hide_latency = hide_latency
+                self.perf_monitor.record_latency("guard_hide", hide_latency)
+                print(f"守护动作完成，隐藏耗时 {hide_latency * 1000:.0f} ms")
+
+                with self.condition:
+                    self.last_success_time = time.monotonic()
+                    # 执行期间积累的请求属于同一次触发
+                    if self.pending_pid is not None:
+                        self.pending_pid = None
+                        self.perf_monitor.increment("cooldown_suppressions")
+
+            if self.on_result:
+                try:
+                    self.on_result(pid, success)
+                except Exception as e:
+                    print(f"守护动作回调错误: {e}")
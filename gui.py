@@ -6,9 +6,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import customtkinter as ctk
-import cv2
 import numpy as np
-from PIL import Image, ImageTk, ImageFilter
+from PIL import Image, ImageTk
 import threading
 import time
 from typing import Optional, List, Dict
@@ -20,7 +19,19 @@ from camera_handler import CameraHandler
 from smolvlm_client import SmolVLMClient
 from process_manager import ProcessManager
 from coordinate_processor import CoordinateProcessor
+from tracker import MultiObjectTracker
+from roi_tracking import RoiScheduler
+from prefilter import OpenCVPreFilter
+from detectors import detector_registry
+from detection_modes import mode_registry
+from detection_strategies import DetectionContext
+from guard_executor import GuardActionExecutor
+from process_watcher import GuardTarget
+from process_list import ProcessListModel, format_process
 from audio_manager import AudioManager
+from performance_monitor import perf_monitor
+from metrics_server import MetricsServer
+from display_compositor import DisplayCompositor
 
 
 class MySoloKeeperGUI:
@@ -50,7 +61,25 @@ class MySoloKeeperGUI:
         self.smolvlm_client = SmolVLMClient()
         self.process_manager = ProcessManager()
         self.coordinate_processor = CoordinateProcessor(CAMERA_WIDTH, CAMERA_HEIGHT)
+        self.tracker = MultiObjectTracker()
+        self.roi_scheduler = RoiScheduler()
+        self.prefilter = OpenCVPreFilter()
+
+        # 检测器注册表：各检测阶段共享上面的组件，检测模式的检测函数按模式键从 mode_registry 查找
+        components = {
+            'camera_handler': self.camera_handler,
+            'smolvlm_client': self.smolvlm_client,
+            'coordinate_processor': self.coordinate_processor,
+            'prefilter': self.prefilter,
+            'tracker': self.tracker,
+            'roi_scheduler': self.roi_scheduler,
+        }
+        self.detectors = detector_registry.create_all(components)
+        self.detection_context = DetectionContext(components, self.detectors)
         self.audio_manager = AudioManager()
+        self.display_compositor = DisplayCompositor(self.camera_handler)
+        self.perf_monitor = perf_monitor
+        self.metrics_server = MetricsServer(self.perf_monitor) if METRICS_ENABLED else None
 
         # 设置调试回调
         self.smolvlm_client.set_debug_callback(self._on_api_debug)
@@ -62,9 +91,27 @@ class MySoloKeeperGUI:
         self.current_frame = None
         self.detected_humans = []  # 检测到的人类活动
         self.detected_faces = []   # 保持向后兼容
+        self.preview_pose_data = None  # 预览骨骼线使用的上一次姿态检测结果
+        self.preview_pose_time = None
+        self.camera_photo = None  # 预览画面的PhotoImage，每帧通过 paste() 更新
+        self.display_after_id = None  # 下一次预览刷新的 after 任务
+        self.last_render_key = None  # 上一次渲染的 (帧序号, 检测模式, 模糊度)，未变化时不重新渲染
+        self.preview_visible = True  # 窗口最小化或隐藏时暂停预览
         self.selected_process_pid = None
-        self.last_guard_action_time = 0  # 上次触发守护动作的时间
-        self.guard_action_cooldown = 3.0  # 守护动作冷却时间（秒）
+        # 守护动作在独立线程中执行，检测线程只提交请求（冷却和合并由执行器处理）
+        self.guard_executor = GuardActionExecutor(
+            self._run_guard_action,
+            on_result=self._on_guard_action_done
+        )
+        self.guard_executor.start()
+        self.process_manager.start_window_index_refresh()
+        self.process_manager.on_monitored_change = self._on_monitored_processes_changed
+
+        # 进程列表：增量更新，滚动到底部附近时才插入后面的行
+        self.process_list = ProcessListModel()
+        self.process_rows_rendered = 0  # 已插入列表框的行数（模型中的前N行）
+        self.process_render_after_id = None
+        self.process_refresh_running = False
 
         # GUI变量
         self.detection_interval = tk.DoubleVar(value=DEFAULT_INTERVAL)
@@ -74,7 +121,9 @@ class MySoloKeeperGUI:
         self.debug_expanded = tk.BooleanVar(value=False)
         self.detection_mode = tk.StringVar(value=DETECTION_MODES[DEFAULT_DETECTION_MODE])  # 使用中文显示名称
         self.current_mode_key = DEFAULT_DETECTION_MODE  # 存储实际的模式键
+        self.guard_target_mode = tk.StringVar(value=GUARD_TARGET_MODES[DEFAULT_GUARD_TARGET_MODE])  # 守护范围（中文显示名称）
         self.camera_blur_level = tk.DoubleVar(value=CAMERA_BLUR_DEFAULT)  # 摄像头模糊度
+        self.show_performance_hud = tk.BooleanVar(value=SHOW_PERFORMANCE_HUD)  # 性能信息叠加层
 
         # 调试信息存储
         self.debug_history = []
@@ -90,6 +139,8 @@ class MySoloKeeperGUI:
 
         # 绑定事件
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.root.bind("<Unmap>", self.on_window_unmap, add="+")
+        self.root.bind("<Map>", self.on_window_map, add="+")
 
         # 初始化摄像头
         self.initialize_camera()
@@ -97,6 +148,10 @@ class MySoloKeeperGUI:
         # 初始化模式状态
         self.update_mode_status()
 
+        # 启动本地指标端点（可选）
+        if self.metrics_server:
+            self.metrics_server.start()
+
         # 设置初始化完成状态
         self.root.after(1000, lambda: self.update_status("MySoloKeeper 就绪"))
 
@@ -203,12 +258,25 @@ class MySoloKeeperGUI:
             font=("Microsoft YaHei", 9)
         )
         self.process_scrollbar = ttk.Scrollbar(self.listbox_frame, orient="vertical")
-        self.process_listbox.config(yscrollcommand=self.process_scrollbar.set)
+        self.process_listbox.config(yscrollcommand=self._on_process_list_scroll)
         self.process_scrollbar.config(command=self.process_listbox.yview)
 
         # 绑定双击事件
         self.process_listbox.bind("<Double-Button-1>", self.on_process_double_click)
 
+        # 守护范围：单个进程 / 进程树 / 同名进程（可使用通配符）
+        self.guard_target_frame = ctk.CTkFrame(self.process_frame)
+        self.guard_target_menu = ctk.CTkOptionMenu(
+            self.guard_target_frame,
+            variable=self.guard_target_mode,
+            values=list(GUARD_TARGET_MODES.values()),
+            width=150
+        )
+        self.guard_pattern_entry = ctk.CTkEntry(
+            self.guard_target_frame,
+            placeholder_text="进程名通配符（同名模式）"
+        )
+
         # 进程控制按钮
         self.process_controls = ctk.CTkFrame(self.process_frame)
         self.refresh_processes_btn = ctk.CTkButton(
@@ -269,6 +337,12 @@ class MySoloKeeperGUI:
             variable=self.enable_audio_alert
         )
 
+        self.performance_hud_toggle = ctk.CTkSwitch(
+            self.other_settings_frame,
+            text="显示性能信息",
+            variable=self.show_performance_hud
+        )
+
         # 测试按钮
         self.test_audio_btn = ctk.CTkButton(
             self.other_settings_frame,
@@ -436,6 +510,11 @@ class MySoloKeeperGUI:
         self.process_listbox.pack(side="left", fill="both", expand=True)
         self.process_scrollbar.pack(side="right", fill="y")
 
+        # 守护范围
+        self.guard_target_frame.pack(fill="x", padx=10, pady=5)
+        self.guard_target_menu.pack(side="left", padx=(0, 5))
+        self.guard_pattern_entry.pack(side="left", fill="x", expand=True, padx=(5, 0))
+
         # 进程控制按钮
         self.process_controls.pack(fill="x", padx=10, pady=5)
         self.refresh_processes_btn.pack(side="left", padx=(0, 5))
@@ -459,6 +538,7 @@ class MySoloKeeperGUI:
         # 其他设置
         self.other_settings_frame.pack(fill="x", padx=10, pady=5)
         self.audio_alert_toggle.pack(pady=2)
+        self.performance_hud_toggle.pack(pady=2)
         self.test_audio_btn.pack(pady=5)
 
         # 调试区域
@@ -574,10 +654,10 @@ class MySoloKeeperGUI:
 
     def update_mode_status(self):
         """更新模式状态显示"""
-        current_mode = self.current_mode_key
+        detection_mode = mode_registry.get(self.current_mode_key)
 
         # 更新MediaPipe状态
-        if current_mode in ["MEDIAPIPE_ONLY", "HYBRID"]:
+        if detection_mode and detection_mode.uses_mediapipe:
             if hasattr(self.camera_handler, 'face_detection') and self.camera_handler.face_detection:
                 self.mediapipe_status_label.configure(
                     text="MediaPipe: 就绪",
@@ -595,7 +675,7 @@ class MySoloKeeperGUI:
             )
 
         # 更新SmolVLM状态
-        if current_mode in ["SMOLVLM_ONLY", "HYBRID"]:
+        if detection_mode and detection_mode.uses_smolvlm:
             # 测试SmolVLM连接
             self.test_smolvlm_connection_for_status()
         else:
@@ -628,7 +708,8 @@ class MySoloKeeperGUI:
         self.detection_thread.start()
 
         # 启动摄像头显示更新
-        self.update_camera_display()
+        self.last_render_key = None
+        self.schedule_camera_display(0)
 
         self.update_status("人类活动检测已开始")
 
@@ -642,385 +723,245 @@ class MySoloKeeperGUI:
             fg_color=COLORS["success"]
         )
 
+        self.cancel_camera_display()
         self.camera_label.configure(image="", text="摄像头已停止")
+        self.camera_photo = None
         self.coordinate_processor.reset()
+        self.tracker.reset()
+        self.prefilter.reset()
+        self.detection_context.reset()
+        self.preview_pose_data = None
+        self.preview_pose_time = None
 
         self.update_status("人类活动检测已停止")
 
     def detection_loop(self):
         """检测循环"""
+        last_frame_seq = -1
+
         while self.is_detecting:
             try:
                 current_mode = self.current_mode_key
                 humans = []
 
-                # 获取当前帧
-                current_frame = self.camera_handler.get_current_frame()
+                # 获取当前帧（各检测器共享同一份预处理缓存，颜色转换和缩放每帧只计算一次）
+                current_frame = self.camera_handler.get_current_pyramid()
+                frame_time = time.monotonic()
                 if current_frame is None:
                     time.sleep(0.1)
                     continue
+                frame_seq = current_frame.seq
+
+                # 统计重复处理同一帧的次数（摄像头跟不上检测节奏）
+                if frame_seq == last_frame_seq:
+                    self.perf_monitor.increment("stale_frames")
+                last_frame_seq = frame_seq
+                self.perf_monitor.tick("detection")
 
                 # 根据检测模式执行不同的检测逻辑
-                if current_mode == "MEDIAPIPE_ONLY":
-                    # 仅使用MediaPipe检测
-                    humans = self.detect_with_mediapipe_only(current_frame)
+                detection_mode = mode_registry.get(current_mode)
+                if detection_mode is None:
+                    humans = []
 
-                elif current_mode == "SMOLVLM_ONLY":
-                    # 仅使用SmolVLM检测
-                    humans = self.detect_with_smolvlm_only(current_frame)
+                elif (PREFILTER_ENABLED and not detection_mode.runs_prefilter and
+                      not self.prefilter.should_run_downstream(current_frame, frame_time, bool(self.detected_humans))):
+                    # 预筛选未检测到目标，跳过后续检测器（模式本身包含OpenCV检测器时不重复预筛选）
+                    humans = []
 
-                elif current_mode == "HYBRID":
-                    # 混合模式：SmolVLM + MediaPipe验证
-                    humans = self.detect_with_hybrid_mode(current_frame)
+                else:
+                    humans = detection_mode.strategy(self.detection_context, current_frame, frame_time)
 
                 self.detected_humans = humans
                 self.detected_faces = humans  # 保持向后兼容
 
+                # 更新跟踪器，显示线程在两次检测之间使用预测位置
+                # 使用帧采集时间而不是检测完成时间，SmolVLM推理延迟不影响速度估计
+                self.tracker.update(humans, frame_time)
+
                 # 如果启用守护且检测到人类活动
                 if self.is_guarding and humans and self.selected_process_pid:
                     self.trigger_guard_action()
 
                 # 等待指定间隔
-                time.sleep(self.detection_interval.get())
+                interval = self.detection_interval.get()
+                self.perf_monitor.set_gauge("detection_interval", interval)
+                time.sleep(interval)
 
             except Exception as e:
                 print(f"检测循环错误: {e}")
+                self.perf_monitor.increment("errors", labels={'component': 'detection_loop'})
                 time.sleep(1.0)
 
-    def detect_with_mediapipe_only(self, frame):
-        """仅使用MediaPipe进行检测"""
-        try:
-            # 人脸检测
-            faces = self.camera_handler.detect_faces_with_mediapipe(frame)
-
-            # 姿态检测
-            pose_data = self.camera_handler.detect_pose_with_mediapipe(frame)
-
-            humans = []
-            face_detected = False
-            pose_detected = False
-
-            # 处理人脸检测结果，应用置信度阈值
-            for face in faces:
-                if face['confidence'] >= MEDIAPIPE_ONLY_FACE_CONFIDENCE_THRESHOLD:
-                    humans.append({
-                        'x': face['x'],
-                        'y': face['y'],
-                        'width': face['width'],
-                        'height': face['height'],
-                        'confidence': face['confidence'],
-                        'source': 'mediapipe_face'
-                    })
-                    face_detected = True
-
-            # 处理姿态检测结果，应用可见度阈值
-            if pose_data and pose_data.get('landmarks'):
-                # 计算可见关键点数量
-                visible_landmarks = 0
-                for landmark in pose_data['landmarks'].landmark:
-                    if landmark.visibility > MEDIAPIPE_ONLY_POSE_VISIBILITY_THRESHOLD:
-                        visible_landmarks += 1
-
-                # 如果可见关键点足够多，添加姿态区域
-                if visible_landmarks >= MEDIAPIPE_ONLY_MIN_POSE_LANDMARKS:
-                    pose_box = self._get_pose_bounding_box(pose_data['landmarks'], frame.shape)
-                    if pose_box:
-                        humans.append({
-                            'x': pose_box['x'],
-                            'y': pose_box['y'],
-                            'width': pose_box['width'],
-                            'height': pose_box['height'],
-                            'confidence': min(0.9, visible_landmarks / 20.0),  # 基于可见关键点数量的置信度
-                            'source': 'mediapipe_pose'
-                        })
-                        pose_detected = True
-
-            # 根据配置决定是否需要同时检测到人脸和姿态
-            if MEDIAPIPE_ONLY_REQUIRE_BOTH:
-                if not (face_detected and pose_detected):
-                    return []  # 需要同时检测到才返回结果
-
-            # 打印检测状态（用于调试）
-            if humans:
-                detection_info = []
-                if face_detected:
-                    detection_info.append("人脸")
-                if pose_detected:
-                    detection_info.append("姿态")
-                print(f"MediaPipe独立检测触发: {', '.join(detection_info)}")
-
-            return humans
-
-        except Exception as e:
-            print(f"MediaPipe独立检测错误: {e}")
-            return []
-
-    def detect_with_smolvlm_only(self, frame):
-        """仅使用SmolVLM进行检测"""
-        try:
-            # 捕获当前帧数据
-            frame_data = self.camera_handler.capture_frame_as_jpeg()
-            if frame_data is None:
-                return []
-
-            # 获取实际图像尺寸
-            image_width, image_height = self.smolvlm_client.get_image_dimensions_from_data(frame_data)
-
-            # 更新坐标处理器的画布尺寸
-            self.coordinate_processor.canvas_width = image_width
-            self.coordinate_processor.canvas_height = image_height
-
-            # 编码为base64
-            image_base64_url = self.smolvlm_client.encode_image_to_base64(frame_data)
-
-            # 发送到SmolVLM进行人类活动检测
-            response = self.smolvlm_client.detect_human_activity(
-                image_base64_url,
-                image_width,
-                image_height
-            )
-
-            if response:
-                # 处理SmolVLM检测结果
-                humans = self.coordinate_processor.process_humans(response)
-                for human in humans:
-                    human['source'] = 'smolvlm'
-                return humans
-
-            return []
-
-        except Exception as e:
-            print(f"SmolVLM检测错误: {e}")
-            return []
-
-    def detect_with_hybrid_mode(self, frame):
-        """混合模式：SmolVLM + MediaPipe验证"""
-        try:
-            # 首先使用SmolVLM检测
-            smolvlm_humans = self.detect_with_smolvlm_only(frame)
-
-            if not smolvlm_humans:
-                return []
+    def schedule_camera_display(self, delay: int = 50):
+        """安排下一次预览刷新（已安排时不重复安排）"""
+        if self.display_after_id is None:
+            self.display_after_id = self.root.after(delay, self.update_camera_display)
 
-            # 使用MediaPipe进行验证和增强
-            enhanced_humans = self.enhance_detection_with_mediapipe(frame, smolvlm_humans)
+    def cancel_camera_display(self):
+        """取消已安排的预览刷新"""
+        if self.display_after_id is not None:
+            self.root.after_cancel(self.display_after_id)
+            self.display_after_id = None
 
-            for human in enhanced_humans:
-                human['source'] = 'hybrid'
-
-            return enhanced_humans
-
-        except Exception as e:
-            print(f"混合模式检测错误: {e}")
-            return []
-
-    def _get_pose_bounding_box(self, landmarks, frame_shape):
-        """从姿态关键点计算边界框"""
-        try:
-            h, w = frame_shape[:2]
-
-            # 获取所有可见关键点的坐标
-            x_coords = []
-            y_coords = []
-
-            for landmark in landmarks.landmark:
-                if landmark.visibility > 0.5:  # 只考虑可见度高的关键点
-                    x_coords.append(int(landmark.x * w))
-                    y_coords.append(int(landmark.y * h))
-
-            if len(x_coords) < 3:  # 至少需要3个关键点
-                return None
-
-            # 计算边界框
-            x_min = max(0, min(x_coords))
-            y_min = max(0, min(y_coords))
-            x_max = min(w, max(x_coords))
-            y_max = min(h, max(y_coords))
-
-            # 添加一些边距
-            margin = 20
-            x_min = max(0, x_min - margin)
-            y_min = max(0, y_min - margin)
-            x_max = min(w, x_max + margin)
-            y_max = min(h, y_max + margin)
-
-            return {
-                'x': x_min,
-                'y': y_min,
-                'width': x_max - x_min,
-                'height': y_max - y_min
-            }
+    def on_window_unmap(self, event):
+        """窗口最小化或隐藏时暂停预览刷新，检测和守护不受影响"""
+        if event.widget is not self.root:
+            return
+        self.preview_visible = False
+        self.cancel_camera_display()
 
-        except Exception as e:
-            print(f"计算姿态边界框错误: {e}")
-            return None
+    def on_window_map(self, event):
+        """窗口恢复显示时继续预览刷新"""
+        if event.widget is not self.root:
+            return
+        self.preview_visible = True
+        self.last_render_key = None
+        if self.is_detecting:
+            self.schedule_camera_display(0)
 
     def update_camera_display(self):
-        """更新摄像头显示"""
+        """更新摄像头显示，只在有新帧（或模式、模糊度变化）时重新渲染"""
+        self.display_after_id = None
         if not self.is_detecting:
             return
 
+        # 窗口不可见时停止刷新，恢复显示时由 on_window_map 重新开始
+        if not self.preview_visible or self.root.state() == "iconic":
+            return
+
         try:
-            frame = self.camera_handler.get_current_frame()
-            if frame is not None:
-                current_mode = self.current_mode_key
+            frame = self.camera_handler.get_current_pyramid()
+            current_mode = self.current_mode_key
+            blur_level = self.camera_blur_level.get()
+            render_key = (frame.seq, current_mode, blur_level) if frame is not None else None
+            if frame is not None and render_key != self.last_render_key:
+                self.last_render_key = render_key
+                self.perf_monitor.tick("display")
 
                 # 获取检测数据（不在原始帧上绘制）
                 mediapipe_faces = []
                 pose_data = None
 
-                if current_mode in ["MEDIAPIPE_ONLY", "HYBRID"]:
-                    # 获取MediaPipe检测数据
+                detection_mode = mode_registry.get(current_mode)
+                if detection_mode and detection_mode.uses_mediapipe:
+                    # 获取MediaPipe检测数据（姿态检测较慢，骨骼线按刷新间隔更新）
                     mediapipe_faces = self.camera_handler.detect_faces_with_mediapipe(frame)
-                    pose_data = self.camera_handler.detect_pose_with_mediapipe(frame)
-
-                # 转换为PIL图像
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                pil_image = Image.fromarray(frame_rgb)
-
-                # 调整图像大小以适应显示区域
-                display_width = CAMERA_WIDTH
-                display_height = CAMERA_HEIGHT
-                pil_image = pil_image.resize((display_width, display_height), Image.Resampling.LANCZOS)
-
-                # 应用模糊效果（仅影响背景，不影响检测框）
-                blur_level = self.camera_blur_level.get()
-                if blur_level > 0:
-                    pil_image = pil_image.filter(ImageFilter.GaussianBlur(radius=blur_level))
-
-                # 转换回OpenCV格式以便绘制检测结果
-                blurred_frame = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-
-                # 计算缩放比例（用于调整检测框坐标）
-                original_height, original_width = frame.shape[:2]
-                scale_x = display_width / original_width
-                scale_y = display_height / original_height
-
-                # 在模糊后的图像上绘制清晰的检测结果
-                if current_mode == "MEDIAPIPE_ONLY":
-                    # MediaPipe独立模式：绘制人脸和姿态
-                    if mediapipe_faces:
-                        scaled_faces = self._scale_detection_boxes(mediapipe_faces, scale_x, scale_y)
-                        blurred_frame = self.camera_handler.draw_face_boxes(
-                            blurred_frame,
-                            scaled_faces,
-                            color=(0, 255, 0),  # 绿色
-                            thickness=2
-                        )
-
-                    # 姿态检测
-                    if pose_data and pose_data.get('landmarks'):
-                        blurred_frame = self._draw_scaled_pose_landmarks(blurred_frame, pose_data, scale_x, scale_y)
-
-                elif current_mode == "SMOLVLM_ONLY":
-                    # SmolVLM独立模式：只绘制SmolVLM检测结果
-                    if self.detected_humans:
-                        scaled_humans = self._scale_detection_boxes(self.detected_humans, scale_x, scale_y)
-                        blurred_frame = self.camera_handler.draw_face_boxes(
-                            blurred_frame,
-                            scaled_humans,
-                            color=(255, 0, 0),  # 蓝色（BGR格式）
-                            thickness=2
-                        )
-
-                elif current_mode == "HYBRID":
-                    # 混合模式：绘制SmolVLM主检测结果和MediaPipe辅助结果
-                    if self.detected_humans:
-                        scaled_humans = self._scale_detection_boxes(self.detected_humans, scale_x, scale_y)
-                        blurred_frame = self.camera_handler.draw_face_boxes(
-                            blurred_frame,
-                            scaled_humans,
-                            color=(255, 0, 0),  # 蓝色（BGR格式）
-                            thickness=2
-                        )
-
-                    # 显示MediaPipe辅助检测结果（较细的绿色框）
-                    if mediapipe_faces:
-                        scaled_faces = self._scale_detection_boxes(mediapipe_faces, scale_x, scale_y)
-                        blurred_frame = self.camera_handler.draw_face_boxes(
-                            blurred_frame,
-                            scaled_faces,
-                            color=(0, 255, 0),  # 绿色
-                            thickness=1
-                        )
-
-                    # 姿态检测
-                    if pose_data and pose_data.get('landmarks'):
-                        blurred_frame = self._draw_scaled_pose_landmarks(blurred_frame, pose_data, scale_x, scale_y)
-
-                # 转换为PIL图像并显示
-                final_frame_rgb = cv2.cvtColor(blurred_frame, cv2.COLOR_BGR2RGB)
+                    pose_data = self._get_preview_pose(frame)
+
+                # 合成预览画面（缩放、模糊、绘制检测结果）
+                hud_lines = self.perf_monitor.format_hud_lines() if self.show_performance_hud.get() else None
+                if TRACKER_ENABLED:
+                    display_humans = self.tracker.predict(time.monotonic())
+                else:
+                    display_humans = self.detected_humans
+                final_frame_rgb = self.display_compositor.compose(
+                    frame,
+                    current_mode,
+                    blur_level,
+                    display_humans,
+                    mediapipe_faces,
+                    pose_data,
+                    hud_lines
+                )
                 final_pil_image = Image.fromarray(final_frame_rgb)
 
-                # 转换为tkinter可显示的格式
-                tk_image = ImageTk.PhotoImage(final_pil_image)
-                self.camera_label.configure(image=tk_image, text="")
-                self.camera_label.image = tk_image  # 保持引用
+                # 复用同一个PhotoImage，只在首次显示或尺寸变化时重新创建
+                if self.camera_photo is None or (self.camera_photo.width(), self.camera_photo.height()) != final_pil_image.size:
+                    self.camera_photo = ImageTk.PhotoImage(final_pil_image)
+                    self.camera_label.configure(image=self.camera_photo, text="")
+                    self.camera_label.image = self.camera_photo  # 保持引用
+                else:
+                    self.camera_photo.paste(final_pil_image)
 
         except Exception as e:
             print(f"更新摄像头显示错误: {e}")
 
         # 继续更新
         if self.is_detecting:
-            self.root.after(50, self.update_camera_display)  # 20 FPS
-
-    def _scale_detection_boxes(self, detection_boxes, scale_x, scale_y):
-        """缩放检测框坐标以适应显示尺寸"""
-        scaled_boxes = []
-        for box in detection_boxes:
-            scaled_box = box.copy()
-            scaled_box['x'] = int(box['x'] * scale_x)
-            scaled_box['y'] = int(box['y'] * scale_y)
-            scaled_box['width'] = int(box['width'] * scale_x)
-            scaled_box['height'] = int(box['height'] * scale_y)
-            scaled_boxes.append(scaled_box)
-        return scaled_boxes
-
-    def _draw_scaled_pose_landmarks(self, frame, pose_data, scale_x, scale_y):
-        """在缩放后的帧上绘制姿态关键点"""
-        if not pose_data or not pose_data.get('landmarks'):
-            return frame
-
-        try:
-            # MediaPipe坐标是相对的(0-1)，直接绘制即可
-            if self.camera_handler.mp_drawing and self.camera_handler.mp_drawing_styles and self.camera_handler.mp_pose:
-                self.camera_handler.mp_drawing.draw_landmarks(
-                    frame,
-                    pose_data['landmarks'],
-                    self.camera_handler.mp_pose.POSE_CONNECTIONS,
-                    landmark_drawing_spec=self.camera_handler.mp_drawing_styles.get_default_pose_landmarks_style()
-                )
-
-        except Exception as e:
-            print(f"绘制姿态关键点错误: {e}")
-
-        return frame
+            self.schedule_camera_display(50)  # 最高 20 FPS
+
+    def _get_preview_pose(self, frame):
+        """预览画面使用的姿态数据，距上次检测不足 MEDIAPIPE_PREVIEW_POSE_INTERVAL 时复用上一次结果"""
+        now = time.monotonic()
+        if self.preview_pose_time is None or now - self.preview_pose_time >= MEDIAPIPE_PREVIEW_POSE_INTERVAL:
+            self.preview_pose_data = self.camera_handler.detect_pose_with_mediapipe(frame)
+            self.preview_pose_time = now
+        return self.preview_pose_data
+
+    def refresh_process_list(self, manual: bool = True):
+        """刷新进程列表（后台获取进程，主线程只应用变化的行）"""
+        if self.process_refresh_running:
+            return
+        self.process_refresh_running = True
 
-    def refresh_process_list(self):
-        """刷新进程列表"""
         def refresh_thread():
-            processes = self.process_manager.get_running_processes()
+            try:
+                processes = self.process_manager.get_running_processes()
+            except Exception as e:
+                print(f"刷新进程列表错误: {e}")
+                processes = None
 
             # 在主线程中更新UI
-            self.root.after(0, lambda: self._update_process_list(processes))
+            self.root.after(0, lambda: self._update_process_list(processes, manual))
 
         threading.Thread(target=refresh_thread, daemon=True).start()
-        self.update_status("正在刷新进程列表...")
+        if manual:
+            self.update_status("正在刷新进程列表...")
 
-    def _update_process_list(self, processes: List[Dict]):
-        """更新进程列表UI"""
-        self.process_listbox.delete(0, tk.END)
+    def _update_process_list(self, processes: Optional[List[Dict]], manual: bool = True):
+        """将新旧进程快照的差异应用到列表框"""
+        self.process_refresh_running = False
+        if processes is None:
+            return
 
-        for proc in processes:
-            display_text = f"{proc['name']} (PID: {proc['pid']})"
-            self.process_listbox.insert(tk.END, display_text)
-            # 存储完整的进程信息
-            self.process_listbox.insert(tk.END, "")  # 占位符，实际存储在tag中
-            self.process_listbox.delete(tk.END)  # 删除占位符
+        operations = self.process_list.update(processes)
+        for operation in operations:
+            index = operation[1]
+            if operation[0] == 'delete':
+                if index < self.process_rows_rendered:
+                    self.process_listbox.delete(index)
+                    self.process_rows_rendered -= 1
+            elif index < self.process_rows_rendered:
+                # 尚未显示的部分在滚动到时再插入
+                self.process_listbox.insert(index, format_process(operation[2]))
+                self.process_rows_rendered += 1
+
+        # 第一批行总是显示；视图已在末尾附近时继续插入下一批
+        if self.process_render_after_id is None and (
+                self.process_rows_rendered < PROCESS_LIST_RENDER_BATCH or self.process_listbox.yview()[1] >= 0.9):
+            self._render_process_rows()
+
+        if manual or operations:
+            self.update_status(f"已加载 {len(self.process_list)} 个进程")
+
+    def _render_process_rows(self):
+        """把下一批尚未显示的行插入列表框
+
+        列表框只包含模型的前 process_rows_rendered 行，其余行在滚动到底部附近时
+        再分批插入（见 _on_process_list_scroll），不会一次把所有行都放进列表框。
+        """
+        self.process_render_after_id = None
+        remaining = len(self.process_list) - self.process_rows_rendered
+        if remaining <= 0:
+            return
+
+        start = self.process_rows_rendered
+        end = start + min(remaining, PROCESS_LIST_RENDER_BATCH)
+        self.process_listbox.insert(tk.END, *(format_process(self.process_list[i]) for i in range(start, end)))
+        self.process_rows_rendered = end
 
-        # 存储进程数据
-        self.process_data = processes
-        self.update_status(f"已加载 {len(processes)} 个进程")
+    def _on_process_list_scroll(self, first, last):
+        """列表框视图变化：更新滚动条，显示到已插入行的末尾附近时插入下一批"""
+        self.process_scrollbar.set(first, last)
+        if (float(last) >= 0.9 and self.process_rows_rendered < len(self.process_list)
+                and self.process_render_after_id is None):
+            self.process_render_after_id = self.root.after_idle(self._render_process_rows)
+
+    def _auto_refresh_process_list(self):
+        """定期自动刷新进程列表（进程没有变化时不改动列表框）"""
+        if PROCESS_LIST_AUTO_REFRESH_INTERVAL > 0:
+            self.refresh_process_list(manual=False)
+            self.root.after(int(PROCESS_LIST_AUTO_REFRESH_INTERVAL * 1000), self._auto_refresh_process_list)
 
     def select_process(self):
         """选择进程"""
@@ -1030,22 +971,42 @@ class MySoloKeeperGUI:
             return
 
         index = selection[0]
-        if hasattr(self, 'process_data') and index < len(self.process_data):
-            selected_proc = self.process_data[index]
+        if index < len(self.process_list):
+            selected_proc = self.process_list[index]
             self.selected_process_pid = selected_proc['pid']
 
-            # 更新显示
-            display_text = f"{selected_proc['name']}\nPID: {selected_proc['pid']}"
-            self.selected_process_label.configure(text=display_text)
-
-            # 添加到监控列表
-            self.process_manager.add_monitored_process(
-                selected_proc['pid'],
-                selected_proc['name']
+            # 按守护范围设置守护目标，匹配的进程由后台扫描持续跟踪
+            target = GuardTarget(
+                self._get_guard_target_mode_key(),
+                pid=selected_proc['pid'],
+                name=selected_proc['name'],
+                create_time=selected_proc.get('create_time'),
+                pattern=self.guard_pattern_entry.get().strip()
             )
+            # 进程扫描在后台进行，匹配进程数在扫描完成后更新
+            self.selected_process_label.configure(text=f"{target.describe()}\n正在匹配进程...")
+            self.process_manager.set_guard_target(target)
 
             self.update_status(f"已选择进程: {selected_proc['name']}")
 
+    def _on_monitored_processes_changed(self, count: int):
+        """守护目标匹配的进程集合变化（在进程扫描线程中调用）"""
+        self.root.after(0, self._show_guard_target, count)
+
+    def _show_guard_target(self, count: int):
+        """显示当前守护目标和匹配的进程数（主线程）"""
+        target = self.process_manager.guard_target
+        if target is not None:
+            self.selected_process_label.configure(text=f"{target.describe()}\n匹配进程数: {count}")
+
+    def _get_guard_target_mode_key(self) -> str:
+        """根据守护范围的中文名称找到对应的模式键"""
+        mode_name = self.guard_target_mode.get()
+        for key, name in GUARD_TARGET_MODES.items():
+            if name == mode_name:
+                return key
+        return DEFAULT_GUARD_TARGET_MODE
+
     def on_process_double_click(self, event):
         """处理进程列表双击事件"""
         # 调用现有的选择进程方法
@@ -1070,156 +1031,40 @@ class MySoloKeeperGUI:
             self.is_guarding = False
             self.update_status("守护模式已禁用")
 
-    def enhance_detection_with_mediapipe(self, frame, smolvlm_humans):
-        """使用MediaPipe增强SmolVLM的检测结果"""
-        try:
-            # 获取MediaPipe检测结果
-            mediapipe_faces = self.camera_handler.detect_faces_with_mediapipe(frame)
-            pose_data = self.camera_handler.detect_pose_with_mediapipe(frame)
-
-            enhanced_humans = []
-
-            for human in smolvlm_humans:
-                enhanced_human = human.copy()
-
-                # 1. 人脸验证：检查SmolVLM检测的区域是否有MediaPipe检测到的人脸
-                face_confidence = self._calculate_face_overlap(human, mediapipe_faces)
-
-                # 2. 姿态验证：检查是否有人体姿态
-                pose_confidence = self._calculate_pose_presence(human, pose_data, frame.shape)
-
-                # 3. 综合置信度计算
-                original_confidence = human.get('confidence', 0.5)
-
-                # 如果MediaPipe也检测到相关特征，提高置信度
-                if (face_confidence > MEDIAPIPE_FACE_OVERLAP_THRESHOLD or
-                    pose_confidence > MEDIAPIPE_POSE_PRESENCE_THRESHOLD):
-                    enhanced_confidence = min(1.0, original_confidence + MEDIAPIPE_CONFIDENCE_BOOST)
-                    enhanced_human['confidence'] = enhanced_confidence
-                    enhanced_human['mediapipe_verified'] = True
-                    enhanced_human['face_confidence'] = face_confidence
-                    enhanced_human['pose_confidence'] = pose_confidence
-                    print(f"MediaPipe验证通过: 人脸{face_confidence:.2f}, 姿态{pose_confidence:.2f}")
-                else:
-                    # 如果MediaPipe没有检测到相关特征，降低置信度
-                    enhanced_confidence = max(0.1, original_confidence - MEDIAPIPE_CONFIDENCE_PENALTY)
-                    enhanced_human['confidence'] = enhanced_confidence
-                    enhanced_human['mediapipe_verified'] = False
-                    print(f"MediaPipe验证失败: 人脸{face_confidence:.2f}, 姿态{pose_confidence:.2f}")
-
-                # 只保留置信度较高的检测结果
-                if enhanced_confidence > MEDIAPIPE_FINAL_CONFIDENCE_THRESHOLD:
-                    enhanced_humans.append(enhanced_human)
-
-            return enhanced_humans
-
-        except Exception as e:
-            print(f"MediaPipe辅助检测错误: {e}")
-            return smolvlm_humans  # 出错时返回原始结果
-
-    def _calculate_face_overlap(self, human_box, mediapipe_faces):
-        """计算人类检测框与MediaPipe人脸的重叠度"""
-        if not mediapipe_faces:
-            return 0.0
-
-        try:
-            human_x = human_box['x']
-            human_y = human_box['y']
-            human_w = human_box['width']
-            human_h = human_box['height']
-
-            max_overlap = 0.0
-
-            for face in mediapipe_faces:
-                face_x = face['x']
-                face_y = face['y']
-                face_w = face['width']
-                face_h = face['height']
-
-                # 计算重叠区域
-                overlap_x = max(0, min(human_x + human_w, face_x + face_w) - max(human_x, face_x))
-                overlap_y = max(0, min(human_y + human_h, face_y + face_h) - max(human_y, face_y))
-                overlap_area = overlap_x * overlap_y
-
-                # 计算重叠比例
-                face_area = face_w * face_h
-                if face_area > 0:
-                    overlap_ratio = overlap_area / face_area
-                    max_overlap = max(max_overlap, overlap_ratio)
-
-            return max_overlap
-
-        except Exception as e:
-            print(f"计算人脸重叠度错误: {e}")
-            return 0.0
-
-    def _calculate_pose_presence(self, human_box, pose_data, frame_shape):
-        """计算人类检测框内是否有姿态关键点"""
-        if not pose_data or not pose_data.get('landmarks'):
-            return 0.0
-
+    def trigger_guard_action(self):
+        """触发守护动作（提交给守护执行器后立即返回，不阻塞检测线程）"""
         try:
-            human_x = human_box['x']
-            human_y = human_box['y']
-            human_w = human_box['width']
-            human_h = human_box['height']
-
-            frame_h, frame_w = frame_shape[:2]
-            landmarks = pose_data['landmarks'].landmark
-
-            points_in_box = 0
-            total_visible_points = 0
-
-            for landmark in landmarks:
-                if landmark.visibility > 0.5:  # 只考虑可见的关键点
-                    total_visible_points += 1
-
-                    # 转换相对坐标到绝对坐标
-                    x = int(landmark.x * frame_w)
-                    y = int(landmark.y * frame_h)
-
-                    # 检查是否在人类检测框内
-                    if (human_x <= x <= human_x + human_w and
-                        human_y <= y <= human_y + human_h):
-                        points_in_box += 1
-
-            if total_visible_points > 0:
-                return points_in_box / total_visible_points
-            else:
-                return 0.0
+            self.guard_executor.submit(self.selected_process_pid)
 
         except Exception as e:
-            print(f"计算姿态存在度错误: {e}")
-            return 0.0
-
-    def trigger_guard_action(self):
-        """触发守护动作"""
-        try:
-            current_time = time.time()
+            print(f"触发守护动作错误: {e}")
+            import traceback
+            traceback.print_exc()
 
-            # 检查冷却时间
-            if current_time - self.last_guard_action_time < self.guard_action_cooldown:
-                remaining_time = self.guard_action_cooldown - (current_time - self.last_guard_action_time)
-                print(f"守护动作冷却中，剩余 {remaining_time:.1f} 秒")
-                return
+    def _run_guard_action(self, pid: int) -> bool:
+        """守护动作：最小化守护目标匹配的所有进程的窗口（在守护执行器线程中调用）"""
+        if self.process_manager.guard_target is None:
+            return self.process_manager.minimize_process_windows(pid)
+        return self.process_manager.minimize_monitored_processes() > 0
 
-            print(f"触发守护动作 - 目标进程PID: {self.selected_process_pid}")
+    def _on_guard_action_done(self, pid: int, success: bool):
+        """守护动作执行完成（在守护执行器线程中调用，界面和Tk变量只在主线程中访问）"""
+        if not success:
+            print("未能最小化任何窗口")
+            return
 
-            # 最小化被守护的进程
-            if self.process_manager.minimize_process_windows(self.selected_process_pid):
-                self.last_guard_action_time = current_time
-                self.update_status("检测到人类活动，已最小化目标进程")
+        self.root.after(0, self._after_guard_action, self.guard_executor.last_hide_latency)
 
-                # 播放声音报警
-                if self.enable_audio_alert.get():
-                    self.audio_manager.play_alert_async(repeat=2, interval=0.2)
-            else:
-                print("未能最小化任何窗口")
+    def _after_guard_action(self, hide_latency: Optional[float]):
+        """守护动作成功后的界面更新和声音报警（主线程）"""
+        message = "检测到人类活动，已最小化目标进程"
+        if hide_latency is not None:
+            message += f"（耗时 {hide_latency * 1000:.0f} ms）"
+        self.update_status(message)
 
-        except Exception as e:
-            print(f"触发守护动作错误: {e}")
-            import traceback
-            traceback.print_exc()
+        # 播放声音报警
+        if self.enable_audio_alert.get():
+            self.audio_manager.play_alert_async(repeat=2, interval=0.2)
 
     def test_audio(self):
         """测试音频"""
@@ -1396,6 +1241,10 @@ class MySoloKeeperGUI:
             # 停止所有活动
             self.is_detecting = False
             self.is_guarding = False
+            self.cancel_camera_display()
+            self.guard_executor.stop()
+            self.process_manager.stop_window_index_refresh()
+            self.process_manager.clear_guard_target()
 
             # 停止摄像头
             self.camera_handler.stop_capture()
@@ -1403,6 +1252,10 @@ class MySoloKeeperGUI:
             # 停止音频
             self.audio_manager.stop_alert()
 
+            # 停止指标端点
+            if self.metrics_server:
+                self.metrics_server.stop()
+
             # 销毁窗口
             self.root.destroy()
 
@@ -1486,6 +1339,7 @@ class MySoloKeeperGUI:
         current_interval = self.detection_interval.get()
         current_audio_enabled = self.enable_audio_alert.get()
         current_blur_level = self.camera_blur_level.get()
+        current_show_hud = self.show_performance_hud.get()
 
         # 停止检测
         if self.is_detecting:
@@ -1512,11 +1366,18 @@ class MySoloKeeperGUI:
         self.guard_enabled = tk.BooleanVar(value=was_guarding)
         self.enable_audio_alert = tk.BooleanVar(value=current_audio_enabled)
         self.camera_blur_level = tk.DoubleVar(value=current_blur_level)
+        self.show_performance_hud = tk.BooleanVar(value=current_show_hud)
 
         # 重新创建界面
         self.create_widgets()
         self.setup_layout()
 
+        # 新的列表框是空的，从第一批行重新显示
+        if self.process_render_after_id is not None:
+            self.root.after_cancel(self.process_render_after_id)
+        self.process_rows_rendered = 0
+        self._render_process_rows()
+
         # 恢复状态
         if was_detecting:
             self.root.after(1000, self.start_detection)
@@ -1612,6 +1473,8 @@ class MySoloKeeperGUI:
         """运行主循环"""
         # 初始加载进程列表
         self.refresh_process_list()
+        if PROCESS_LIST_AUTO_REFRESH_INTERVAL > 0:
+            self.root.after(int(PROCESS_LIST_AUTO_REFRESH_INTERVAL * 1000), self._auto_refresh_process_list)
 
         # 启动主循环
         self.root.mainloop()
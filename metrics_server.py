@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+本地指标端点模块（Prometheus 文本格式）
+"""
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import psutil
+
+from config import *
+from performance_monitor import PerformanceMonitor, perf_monitor
+
+
+METRIC_PREFIX = "mysolokeeper"
+
+# 计数器名称 -> (Prometheus 指标名, 说明)
+COUNTER_METRICS = {
+    'frames_captured': ('frames_captured_total', '摄像头捕获的帧数'),
+    'dropped_frames': ('dropped_frames_total', '摄像头读取失败的帧数'),
+    'stale_frames': ('stale_frames_total', '检测循环重复处理同一帧的次数'),
+    'vlm_requests': ('vlm_requests_total', 'SmolVLM 请求次数'),
+    'errors': ('errors_total', '各组件的错误次数'),
+    'timeouts': ('timeouts_total', '各组件的超时次数'),
+    'guard_triggers': ('guard_triggers_total', '守护动作触发次数'),
+    'cooldown_suppressions': ('cooldown_suppressions_total', '因冷却被抑制的守护动作次数'),
+    'guard_coalesced': ('guard_coalesced_total', '执行前被合并的守护请求次数'),
+    'window_index_rebuilds': ('window_index_rebuilds_total', '因窗口句柄失效而重建窗口索引的次数'),
+    'minimize_fallbacks': ('minimize_fallbacks_total', '等待超时仍未最小化、改为强制最小化的窗口数'),
+    'guard_target_restarts': ('guard_target_restarts_total', '守护目标进程重启后自动跟随新进程的次数'),
+    'mediapipe_scans': ('mediapipe_scans_total', 'MediaPipe 检测次数（按全画面/局部区域区分）'),
+    'pose_evaluations': ('pose_evaluations_total', 'MediaPipe 姿态检测的运行/跳过次数'),
+    'cascade_candidates': ('cascade_candidates_total', '候选区域级联中各候选区域的处理结果'),
+    'gating_decisions': ('gating_decisions_total', '置信度门控模式的判定结果（接受/拒绝/调用SmolVLM）'),
+    'prefilter_decisions': ('prefilter_decisions_total', 'OpenCV预筛选的判定结果'),
+    'detector_runs': ('detector_runs_total', '各检测器的运行次数（按是否命中区分）'),
+}
+
+
+def _format_labels(labels) -> str:
+    """格式化标签为 {k="v",...}"""
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def render_prometheus(monitor: PerformanceMonitor) -> str:
+    """将性能监控数据渲染为 Prometheus 文本格式"""
+    snapshot = monitor.snapshot()
+    lines: List[str] = []
+
+    # 计数器（同名不同标签的样本归到同一个指标下）
+    samples: Dict[str, list] = {}
+    for (name, labels), value in snapshot['counters'].items():
+        samples.setdefault(name, []).append((labels, value))
+
+    for name in sorted(samples):
+        metric_name, help_text = COUNTER_METRICS.get(name, (f"{name}_total", name))
+        full_name = f"{METRIC_PREFIX}_{metric_name}"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} counter")
+        for labels, value in sorted(samples[name]):
+            lines.append(f"{full_name}{_format_labels(labels)} {value}")
+
+    # 每个检测器的推理次数（由延迟直方图计数得出）
+    latencies = snapshot['latencies']
+    if latencies:
+        full_name = f"{METRIC_PREFIX}_inferences_total"
+        lines.append(f"# HELP {full_name} 各阶段的调用次数")
+        lines.append(f"# TYPE {full_name} counter")
+        for stage in sorted(latencies):
+            lines.append(f'{full_name}{{stage="{stage}"}} {latencies[stage]["count"]}')
+
+        # 各阶段延迟直方图
+        full_name = f"{METRIC_PREFIX}_stage_latency_seconds"
+        lines.append(f"# HELP {full_name} 各阶段耗时（秒）")
+        lines.append(f"# TYPE {full_name} histogram")
+        for stage in sorted(latencies):
+            data = latencies[stage]
+            for upper, count in data['buckets']:
+                lines.append(f'{full_name}_bucket{{stage="{stage}",le="{upper}"}} {count}')
+            lines.append(f'{full_name}_bucket{{stage="{stage}",le="+Inf"}} {data["count"]}')
+            lines.append(f'{full_name}_sum{{stage="{stage}"}} {data["sum"]:.6f}')
+            lines.append(f'{full_name}_count{{stage="{stage}"}} {data["count"]}')
+
+    # 缓存命中情况
+    if snapshot['cache_stats']:
+        full_name = f"{METRIC_PREFIX}_cache_requests_total"
+        lines.append(f"# HELP {full_name} 缓存访问次数")
+        lines.append(f"# TYPE {full_name} counter")
+        for cache in sorted(snapshot['cache_stats']):
+            hits, misses = snapshot['cache_stats'][cache]
+            lines.append(f'{full_name}{{cache="{cache}",result="hit"}} {hits}')
+            lines.append(f'{full_name}{{cache="{cache}",result="miss"}} {misses}')
+
+    # 当前值指标
+    for name in sorted(snapshot['gauges']):
+        full_name = f"{METRIC_PREFIX}_{name}"
+        lines.append(f"# TYPE {full_name} gauge")
+        lines.append(f"{full_name} {snapshot['gauges'][name]}")
+
+    # 进程资源占用，用于发现内存增长
+    try:
+        process = psutil.Process(os.getpid())
+        lines.append(f"# HELP {METRIC_PREFIX}_resident_memory_bytes 进程常驻内存（字节）")
+        lines.append(f"# TYPE {METRIC_PREFIX}_resident_memory_bytes gauge")
+        lines.append(f"{METRIC_PREFIX}_resident_memory_bytes {process.memory_info().rss}")
+        lines.append(f"# HELP {METRIC_PREFIX}_threads 进程线程数")
+        lines.append(f"# TYPE {METRIC_PREFIX}_threads gauge")
+        lines.append(f"{METRIC_PREFIX}_threads {process.num_threads()}")
+    except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
+        print(f"获取进程资源信息失败: {e}")
+
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """本地 HTTP 指标服务，提供 /metrics 端点"""
+
+    def __init__(self, monitor: PerformanceMonitor = perf_monitor,
+                 host: str = METRICS_HOST, port: int = METRICS_PORT):
+        self.monitor = monitor
+        self.host = host
+        self.port = port
+        self.httpd: Optional[ThreadingHTTPServer] = None
+        self.server_thread = None
+
+    def _make_handler(self):
+        """创建绑定到当前监控器的请求处理类"""
+        monitor = self.monitor
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+
+                body = render_prometheus(monitor).encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # 抓取请求很频繁，不输出访问日志
+                pass
+
+        return MetricsHandler
+
+    def start(self) -> bool:
+        """启动指标服务"""
+        if self.httpd:
+            return True
+
+        try:
+            self.httpd = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+            self.httpd.daemon_threads = True
+            self.server_thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+            self.server_thread.start()
+            print(f"指标端点已启动: http://{self.host}:{self.port}/metrics")
+            return True
+        except OSError as e:
+            print(f"指标端点启动失败: {e}")
+            self.httpd = None
+            return False
+
+    def stop(self):
+        """停止指标服务"""
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+            print("指标端点已停止")
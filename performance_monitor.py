@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+性能监控模块
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from config import *
+
+
+class RateCounter:
+    """滑动窗口速率统计（次/秒）"""
+
+    def __init__(self, window: float = 2.0):
+        self.window = window
+        self.timestamps = deque()
+
+    def tick(self, timestamp: Optional[float] = None):
+        """记录一次事件"""
+        now = timestamp if timestamp is not None else time.time()
+        self.timestamps.append(now)
+        self._expire(now)
+
+    def rate(self, now: Optional[float] = None) -> float:
+        """返回窗口内的平均速率"""
+        now = now if now is not None else time.time()
+        self._expire(now)
+        if len(self.timestamps) < 2:
+            return 0.0
+
+        elapsed = self.timestamps[-1] - self.timestamps[0]
+        if elapsed <= 0:
+            return 0.0
+        return (len(self.timestamps) - 1) / elapsed
+
+    def _expire(self, now: float):
+        """移除窗口外的事件"""
+        while self.timestamps and now - self.timestamps[0] > self.window:
+            self.timestamps.popleft()
+
+
+class LatencyTracker:
+    """延迟统计，保留最近的样本用于计算分位数，并累计直方图分桶"""
+
+    def __init__(self, max_samples: int = 100, buckets: Optional[List[float]] = None):
+        self.samples = deque(maxlen=max_samples)
+        self.last = 0.0
+        self.buckets = sorted(buckets if buckets is not None else METRICS_LATENCY_BUCKETS)
+        self.bucket_counts = [0] * len(self.buckets)  # 每个分桶的非累积计数
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds: float):
+        """记录一次耗时（秒）"""
+        self.last = seconds
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+        for i, upper in enumerate(self.buckets):
+            if seconds <= upper:
+                self.bucket_counts[i] += 1
+                break
+
+    def cumulative_buckets(self) -> List[Tuple[float, int]]:
+        """返回累积分桶 [(上界, 计数)]，不含 +Inf"""
+        result = []
+        running = 0
+        for upper, count in zip(self.buckets, self.bucket_counts):
+            running += count
+            result.append((upper, running))
+        return result
+
+    def percentile(self, percent: float) -> float:
+        """计算最近样本的分位数"""
+        if not self.samples:
+            return 0.0
+
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(percent / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class PerformanceMonitor:
+    """性能监控器，汇总帧率、延迟、缓存命中率和计数器"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rates: Dict[str, RateCounter] = {}
+        self.latencies: Dict[str, LatencyTracker] = {}
+        self.cache_stats: Dict[str, List[int]] = {}  # {name: [hits, misses]}
+        self.counters: Dict[Tuple[str, tuple], int] = {}  # {(name, labels): value}
+        self.gauges: Dict[str, float] = {}
+
+    def tick(self, name: str):
+        """记录一次速率事件（如一帧）"""
+        with self.lock:
+            if name not in self.rates:
+                self.rates[name] = RateCounter()
+            self.rates[name].tick()
+
+    def record_latency(self, name: str, seconds: float):
+        """记录某个阶段的耗时"""
+        with self.lock:
+            if name not in self.latencies:
+                self.latencies[name] = LatencyTracker()
+            self.latencies[name].record(seconds)
+
+    @contextmanager
+    def measure(self, name: str):
+        """测量代码块耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_latency(name, time.perf_counter() - start)
+
+    def record_cache(self, name: str, hit: bool):
+        """记录一次缓存访问"""
+        with self.lock:
+            stats = self.cache_stats.setdefault(name, [0, 0])
+            stats[0 if hit else 1] += 1
+
+    def increment(self, name: str, amount: int = 1, labels: Optional[Dict[str, str]] = None):
+        """累加计数器，可附带标签（如 {'component': 'smolvlm'}）"""
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float):
+        """设置当前值指标"""
+        with self.lock:
+            self.gauges[name] = value
+
+    def get_rate(self, name: str) -> float:
+        """获取速率（次/秒）"""
+        with self.lock:
+            counter = self.rates.get(name)
+            return counter.rate() if counter else 0.0
+
+    def get_latency(self, name: str) -> Dict[str, float]:
+        """获取最近一次和P95耗时（秒）"""
+        with self.lock:
+            tracker = self.latencies.get(name)
+            if not tracker:
+                return {'last': 0.0, 'p95': 0.0}
+            return {'last': tracker.last, 'p95': tracker.percentile(95)}
+
+    def get_cache_hit_rate(self, name: str) -> float:
+        """获取缓存命中率（0-1）"""
+        with self.lock:
+            hits, misses = self.cache_stats.get(name, [0, 0])
+            total = hits + misses
+            return hits / total if total > 0 else 0.0
+
+    def get_counter(self, name: str, labels: Optional[Dict[str, str]] = None) -> int:
+        """获取计数器值"""
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        with self.lock:
+            return self.counters.get(key, 0)
+
+    def get_gauge(self, name: str) -> float:
+        """获取当前值指标"""
+        with self.lock:
+            return self.gauges.get(name, 0.0)
+
+    def snapshot(self) -> Dict:
+        """获取所有计数器、指标和延迟直方图的一致快照"""
+        with self.lock:
+            return {
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'latencies': {
+                    name: {
+                        'buckets': tracker.cumulative_buckets(),
+                        'count': tracker.count,
+                        'sum': tracker.total
+                    }
+                    for name, tracker in self.latencies.items()
+                },
+                'cache_stats': {name: tuple(stats) for name, stats in self.cache_stats.items()}
+            }
+
+    def format_hud_lines(self) -> List[str]:
+        """生成预览叠加层显示的文本行（OpenCV字体仅支持ASCII）"""
+        lines = [
+            f"FPS cap {self.get_rate('capture'):.1f} | disp {self.get_rate('display'):.1f} | "
+            f"det {self.get_rate('detection'):.2f}/s",
+        ]
+
+        for name, label in [('mediapipe_face', 'MP face'),
+                            ('mediapipe_pose', 'MP pose'),
+                            ('smolvlm', 'SmolVLM')]:
+            latency = self.get_latency(name)
+            lines.append(f"{label}: last {latency['last'] * 1000:.0f}ms p95 {latency['p95'] * 1000:.0f}ms")
+
+        with self.lock:
+            cache_names = sorted(self.cache_stats)
+        if cache_names:
+            cache_text = ", ".join(f"{name} {self.get_cache_hit_rate(name) * 100:.0f}%" for name in cache_names)
+            lines.append(f"Cache hit: {cache_text}")
+
+        lines.append(
+            f"Dropped {self.get_counter('dropped_frames')} | stale {self.get_counter('stale_frames')} | "
+            f"interval {self.get_gauge('detection_interval'):.2f}s"
+        )
+        return lines
+
+
+# 全局性能监控实例，各模块共享
+perf_monitor = PerformanceMonitor()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+姿态关键点向量化处理模块
+"""
+
+import numpy as np
+from typing import Optional, Dict, Tuple
+
+# 关键点数组列索引
+LANDMARK_X = 0
+LANDMARK_Y = 1
+LANDMARK_Z = 2
+LANDMARK_VISIBILITY = 3
+
+
+def landmarks_to_array(landmarks) -> np.ndarray:
+    """将MediaPipe姿态关键点转换为 (33, 4) float32 数组，列为 x, y, z, visibility"""
+    points = landmarks.landmark
+    array = np.empty((len(points), 4), dtype=np.float32)
+    for i, landmark in enumerate(points):
+        array[i] = (landmark.x, landmark.y, landmark.z, landmark.visibility)
+    return array
+
+
+def count_visible_landmarks(landmark_array: np.ndarray, visibility_threshold: float) -> int:
+    """统计可见度高于阈值的关键点数量"""
+    return int(np.count_nonzero(landmark_array[:, LANDMARK_VISIBILITY] > visibility_threshold))
+
+
+def visible_pixel_points(landmark_array: np.ndarray, frame_shape: Tuple,
+                         visibility_threshold: float = 0.5) -> np.ndarray:
+    """返回可见关键点的像素坐标 (K, 2)，与逐点 int() 截断的结果一致"""
+    h, w = frame_shape[:2]
+    visible = landmark_array[landmark_array[:, LANDMARK_VISIBILITY] > visibility_threshold]
+    scale = np.array([w, h], dtype=np.float64)
+    return np.trunc(visible[:, :2].astype(np.float64) * scale).astype(np.int64)
+
+
+def pose_bounding_box(landmark_array: np.ndarray, frame_shape: Tuple,
+                      visibility_threshold: float = 0.5, margin: int = 20,
+                      min_points: int = 3) -> Optional[Dict]:
+    """根据可见关键点计算带边距的边界框"""
+    h, w = frame_shape[:2]
+    points = visible_pixel_points(landmark_array, frame_shape, visibility_threshold)
+    if len(points) < min_points:
+        return None
+
+    x_min, y_min = points.min(axis=0)
+    x_max, y_max = points.max(axis=0)
+
+    # 限制在画面内并添加边距
+    x_min = max(0, int(x_min) - margin)
+    y_min = max(0, int(y_min) - margin)
+    x_max = min(w, int(x_max) + margin)
+    y_max = min(h, int(y_max) + margin)
+
+    return {
+        'x': x_min,
+        'y': y_min,
+        'width': x_max - x_min,
+        'height': y_max - y_min
+    }
+
+
+def pose_presence_ratios(landmark_array: np.ndarray, boxes: np.ndarray, frame_shape: Tuple,
+                         visibility_threshold: float = 0.5) -> np.ndarray:
+    """计算每个检测框 (N, 4)[x, y, w, h] 内的可见关键点占全部可见关键点的比例"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    points = visible_pixel_points(landmark_array, frame_shape, visibility_threshold)
+    if len(boxes) == 0 or len(points) == 0:
+        return np.zeros(len(boxes), dtype=np.float64)
+
+    # (N, 1) 与 (1, K) 广播得到 (N, K) 的框内判定矩阵
+    px = points[np.newaxis, :, 0]
+    py = points[np.newaxis, :, 1]
+    x1 = boxes[:, 0:1]
+    y1 = boxes[:, 1:2]
+    x2 = x1 + boxes[:, 2:3]
+    y2 = y1 + boxes[:, 3:4]
+    inside = (px >= x1) & (px <= x2) & (py >= y1) & (py <= y2)
+
+    return inside.sum(axis=1) / len(points)
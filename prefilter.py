@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+OpenCV 预筛选检测模块
+使用OpenCV自带的Haar级联人脸检测器或HOG行人检测器，无需下载模型，
+在缩小的灰度图上快速判断画面中是否可能有人
+"""
+
+import os
+import cv2
+import numpy as np
+from typing import List
+from config import *
+from detection import Detection, DetectionSource
+from frame_pyramid import as_pyramid
+from performance_monitor import perf_monitor
+
+
+class OpenCVPreFilter:
+    """OpenCV预筛选检测器，可作为MediaPipe/SmolVLM之前的一级，也可独立作为低功耗检测模式"""
+
+    def __init__(self, method: str = PREFILTER_METHOD, scale: float = PREFILTER_SCALE,
+                 full_check_interval: float = PREFILTER_FULL_CHECK_INTERVAL):
+        self.method = method
+        self.scale = scale
+        self.full_check_interval = full_check_interval
+        self.last_full_check_time = None
+        self.face_cascade = None
+        self.hog = None
+        self.perf_monitor = perf_monitor
+
+        try:
+            if method == "haar_face":
+                cascade_path = os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml')
+                cascade = cv2.CascadeClassifier(cascade_path)
+                if cascade.empty():
+                    raise RuntimeError(f"无法加载Haar级联文件: {cascade_path}")
+                self.face_cascade = cascade
+            elif method == "hog_people":
+                self.hog = cv2.HOGDescriptor()
+                self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+            else:
+                raise ValueError(f"未知的预筛选方法: {method}")
+            print(f"OpenCV预筛选检测器初始化成功: {method}")
+        except Exception as e:
+            print(f"OpenCV预筛选检测器初始化失败: {e}")
+            self.face_cascade = None
+            self.hog = None
+
+    @property
+    def available(self) -> bool:
+        """检测器是否可用"""
+        return self.face_cascade is not None or self.hog is not None
+
+    def detect(self, frame) -> List[Detection]:
+        """在缩小的灰度图上检测，返回归一化坐标的检测结果；frame 可以是BGR图像或 FramePyramid"""
+        if not self.available:
+            return []
+
+        try:
+            with self.perf_monitor.measure("opencv_prefilter"):
+                # 1/2、1/4 等缩放比例直接使用帧预处理缓存中的灰度图
+                pyramid = as_pyramid(frame)
+                factor = round(1 / self.scale)
+                if factor >= 1 and not factor & (factor - 1) and abs(self.scale * factor - 1.0) < 1e-6:
+                    gray = pyramid.gray(factor)
+                else:
+                    gray = cv2.resize(pyramid.gray(), None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+                small_height, small_width = gray.shape[:2]
+
+                if self.face_cascade is not None:
+                    boxes = self.face_cascade.detectMultiScale(
+                        gray, scaleFactor=1.1, minNeighbors=5, minSize=PREFILTER_MIN_FACE_SIZE
+                    )
+                    weights = [None] * len(boxes)
+                    source = DetectionSource.OPENCV_FACE
+                else:
+                    boxes, weights = self.hog.detectMultiScale(gray, winStride=(8, 8), padding=(8, 8), scale=1.05)
+                    weights = [min(1.0, float(weight)) for weight in np.ravel(weights)]
+                    source = DetectionSource.OPENCV_PEOPLE
+
+            detections = []
+            for (x, y, width, height), weight in zip(np.asarray(boxes).reshape(-1, 4).tolist(), weights):
+                if weight is not None and weight < PREFILTER_HOG_MIN_WEIGHT:
+                    continue
+                detections.append(Detection.from_pixels(
+                    x, y, width, height, small_width, small_height,
+                    confidence=weight, source=source
+                ))
+            return detections
+
+        except Exception as e:
+            print(f"OpenCV预筛选检测错误: {e}")
+            self.perf_monitor.increment("errors", labels={'component': 'opencv_prefilter'})
+            return []
+
+    def should_run_downstream(self, frame, timestamp: float,
+                              recently_detected: bool = False) -> bool:
+        """判断本次是否需要运行后续检测器
+
+        预筛选检测到目标、上一次后续检测仍有人、或到了定期全量检测时间时返回True。
+        检测器不可用时总是返回True，不影响原有检测流程。
+        """
+        if not self.available:
+            return True
+
+        if self.last_full_check_time is None or timestamp - self.last_full_check_time >= self.full_check_interval:
+            self.last_full_check_time = timestamp
+            self.perf_monitor.increment("prefilter_decisions", labels={'decision': 'periodic'})
+            return True
+
+        if recently_detected:
+            self.perf_monitor.increment("prefilter_decisions", labels={'decision': 'tracking'})
+            return True
+
+        if self.detect(frame):
+            self.perf_monitor.increment("prefilter_decisions", labels={'decision': 'fired'})
+            return True
+
+        self.perf_monitor.increment("prefilter_decisions", labels={'decision': 'skipped'})
+        return False
+
+    def reset(self):
+        """重置定期全量检测计时"""
+        self.last_full_check_time = None
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+进程列表模型模块
+以 (pid, create_time) 标识进程，与上一次刷新结果比较，只输出新增和消失的行，
+界面只需执行这些增量操作，不必每次清空重建整个列表
+"""
+
+import bisect
+from typing import Dict, List, Tuple, Union
+
+# 列表操作: ('delete', 行号) 或 ('insert', 行号, 进程信息)，按顺序执行即可与模型保持一致
+ListOperation = Union[Tuple[str, int], Tuple[str, int, Dict]]
+
+
+def process_key(proc: Dict) -> Tuple[int, float]:
+    """进程标识：PID可能被新进程复用，加上创建时间才能唯一确定一个进程"""
+    return proc['pid'], proc.get('create_time') or 0.0
+
+
+def process_sort_key(proc: Dict) -> Tuple[str, int]:
+    """列表排序规则：按进程名（不区分大小写），同名按PID"""
+    return proc['name'].lower(), proc['pid']
+
+
+def format_process(proc: Dict) -> str:
+    """列表中显示的文字"""
+    return f"{proc['name']} (PID: {proc['pid']})"
+
+
+class ProcessListModel:
+    """有序的进程列表，按行号与界面列表一一对应"""
+
+    def __init__(self):
+        self.processes: List[Dict] = []
+        self.sort_keys: List[Tuple[str, int]] = []
+        self.keys = set()
+
+    def __len__(self) -> int:
+        return len(self.processes)
+
+    def __getitem__(self, index: int) -> Dict:
+        return self.processes[index]
+
+    def update(self, processes: List[Dict]) -> List[ListOperation]:
+        """用新的进程快照更新模型，返回需要在界面上执行的增量操作"""
+        new_by_key = {process_key(proc): proc for proc in processes}
+        operations = []
+
+        # 先删除消失的进程（从后往前，前面的行号不受影响）
+        for index in range(len(self.processes) - 1, -1, -1):
+            key = process_key(self.processes[index])
+            if key not in new_by_key:
+                del self.processes[index]
+                del self.sort_keys[index]
+                self.keys.discard(key)
+                operations.append(('delete', index))
+
+        # 再按排序位置插入新出现的进程
+        for key, proc in new_by_key.items():
+            if key in self.keys:
+                continue
+            sort_key = process_sort_key(proc)
+            index = bisect.bisect_right(self.sort_keys, sort_key)
+            self.processes.insert(index, proc)
+            self.sort_keys.insert(index, sort_key)
+            self.keys.add(key)
+            operations.append(('insert', index, proc))
+
+        return operations
+
+    def clear(self):
+        """清空列表"""
+        self.processes.clear()
+        self.sort_keys.clear()
+        self.keys.clear()
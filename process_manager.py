@@ -5,41 +5,85 @@
 
 import psutil
 import subprocess
+import threading
 import time
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 import ctypes
 from ctypes import wintypes
-
-try:
-    import win32gui
-    import win32con
-    import win32process
-    WIN32_AVAILABLE = True
-except ImportError:
-    print("警告: pywin32 未安装，进程窗口管理功能将受限")
-    WIN32_AVAILABLE = False
+from config import *
+from performance_monitor import perf_monitor
+from window_backend import WindowBackend, create_window_backend
+from process_watcher import GuardTarget, ProcessWatcher
 
 
 class ProcessManager:
     """进程管理器"""
 
-    def __init__(self):
+    def __init__(self, window_backend: Optional[WindowBackend] = None):
         self.monitored_processes = {}  # {pid: process_info}
+        self.window_backend = window_backend if window_backend is not None else create_window_backend()
+
+        # 被监控进程的窗口句柄索引 {pid: [hwnd, ...]}，守护触发时直接使用，句柄失效时才重新枚举
+        self.window_index: Dict[int, List[int]] = {}
+        self.window_index_lock = threading.Lock()
+        self.window_index_thread = None
+        self.window_index_stop = threading.Event()
+        self.perf_monitor = perf_monitor
+
+        # 守护目标（单个进程 / 进程树 / 同名进程），匹配的进程集合由后台扫描维护
+        self.guard_target: Optional[GuardTarget] = None
+        self.process_watcher: Optional[ProcessWatcher] = None
+        self.guard_target_lock = threading.Lock()  # 保护守护目标的切换和监控列表的替换
+        self.on_monitored_change: Optional[Callable[[int], None]] = None  # 监控进程集合变化时回调 (进程数)
+
+    @property
+    def windows_available(self) -> bool:
+        """当前平台是否支持窗口操作"""
+        return self.window_backend is not None and self.window_backend.available
+
+    def build_window_map(self) -> Dict[int, List[Dict]]:
+        """枚举一次所有窗口，返回 {pid: [{'hwnd', 'title'}, ...]}（只包含可见且有标题的窗口）"""
+        if not self.windows_available:
+            return {}
+
+        try:
+            return self._enum_window_map()
+        except Exception as e:
+            print(f"枚举窗口错误: {e}")
+            return {}
+
+    def _enum_window_map(self) -> Dict[int, List[Dict]]:
+        """单次枚举窗口并按进程分组，出错时抛出异常"""
+        window_map: Dict[int, List[Dict]] = {}
+        for hwnd, window_pid, window_title in self.window_backend.enum_windows():
+            window_map.setdefault(window_pid, []).append({'hwnd': hwnd, 'title': window_title})
+        return window_map
 
     def get_running_processes(self) -> List[Dict]:
-        """获取所有运行中的进程列表"""
+        """获取所有有窗口的运行中进程列表
+
+        先枚举一次窗口得到 pid -> 窗口 映射，再与进程列表连接，
+        不再为每个进程单独枚举一遍所有窗口。
+        """
         processes = []
 
         try:
-            for proc in psutil.process_iter(['pid', 'name', 'exe', 'create_time']):
+            window_map = self.build_window_map() if self.windows_available else None
+            if window_map is not None:
+                # 顺便用本次枚举结果刷新被监控进程的窗口索引
+                self._update_window_index_from_map(window_map)
+
+            for proc in psutil.process_iter():
                 try:
-                    proc_info = proc.info
+                    # 没有窗口的进程不需要读取详细信息
+                    if window_map is not None and proc.pid not in window_map:
+                        continue
+                    proc_info = proc.as_dict(['pid', 'name', 'exe', 'create_time'])
 
                     # 过滤掉系统进程和没有窗口的进程
                     if (proc_info['name'] and
                         not proc_info['name'].startswith('System') and
-                        proc_info['exe'] and
-                        self.has_visible_window(proc_info['pid'])):
+                        proc_info['exe']):
 
                         processes.append({
                             'pid': proc_info['pid'],
@@ -57,103 +101,127 @@ class ProcessManager:
         return sorted(processes, key=lambda x: x['name'].lower())
 
     def has_visible_window(self, pid: int) -> bool:
-        """检查进程是否有可见窗口"""
-        if not WIN32_AVAILABLE:
+        """检查进程是否有可见窗口（需要检查多个进程时应使用 build_window_map）"""
+        if not self.windows_available:
             return True  # 如果没有win32api，假设所有进程都有窗口
 
         try:
-            windows = []
-
-            def enum_windows_callback(hwnd, windows):
-                if win32gui.IsWindowVisible(hwnd):
-                    _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
-                    if window_pid == pid:
-                        window_title = win32gui.GetWindowText(hwnd)
-                        if window_title.strip():  # 只考虑有标题的窗口
-                            windows.append(hwnd)
-                return True
-
-            win32gui.EnumWindows(enum_windows_callback, windows)
-            return len(windows) > 0
-
+            return any(window_pid == pid for _, window_pid, _ in self.window_backend.enum_windows())
         except Exception:
             return False
 
     def get_process_windows(self, pid: int) -> List[Dict]:
         """获取指定进程的所有窗口"""
-        if not WIN32_AVAILABLE:
+        if not self.windows_available:
             return []
 
         windows = []
 
         try:
-            def enum_windows_callback(hwnd, windows):
-                if win32gui.IsWindowVisible(hwnd):
-                    _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
-                    if window_pid == pid:
-                        window_title = win32gui.GetWindowText(hwnd)
-                        if window_title.strip():
-                            # 获取窗口状态
-                            is_minimized = win32gui.IsIconic(hwnd)
-                            is_maximized = self._is_window_maximized(hwnd)
-
-                            windows.append({
-                                'hwnd': hwnd,
-                                'title': window_title,
-                                'is_minimized': is_minimized,
-                                'is_maximized': is_maximized
-                            })
-                return True
-
-            win32gui.EnumWindows(enum_windows_callback, windows)
+            backend = self.window_backend
+            for window in self.build_window_map().get(pid, []):
+                # 获取窗口状态
+                hwnd = window['hwnd']
+                windows.append({
+                    'hwnd': hwnd,
+                    'title': window['title'],
+                    'is_minimized': backend.is_minimized(hwnd),
+                    'is_maximized': backend.is_maximized(hwnd)
+                })
 
         except Exception as e:
             print(f"获取进程窗口错误: {e}")
 
         return windows
 
-    def _is_window_maximized(self, hwnd) -> bool:
-        """检查窗口是否最大化"""
+    def refresh_window_index(self, pids: Optional[List[int]] = None) -> Dict[int, List[int]]:
+        """枚举一次所有窗口，重建指定进程（默认所有被监控进程）的窗口句柄索引"""
+        if not self.windows_available:
+            return {}
+
+        if pids is None:
+            pids = list(self.monitored_processes)
+
         try:
-            # 使用 GetWindowPlacement 来检查窗口状态
-            placement = win32gui.GetWindowPlacement(hwnd)
-            # placement[1] 是 showCmd，SW_SHOWMAXIMIZED = 3
-            return placement[1] == win32con.SW_SHOWMAXIMIZED
+            window_map = self._enum_window_map()
         except Exception as e:
-            print(f"检查窗口最大化状态错误: {e}")
-            return False
+            print(f"刷新窗口索引错误: {e}")
+            return {}
+
+        return self._update_window_index_from_map(window_map, pids)
+
+    def _update_window_index_from_map(self, window_map: Dict[int, List[Dict]],
+                                      pids: Optional[List[int]] = None) -> Dict[int, List[int]]:
+        """用 pid -> 窗口 映射更新指定进程（默认所有被监控进程）的窗口句柄索引
+
+        只保存仍在监控中的进程：刷新期间被移除的进程不会被重新加入索引。
+        """
+        if pids is None:
+            pids = list(self.monitored_processes)
+        index = {pid: [window['hwnd'] for window in window_map.get(pid, [])] for pid in pids}
+
+        with self.window_index_lock:
+            monitored = self.monitored_processes
+            self.window_index.update((pid, handles) for pid, handles in index.items() if pid in monitored)
+        return index
+
+    def get_window_handles(self, pid: int) -> List[int]:
+        """从索引中获取进程的窗口句柄，进程不在索引中时立即枚举"""
+        with self.window_index_lock:
+            handles = self.window_index.get(pid)
+        if handles is None:
+            handles = self.refresh_window_index([pid]).get(pid, [])
+        return list(handles)
+
+    def _get_valid_window_handles(self, pid: int) -> List[int]:
+        """获取进程当前有效的窗口句柄，索引中有句柄失效（窗口关闭或句柄被复用）时重建索引"""
+        handles = self.get_window_handles(pid)
+        if handles and all(self.window_backend.is_window_of(hwnd, pid) for hwnd in handles):
+            return handles
+
+        self.perf_monitor.increment("window_index_rebuilds")
+        return self.refresh_window_index([pid]).get(pid, [])
+
+    def start_window_index_refresh(self, interval: float = WINDOW_INDEX_REFRESH_INTERVAL):
+        """启动后台线程定期刷新被监控进程的窗口索引（发现新打开的窗口）"""
+        if not self.windows_available or self.window_index_thread is not None:
+            return
+
+        # 每个线程使用自己的停止事件，停止后立即重新启动也不会有两个线程同时运行
+        stop_event = threading.Event()
+
+        def refresh_loop():
+            while not stop_event.is_set():
+                if self.monitored_processes:
+                    self.refresh_window_index()
+                stop_event.wait(interval)
+
+        self.window_index_stop = stop_event
+        self.window_index_thread = threading.Thread(target=refresh_loop, daemon=True)
+        self.window_index_thread.start()
+
+    def stop_window_index_refresh(self, timeout: float = 2.0):
+        """停止后台刷新线程并等待其结束"""
+        self.window_index_stop.set()
+        thread = self.window_index_thread
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=timeout)
+        self.window_index_thread = None
 
     def minimize_process_windows(self, pid: int) -> bool:
-        """最小化指定进程的所有窗口"""
-        if not WIN32_AVAILABLE:
+        """最小化指定进程的所有窗口（使用窗口句柄索引，不必每次枚举所有窗口）"""
+        if not self.windows_available:
             print("警告: 无法最小化窗口，缺少win32api支持")
             return False
 
         try:
-            windows = self.get_process_windows(pid)
-            if not windows:
+            handles = self._get_valid_window_handles(pid)
+            if not handles:
                 print(f"未找到PID {pid} 的可见窗口")
                 return False
 
-            minimized_count = 0
-            print(f"找到 {len(windows)} 个窗口，准备最小化...")
-
-            for window in windows:
-                print(f"窗口状态: {window['title']} - 最小化: {window['is_minimized']}, 最大化: {window['is_maximized']}")
-
-                if not window['is_minimized']:
-                    try:
-                        # 先尝试将窗口设为前台，然后最小化
-                        win32gui.SetForegroundWindow(window['hwnd'])
-                        time.sleep(0.1)  # 短暂等待
-                        win32gui.ShowWindow(window['hwnd'], win32con.SW_MINIMIZE)
-                        minimized_count += 1
-                        print(f"✓ 已最小化窗口: {window['title']}")
-                    except Exception as e:
-                        print(f"✗ 最小化窗口失败 {window['title']}: {e}")
-                else:
-                    print(f"- 窗口已是最小化状态: {window['title']}")
-
+            print(f"找到 {len(handles)} 个窗口，准备最小化...")
+            minimized_count = self._minimize_handles(handles)
             print(f"成功最小化 {minimized_count} 个窗口")
             return minimized_count > 0
 
@@ -163,9 +231,57 @@ class ProcessManager:
             traceback.print_exc()
             return False
 
+    def _minimize_handles(self, handles: List[int]) -> int:
+        """最小化一组窗口，返回处于最小化状态的窗口数（含原本已最小化的窗口）
+
+        先向所有窗口发出异步最小化请求（不等待窗口处理），再轮询窗口状态，
+        超过 MINIMIZE_VERIFY_TIMEOUT 仍未最小化的窗口（通常是无响应的窗口）改为强制最小化。
+        """
+        backend = self.window_backend
+        minimized_count = 0
+        pending = []
+        for hwnd in handles:
+            try:
+                if backend.is_minimized(hwnd):
+                    minimized_count += 1
+                    continue
+                backend.minimize_async(hwnd)
+                pending.append(hwnd)
+            except Exception as e:
+                print(f"✗ 最小化窗口失败 {hwnd}: {e}")
+
+        deadline = time.monotonic() + MINIMIZE_VERIFY_TIMEOUT
+        while pending:
+            still_pending = []
+            for hwnd in pending:
+                try:
+                    if backend.is_minimized(hwnd):
+                        minimized_count += 1
+                    else:
+                        still_pending.append(hwnd)
+                except Exception as e:
+                    print(f"✗ 检查窗口状态失败 {hwnd}: {e}")
+            pending = still_pending
+            if not pending or time.monotonic() >= deadline:
+                break
+            time.sleep(MINIMIZE_POLL_INTERVAL)
+
+        forced_count = 0
+        for hwnd in pending:
+            try:
+                backend.force_minimize(hwnd)
+                forced_count += 1
+                minimized_count += 1
+            except Exception as e:
+                print(f"✗ 强制最小化窗口失败 {hwnd}: {e}")
+
+        if forced_count:
+            self.perf_monitor.increment("minimize_fallbacks", amount=forced_count)
+        return minimized_count
+
     def restore_process_windows(self, pid: int) -> bool:
         """恢复指定进程的所有窗口"""
-        if not WIN32_AVAILABLE:
+        if not self.windows_available:
             print("警告: 无法恢复窗口，缺少win32api支持")
             return False
 
@@ -176,7 +292,7 @@ class ProcessManager:
             for window in windows:
                 if window['is_minimized']:
                     try:
-                        win32gui.ShowWindow(window['hwnd'], win32con.SW_RESTORE)
+                        self.window_backend.restore(window['hwnd'])
                         restored_count += 1
                         print(f"已恢复窗口: {window['title']}")
                     except Exception as e:
@@ -227,6 +343,9 @@ class ProcessManager:
             'last_minimize_time': None
         }
 
+        # 预先建立窗口句柄索引，守护触发时不必再枚举窗口
+        self.refresh_window_index([pid])
+
         print(f"已添加监控进程: {name} (PID: {pid})")
         return True
 
@@ -234,6 +353,8 @@ class ProcessManager:
         """移除监控的进程"""
         if pid in self.monitored_processes:
             process_info = self.monitored_processes.pop(pid)
+            with self.window_index_lock:
+                self.window_index.pop(pid, None)
             print(f"已移除监控进程: {process_info['name']} (PID: {pid})")
             return True
         return False
@@ -251,17 +372,117 @@ class ProcessManager:
 
         return self.monitored_processes.copy()
 
+    def set_guard_target(self, target: GuardTarget):
+        """设置守护目标并在后台跟踪匹配的进程（替换之前的目标）
+
+        第一次扫描也在后台线程中进行，匹配结果通过 on_monitored_change 通知。
+        """
+        watcher = ProcessWatcher(target)
+        # 回调绑定到自己的扫描器：旧扫描器正在进行的扫描完成后不会覆盖新目标的监控列表
+        watcher.on_change = lambda matched: self.sync_monitored_processes(matched, watcher)
+
+        self.clear_guard_target()
+        with self.guard_target_lock:
+            self.guard_target = target
+            self.process_watcher = watcher
+        watcher.start()
+
+    def clear_guard_target(self):
+        """清除守护目标，停止跟踪并移除所有监控进程"""
+        with self.guard_target_lock:
+            if self.process_watcher:
+                self.process_watcher.stop()
+            self.process_watcher = None
+            self.guard_target = None
+            self.monitored_processes = {}
+            with self.window_index_lock:
+                self.window_index.clear()
+
+    def sync_monitored_processes(self, matched: Dict[int, Dict], watcher: Optional[ProcessWatcher] = None):
+        """用守护目标当前匹配的进程替换监控列表（PID相同但创建时间不同视为新进程）
+
+        watcher 为发出结果的扫描器，已不是当前扫描器时（目标已切换或清除）忽略结果。
+        """
+        with self.guard_target_lock:
+            if watcher is not None and watcher is not self.process_watcher:
+                return
+            added, removed = self._replace_monitored_processes(matched)
+
+        if added:
+            # 新匹配的进程一起建立窗口索引，只需枚举一次窗口
+            self.refresh_window_index(added)
+        monitored_count = len(self.monitored_processes)
+        print(f"守护目标进程更新: 共 {monitored_count} 个（新增 {len(added)}，移除 {len(removed)}）")
+
+        if self.on_monitored_change:
+            self.on_monitored_change(monitored_count)
+
+    def _replace_monitored_processes(self, matched: Dict[int, Dict]):
+        """整体替换监控列表，返回 (新增的PID, 移除的PID)"""
+        old = self.monitored_processes
+        monitored = {}
+        added = []
+
+        for pid, info in matched.items():
+            process_info = old.get(pid)
+            if process_info is None or process_info.get('create_time') != info['create_time']:
+                process_info = {
+                    'pid': pid,
+                    'name': info['name'],
+                    'create_time': info['create_time'],
+                    'added_time': time.time(),
+                    'minimize_count': 0,
+                    'last_minimize_time': None
+                }
+                added.append(pid)
+            monitored[pid] = process_info
+
+        removed = [pid for pid in old if pid not in monitored]
+        # 整体替换，其他线程遍历时不会遇到字典在迭代中被修改
+        self.monitored_processes = monitored
+        with self.window_index_lock:
+            for pid in removed + added:
+                self.window_index.pop(pid, None)
+        return added, removed
+
     def minimize_monitored_processes(self) -> int:
-        """最小化所有监控的进程"""
+        """最小化所有监控的进程，返回最小化了窗口的进程数
+
+        使用窗口句柄索引覆盖整个进程集合；索引缺失或有句柄失效时，
+        为所有进程统一重建一次索引（最多枚举一次窗口）。
+        """
+        if not self.windows_available:
+            print("警告: 无法最小化窗口，缺少win32api支持")
+            return 0
+
+        monitored = self.monitored_processes
+        pids = list(monitored)
+        if not pids:
+            return 0
+
+        with self.window_index_lock:
+            index = {pid: list(self.window_index[pid]) for pid in pids if pid in self.window_index}
+
+        backend = self.window_backend
+        if len(index) < len(pids) or not all(
+                backend.is_window_of(hwnd, pid) for pid, handles in index.items() for hwnd in handles):
+            self.perf_monitor.increment("window_index_rebuilds")
+            index = self.refresh_window_index(pids)
+
+        handles = [hwnd for pid in pids for hwnd in index.get(pid, [])]
+        if not handles:
+            print("未找到守护目标进程的可见窗口")
+            return 0
+
+        print(f"找到 {len(pids)} 个进程的 {len(handles)} 个窗口，准备最小化...")
         minimized_count = 0
         current_time = time.time()
-
-        for pid, process_info in self.monitored_processes.items():
-            if self.is_process_running(pid):
-                if self.minimize_process_windows(pid):
-                    process_info['minimize_count'] += 1
-                    process_info['last_minimize_time'] = current_time
-                    minimized_count += 1
+        for pid in pids:
+            if self._minimize_handles(index.get(pid, [])) > 0:
+                process_info = monitored[pid]
+                process_info['minimize_count'] += 1
+                process_info['last_minimize_time'] = current_time
+                minimized_count += 1
 
         return minimized_count
 
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+守护目标进程跟踪模块
+守护目标可以是单个进程、进程树（浏览器、Electron应用等的窗口常在子进程中）
+或按进程名匹配的一组进程。后台线程定期扫描进程，以 (pid, create_time) 标识进程，
+发现新子进程、已退出的进程以及目标进程重启后的新进程。
+"""
+
+import fnmatch
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+import psutil
+from config import *
+from performance_monitor import perf_monitor
+from process_list import process_key
+
+ProcessKey = Tuple[int, float]
+
+
+class GuardTarget:
+    """守护目标描述"""
+
+    def __init__(self, mode: str, pid: Optional[int] = None, name: str = "",
+                 create_time: Optional[float] = None, pattern: str = ""):
+        """
+        mode: GUARD_TARGET_MODES 中的键（PROCESS / TREE / NAME）
+        pid, name, create_time: 选中的根进程（PROCESS / TREE 模式）
+        pattern: 进程名通配符（NAME 模式，不区分大小写，默认为进程名本身）
+        """
+        if mode not in GUARD_TARGET_MODES:
+            raise ValueError(f"未知的守护目标模式: {mode}")
+        self.mode = mode
+        self.pid = pid
+        self.name = name
+        self.create_time = create_time
+        self.pattern = (pattern or name).lower()
+
+    def matches_name(self, name: str) -> bool:
+        """进程名是否匹配（NAME 模式）"""
+        return bool(name) and fnmatch.fnmatchcase(name.lower(), self.pattern)
+
+    def describe(self) -> str:
+        """界面上显示的目标描述"""
+        if self.mode == "NAME":
+            return f"同名进程: {self.pattern}"
+        if self.mode == "TREE":
+            return f"{self.name}（含子进程）\nPID: {self.pid}"
+        return f"{self.name}\nPID: {self.pid}"
+
+
+class ProcessWatcher:
+    """跟踪与守护目标匹配的进程集合"""
+
+    def __init__(self, target: GuardTarget,
+                 on_change: Optional[Callable[[Dict[int, Dict]], None]] = None,
+                 interval: float = PROCESS_WATCH_INTERVAL):
+        """
+        on_change: 匹配的进程集合发生变化时回调 {pid: 进程信息}（在扫描线程中调用）
+        """
+        self.target = target
+        self.on_change = on_change
+        self.interval = interval
+        self.process_cache: Dict[ProcessKey, Dict] = {}  # 进程名和父进程只在第一次见到该进程时读取
+        self.matched: Dict[int, Dict] = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.perf_monitor = perf_monitor
+
+    def start(self):
+        """启动后台扫描线程（启动后立即扫描一次，调用方不必等待）"""
+        if self.thread is not None:
+            return
+
+        def watch_loop():
+            while not self.stop_event.is_set():
+                self.scan()
+                self.stop_event.wait(self.interval)
+
+        self.thread = threading.Thread(target=watch_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止后台扫描（正在进行的扫描会完成，回调方需要自行忽略过期的结果）"""
+        self.stop_event.set()
+
+    def scan(self) -> Dict[int, Dict]:
+        """扫描一次进程，返回当前匹配的进程 {pid: 进程信息}"""
+        with self.lock:
+            with self.perf_monitor.measure("process_watch"):
+                snapshot = self._snapshot()
+                matched = self._match(snapshot)
+
+            changed = {process_key(info) for info in matched.values()} != \
+                      {process_key(info) for info in self.matched.values()}
+            self.matched = matched
+
+        if changed and self.on_change:
+            try:
+                self.on_change(dict(matched))
+            except Exception as e:
+                print(f"守护目标更新回调错误: {e}")
+        return dict(matched)
+
+    def _snapshot(self) -> Dict[ProcessKey, Dict]:
+        """遍历进程（psutil 会复用上次的 Process 对象，create_time 只读取一次）"""
+        snapshot = {}
+        for proc in psutil.process_iter():
+            try:
+                key = (proc.pid, proc.create_time())
+                info = self.process_cache.get(key)
+                if info is None:
+                    info = {'pid': proc.pid, 'name': proc.name(), 'ppid': proc.ppid(), 'create_time': key[1]}
+                snapshot[key] = info
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+
+        self.process_cache = snapshot
+        return snapshot
+
+    def _match(self, snapshot: Dict[ProcessKey, Dict]) -> Dict[int, Dict]:
+        """根据守护目标从进程快照中选出匹配的进程"""
+        target = self.target
+        if target.mode == "NAME":
+            return {info['pid']: info for info in snapshot.values() if target.matches_name(info['name'])}
+
+        if target.create_time is None:
+            # 进程列表没有提供创建时间时，以第一次扫描到的进程为准
+            for info in snapshot.values():
+                if info['pid'] == target.pid:
+                    target.create_time = info['create_time']
+                    break
+
+        if (target.pid, target.create_time) not in snapshot:
+            self._follow_restart(snapshot)
+
+        root = snapshot.get((target.pid, target.create_time))
+        matched = {root['pid']: root} if root else {}
+        if target.mode == "TREE":
+            # 根进程退出后，仍在运行的子进程继续守护
+            for info in self._descendants(snapshot, target.pid, target.create_time or 0.0):
+                matched[info['pid']] = info
+        return matched
+
+    def _follow_restart(self, snapshot: Dict[ProcessKey, Dict]):
+        """目标进程已退出时，查找之后启动的同名进程作为新目标"""
+        target = self.target
+        name = target.name.lower()
+        same_name = {info['pid']: info for info in snapshot.values() if info['name'].lower() == name}
+        # 原进程遗留的子进程不是重启后的新进程
+        orphans = {process_key(info) for info in self._descendants(snapshot, target.pid, target.create_time or 0.0)}
+
+        candidates = [
+            info for info in same_name.values()
+            if info['create_time'] >= (target.create_time or 0.0)
+            and info['ppid'] not in same_name  # 只取最上层的进程，同名子进程随进程树一起守护
+            and process_key(info) not in orphans
+        ]
+        if not candidates:
+            return
+
+        new_root = min(candidates, key=lambda info: info['create_time'])
+        print(f"守护目标进程已重启: {target.name} (PID: {target.pid} -> {new_root['pid']})")
+        self.perf_monitor.increment("guard_target_restarts")
+        target.pid = new_root['pid']
+        target.create_time = new_root['create_time']
+
+    @staticmethod
+    def _descendants(snapshot: Dict[ProcessKey, Dict], pid: int, create_time: float) -> List[Dict]:
+        """根据父进程关系找出所有子孙进程（子进程不会早于父进程创建，用于排除PID复用）"""
+        children: Dict[int, List[Dict]] = {}
+        for info in snapshot.values():
+            children.setdefault(info['ppid'], []).append(info)
+
+        result = []
+        stack = [(pid, create_time)]
+        visited = set()
+        while stack:
+            parent_pid, parent_time = stack.pop()
+            for info in children.get(parent_pid, []):
+                key = process_key(info)
+                if key in visited or info['pid'] == parent_pid or info['create_time'] < parent_time:
+                    continue
+                visited.add(key)
+                result.append(info)
+                stack.append(key)
+        return result
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+感兴趣区域（ROI）跟踪模块
+检测到人之后只在其周围的局部区域内运行检测器，定期或目标丢失时回退到全画面检测
+"""
+
+import numpy as np
+from typing import List, Optional, Tuple
+from config import *
+from detection import Detection, detections_to_array
+from frame_pyramid import FramePyramid
+from pose_processing import LANDMARK_X, LANDMARK_Y
+
+
+class RegionOfInterest:
+    """画面中的矩形区域，坐标为归一化值，且与像素边界对齐"""
+
+    __slots__ = ('x', 'y', 'width', 'height', 'pixel_box')
+
+    def __init__(self, pixel_box: Tuple[int, int, int, int], frame_width: int, frame_height: int):
+        x1, y1, x2, y2 = pixel_box
+        self.pixel_box = pixel_box
+        self.x = x1 / frame_width
+        self.y = y1 / frame_height
+        self.width = (x2 - x1) / frame_width
+        self.height = (y2 - y1) / frame_height
+
+    @property
+    def area(self) -> float:
+        """区域面积占整个画面的比例"""
+        return self.width * self.height
+
+    def crop(self, frame):
+        """裁剪出区域内的画面（视图，不复制）；传入 FramePyramid 时返回共享整帧缓存的 FramePyramid"""
+        if isinstance(frame, FramePyramid):
+            return frame.crop(self.pixel_box)
+        x1, y1, x2, y2 = self.pixel_box
+        return frame[y1:y2, x1:x2]
+
+    def map_detections(self, detections: List[Detection]) -> List[Detection]:
+        """将相对裁剪画面的检测结果换算回整个画面的归一化坐标"""
+        return [
+            detection.replace(
+                x=self.x + detection.x * self.width,
+                y=self.y + detection.y * self.height,
+                width=detection.width * self.width,
+                height=detection.height * self.height
+            )
+            for detection in detections
+        ]
+
+    def map_landmark_array(self, landmark_array: np.ndarray) -> np.ndarray:
+        """将相对裁剪画面的姿态关键点数组换算回整个画面的归一化坐标"""
+        mapped = landmark_array.copy()
+        mapped[:, LANDMARK_X] = self.x + landmark_array[:, LANDMARK_X] * self.width
+        mapped[:, LANDMARK_Y] = self.y + landmark_array[:, LANDMARK_Y] * self.height
+        return mapped
+
+
+def region_around(detections: List[Detection], frame_width: int, frame_height: int,
+                  padding: float = ROI_PADDING, min_size: float = ROI_MIN_SIZE) -> Optional[RegionOfInterest]:
+    """计算包含所有检测框并向外扩展的区域，padding 为相对检测框尺寸的扩展比例"""
+    if not detections:
+        return None
+
+    boxes = detections_to_array(detections)
+    x1 = boxes[:, 0] - boxes[:, 2] * padding
+    y1 = boxes[:, 1] - boxes[:, 3] * padding
+    x2 = boxes[:, 0] + boxes[:, 2] * (1 + padding)
+    y2 = boxes[:, 1] + boxes[:, 3] * (1 + padding)
+    left, top, right, bottom = x1.min(), y1.min(), x2.max(), y2.max()
+
+    # 区域太小时检测器缺少上下文，按中心扩展到最小尺寸
+    center_x, center_y = (left + right) / 2, (top + bottom) / 2
+    half_width = max(right - left, min_size) / 2
+    half_height = max(bottom - top, min_size) / 2
+
+    pixel_box = (
+        int(np.clip(center_x - half_width, 0, 1) * frame_width),
+        int(np.clip(center_y - half_height, 0, 1) * frame_height),
+        int(np.ceil(np.clip(center_x + half_width, 0, 1) * frame_width)),
+        int(np.ceil(np.clip(center_y + half_height, 0, 1) * frame_height)),
+    )
+    if pixel_box[2] <= pixel_box[0] or pixel_box[3] <= pixel_box[1]:
+        return None
+
+    return RegionOfInterest(pixel_box, frame_width, frame_height)
+
+
+class RoiScheduler:
+    """决定每次检测使用局部区域还是全画面"""
+
+    def __init__(self, full_scan_interval: int = ROI_FULL_SCAN_INTERVAL,
+                 max_area: float = ROI_MAX_AREA):
+        self.full_scan_interval = full_scan_interval
+        self.max_area = max_area
+        self.ticks_since_full_scan = 0
+        self.target_lost = True
+
+    def select_region(self, tracked: List[Detection], frame_width: int,
+                      frame_height: int) -> Optional[RegionOfInterest]:
+        """返回本次检测使用的区域，None 表示全画面检测"""
+        region = None
+        if not self.target_lost and tracked and self.ticks_since_full_scan < self.full_scan_interval:
+            region = region_around(tracked, frame_width, frame_height)
+            # 区域接近整个画面时裁剪没有意义
+            if region is not None and region.area > self.max_area:
+                region = None
+
+        if region is None:
+            self.ticks_since_full_scan = 0
+        else:
+            self.ticks_since_full_scan += 1
+        return region
+
+    def report(self, found: bool):
+        """报告本次检测结果，目标丢失时下一次回退到全画面"""
+        self.target_lost = not found
+
+    def reset(self):
+        """重置状态，下一次检测使用全画面"""
+        self.ticks_since_full_scan = 0
+        self.target_lost = True
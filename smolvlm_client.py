@@ -6,8 +6,10 @@ SmolVLM API 客户端模块
 import requests
 import base64
 import json
+import re
 from typing import Optional
 from config import *
+from performance_monitor import perf_monitor
 
 
 class SmolVLMClient:
@@ -18,6 +20,7 @@ class SmolVLMClient:
         self.endpoint = SMOLVLM_ENDPOINT
         self.session = requests.Session()
         self.debug_callback = None  # 调试信息回调函数
+        self.perf_monitor = perf_monitor
 
     def set_debug_callback(self, callback):
         """设置调试信息回调函数"""
@@ -41,8 +44,14 @@ class SmolVLMClient:
             return (CAMERA_WIDTH, CAMERA_HEIGHT)  # 返回默认尺寸
 
     def send_chat_completion_request(self, instruction: str, image_base64_url: str,
-                                   max_tokens: int = 600) -> Optional[str]:
-        """发送聊天完成请求到SmolVLM API"""
+                                   max_tokens: int = 600,
+                                   user_text: str = "Detect human activity.",
+                                   return_errors: bool = True) -> Optional[str]:
+        """发送聊天完成请求到SmolVLM API
+
+        请求失败时返回错误描述文本；return_errors 为 False 时改为返回 None，
+        便于需要解析模型回答的调用方区分错误和真实的回答。
+        """
         try:
             url = f"{self.base_url}{self.endpoint}"
 
@@ -76,7 +85,7 @@ class SmolVLMClient:
                     {   # 真正的任务
                         "role": "user",
                         "content": [
-                            {"type": "text", "text": "Detect human activity."},
+                            {"type": "text", "text": user_text},
                             {
                                 "type": "image_url",
                                 "image_url": {"url": image_base64_url}
@@ -90,18 +99,21 @@ class SmolVLMClient:
                 "Content-Type": "application/json"
             }
 
-            response = self.session.post(url, json=payload, headers=headers, timeout=30)
+            self.perf_monitor.increment("vlm_requests")
+            with self.perf_monitor.measure("smolvlm"):
+                response = self.session.post(url, json=payload, headers=headers, timeout=30)
 
             if not response.ok:
                 error_text = response.text
                 print(f"SmolVLM API 错误: {response.status_code} - {error_text}")
+                self.perf_monitor.increment("errors", labels={'component': 'smolvlm'})
                 error_response = f"服务器错误: {response.status_code} - {error_text}"
 
                 # 记录调试信息
                 if self.debug_callback:
                     self.debug_callback(instruction, error_response)
 
-                return error_response
+                return error_response if return_errors else None
 
             data = response.json()
 
@@ -115,44 +127,50 @@ class SmolVLMClient:
                 return response_content
             else:
                 print("SmolVLM API 响应格式错误")
+                self.perf_monitor.increment("errors", labels={'component': 'smolvlm'})
                 error_response = "API响应格式错误"
 
                 # 记录调试信息
                 if self.debug_callback:
                     self.debug_callback(instruction, error_response)
 
-                return error_response
+                return error_response if return_errors else None
 
         except requests.exceptions.Timeout:
             print("SmolVLM API 请求超时")
+            self.perf_monitor.increment("timeouts", labels={'component': 'smolvlm'})
             error_response = "请求超时"
             if self.debug_callback:
                 self.debug_callback(instruction, error_response)
-            return error_response
+            return error_response if return_errors else None
         except requests.exceptions.ConnectionError:
             print("无法连接到SmolVLM API")
+            self.perf_monitor.increment("errors", labels={'component': 'smolvlm'})
             error_response = "连接错误"
             if self.debug_callback:
                 self.debug_callback(instruction, error_response)
-            return error_response
+            return error_response if return_errors else None
         except requests.exceptions.RequestException as e:
             print(f"SmolVLM API 请求异常: {e}")
+            self.perf_monitor.increment("errors", labels={'component': 'smolvlm'})
             error_response = f"请求异常: {e}"
             if self.debug_callback:
                 self.debug_callback(instruction, error_response)
-            return error_response
+            return error_response if return_errors else None
         except json.JSONDecodeError as e:
             print(f"SmolVLM API 响应JSON解析错误: {e}")
+            self.perf_monitor.increment("errors", labels={'component': 'smolvlm'})
             error_response = "响应解析错误"
             if self.debug_callback:
                 self.debug_callback(instruction, error_response)
-            return error_response
+            return error_response if return_errors else None
         except Exception as e:
             print(f"SmolVLM API 未知错误: {e}")
+            self.perf_monitor.increment("errors", labels={'component': 'smolvlm'})
             error_response = f"未知错误: {e}"
             if self.debug_callback:
                 self.debug_callback(instruction, error_response)
-            return error_response
+            return error_response if return_errors else None
 
     def detect_human_activity(self, image_base64_url: str, image_width: int = None, image_height: int = None) -> Optional[str]:
         """使用SmolVLM检测人类活动"""
@@ -172,6 +190,35 @@ class SmolVLMClient:
             image_base64_url
         )
 
+    def confirm_human(self, image_base64_url: str) -> Optional[bool]:
+        """只询问图像中是否有人（用于确认候选区域），无法判断时返回None"""
+        response = self.send_chat_completion_request(
+            HUMAN_CONFIRMATION_PROMPT,
+            image_base64_url,
+            max_tokens=CASCADE_CONFIRM_MAX_TOKENS,
+            user_text="Is there a human?",
+            return_errors=False  # 错误文本（如服务器返回的错误页面）中的 yes/no 不能当作回答
+        )
+        return self.parse_confirmation(response)
+
+    @staticmethod
+    def parse_confirmation(response: Optional[str]) -> Optional[bool]:
+        """解析确认请求的回答：优先读取 JSON 中的 human 字段，否则查找 yes/no"""
+        if not response:
+            return None
+
+        try:
+            data = json.loads(response)
+            if isinstance(data, dict) and isinstance(data.get('human'), bool):
+                return data['human']
+        except (json.JSONDecodeError, TypeError):
+            pass
+
+        match = re.search(r'\b(true|yes|false|no)\b', response.lower())
+        if match is None:
+            return None
+        return match.group(1) in ('true', 'yes')
+
     def detect_faces(self, image_base64_url: str) -> Optional[str]:
         """使用SmolVLM检测人脸（保持向后兼容）"""
         return self.detect_human_activity(image_base64_url)
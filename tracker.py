@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+多目标跟踪模块
+使用匀速模型卡尔曼滤波维护每个人的检测框，在两次检测之间预测位置
+"""
+
+import threading
+import numpy as np
+from typing import List, Optional
+from config import *
+from box_geometry import similarity_matrix, greedy_assignment
+from detection import Detection, detections_to_array
+
+# 状态向量: [cx, cy, w, h, vx, vy, vw, vh]，坐标为归一化值
+STATE_SIZE = 8
+MEASUREMENT_SIZE = 4
+
+_MEASUREMENT_MATRIX = np.hstack([np.eye(MEASUREMENT_SIZE), np.zeros((MEASUREMENT_SIZE, MEASUREMENT_SIZE))])
+
+
+def _box_to_measurement(detection: Detection) -> np.ndarray:
+    """检测框 [x, y, w, h] 转换为观测向量 [cx, cy, w, h]"""
+    return np.array([detection.x + detection.width / 2, detection.y + detection.height / 2,
+                     detection.width, detection.height], dtype=np.float64)
+
+
+def _transition_matrix(dt: float) -> np.ndarray:
+    """匀速模型状态转移矩阵"""
+    transition = np.eye(STATE_SIZE)
+    transition[:MEASUREMENT_SIZE, MEASUREMENT_SIZE:] = np.eye(MEASUREMENT_SIZE) * dt
+    return transition
+
+
+def _process_noise(dt: float) -> np.ndarray:
+    """离散白噪声加速度模型的过程噪声"""
+    q = TRACKER_PROCESS_NOISE ** 2
+    noise = np.zeros((STATE_SIZE, STATE_SIZE))
+    position = np.arange(MEASUREMENT_SIZE)
+    velocity = position + MEASUREMENT_SIZE
+    noise[position, position] = q * dt ** 4 / 4
+    noise[position, velocity] = q * dt ** 3 / 2
+    noise[velocity, position] = q * dt ** 3 / 2
+    noise[velocity, velocity] = q * dt ** 2
+    return noise
+
+
+class Track:
+    """单个跟踪目标"""
+
+    __slots__ = ('track_id', 'state', 'covariance', 'last_update', 'hits', 'detection')
+
+    def __init__(self, track_id: int, detection: Detection, timestamp: float):
+        self.track_id = track_id
+        self.state = np.zeros(STATE_SIZE)
+        self.state[:MEASUREMENT_SIZE] = _box_to_measurement(detection)
+        self.covariance = np.diag(
+            [TRACKER_MEASUREMENT_NOISE ** 2] * MEASUREMENT_SIZE +
+            [TRACKER_INITIAL_VELOCITY_VARIANCE] * MEASUREMENT_SIZE
+        )
+        self.last_update = timestamp
+        self.hits = 1
+        self.detection = detection  # 最近一次匹配的检测结果，保留来源、置信度等信息
+
+    def predict(self, dt: float):
+        """卡尔曼预测步"""
+        if dt <= 0:
+            return
+        transition = _transition_matrix(dt)
+        self.state = transition @ self.state
+        self.covariance = transition @ self.covariance @ transition.T + _process_noise(dt)
+
+    def update(self, detection: Detection, timestamp: float):
+        """卡尔曼更新步"""
+        innovation = _box_to_measurement(detection) - _MEASUREMENT_MATRIX @ self.state
+        innovation_covariance = (_MEASUREMENT_MATRIX @ self.covariance @ _MEASUREMENT_MATRIX.T +
+                                 np.eye(MEASUREMENT_SIZE) * TRACKER_MEASUREMENT_NOISE ** 2)
+        gain = self.covariance @ _MEASUREMENT_MATRIX.T @ np.linalg.inv(innovation_covariance)
+
+        self.state = self.state + gain @ innovation
+        self.covariance = (np.eye(STATE_SIZE) - gain @ _MEASUREMENT_MATRIX) @ self.covariance
+        self.last_update = timestamp
+        self.hits += 1
+        self.detection = detection
+
+
+class MultiObjectTracker:
+    """多目标跟踪器，检测线程调用 update，显示线程调用 predict"""
+
+    def __init__(self, max_age: float = TRACKER_MAX_AGE, min_hits: int = TRACKER_MIN_HITS,
+                 match_threshold: float = SIMILARITY_THRESHOLD):
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.match_threshold = match_threshold
+        self.tracks: List[Track] = []
+        self.next_track_id = 1
+        self.last_timestamp: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def update(self, detections: List[Detection], timestamp: float) -> List[Detection]:
+        """用新的检测结果更新跟踪器，返回带跟踪ID的检测结果"""
+        with self.lock:
+            # 所有跟踪目标先预测到当前时刻
+            dt = 0.0 if self.last_timestamp is None else timestamp - self.last_timestamp
+            for track in self.tracks:
+                track.predict(dt)
+            self.last_timestamp = timestamp
+
+            # 预测框与检测框一次性全局匹配
+            matches = []
+            if self.tracks and detections:
+                similarities = similarity_matrix(self._track_boxes(), detections_to_array(detections), 1.0, 1.0)
+                matches = greedy_assignment(similarities, self.match_threshold)
+
+            matched_detections = set()
+            for track_index, detection_index in matches:
+                self.tracks[track_index].update(detections[detection_index], timestamp)
+                matched_detections.add(detection_index)
+
+            # 未匹配的检测创建新的跟踪目标
+            for index, detection in enumerate(detections):
+                if index not in matched_detections:
+                    self.tracks.append(Track(self.next_track_id, detection, timestamp))
+                    self.next_track_id += 1
+
+            # 超过最大存活时间未更新的目标被移除
+            self.tracks = [track for track in self.tracks if timestamp - track.last_update <= self.max_age]
+
+            return self._build_detections(self.tracks, 0.0)
+
+    def predict(self, timestamp: float) -> List[Detection]:
+        """返回各跟踪目标在指定时刻的预测位置（不修改跟踪器状态），供显示使用"""
+        with self.lock:
+            if not self.tracks or self.last_timestamp is None:
+                return []
+            # 目标只在检测更新时移除，检测间隔较长时预测框不会提前消失
+            dt = min(max(0.0, timestamp - self.last_timestamp), TRACKER_MAX_PREDICTION_TIME)
+            return self._build_detections(self.tracks, dt)
+
+    def reset(self):
+        """清除所有跟踪目标"""
+        with self.lock:
+            self.tracks = []
+            self.last_timestamp = None
+
+    def _track_boxes(self) -> np.ndarray:
+        """当前所有跟踪目标的 (N, 4) 检测框 [x, y, w, h]"""
+        states = np.array([track.state for track in self.tracks])
+        return self._states_to_boxes(states)
+
+    def _states_to_boxes(self, states: np.ndarray) -> np.ndarray:
+        """状态 [cx, cy, w, h, ...] 转换为检测框 [x, y, w, h]，宽高不小于0"""
+        sizes = np.clip(states[:, 2:4], 0, None)
+        return np.hstack([states[:, 0:2] - sizes / 2, sizes])
+
+    def _build_detections(self, tracks: List[Track], dt: float) -> List[Detection]:
+        """按匀速模型外推 dt 秒后生成检测结果"""
+        tracks = [track for track in tracks if track.hits >= self.min_hits]
+        if not tracks:
+            return []
+
+        states = np.array([track.state for track in tracks])
+        states[:, :MEASUREMENT_SIZE] += states[:, MEASUREMENT_SIZE:] * dt
+        boxes = self._states_to_boxes(states)
+
+        return [
+            track.detection.replace(x=x, y=y, width=width, height=height, track_id=track.track_id)
+            for track, (x, y, width, height) in zip(tracks, boxes.tolist())
+        ]
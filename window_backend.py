@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+窗口操作后端模块
+进程管理器通过后端接口枚举和操作窗口：Windows 下使用 pywin32，
+其他平台（或测试时）可以使用内存中的模拟后端
+"""
+
+import ctypes
+import itertools
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import win32gui
+    import win32con
+    import win32process
+    WIN32_AVAILABLE = True
+except ImportError:
+    print("警告: pywin32 未安装，进程窗口管理功能将受限")
+    WIN32_AVAILABLE = False
+
+
+class WindowBackend(ABC):
+    """窗口后端接口，窗口句柄对调用方是不透明的值"""
+
+    available = False
+
+    def enum_windows(self) -> List[Tuple[int, int, str]]:
+        """一次枚举所有可见且有标题的顶层窗口，返回 [(hwnd, pid, title)]"""
+        return []
+
+    def is_window_of(self, hwnd: int, pid: int) -> bool:
+        """句柄是否仍是该进程的可见窗口（窗口关闭或句柄被复用时返回False）"""
+        return False
+
+    def get_title(self, hwnd: int) -> str:
+        """窗口标题"""
+        return ""
+
+    def is_minimized(self, hwnd: int) -> bool:
+        """窗口是否已最小化"""
+        return False
+
+    def is_maximized(self, hwnd: int) -> bool:
+        """窗口是否最大化"""
+        return False
+
+    @abstractmethod
+    def minimize(self, hwnd: int):
+        """最小化窗口，失败时抛出异常"""
+
+    def minimize_async(self, hwnd: int):
+        """发出最小化请求后立即返回，不等待窗口处理（默认同步最小化）"""
+        self.minimize(hwnd)
+
+    def force_minimize(self, hwnd: int):
+        """强制最小化窗口（窗口所属线程无响应时也有效），失败时抛出异常"""
+        self.minimize(hwnd)
+
+    @abstractmethod
+    def restore(self, hwnd: int):
+        """恢复窗口，失败时抛出异常"""
+
+
+class Win32WindowBackend(WindowBackend):
+    """基于 pywin32 的窗口后端"""
+
+    available = WIN32_AVAILABLE
+
+    def enum_windows(self) -> List[Tuple[int, int, str]]:
+        windows = []
+
+        def enum_windows_callback(hwnd, windows):
+            if win32gui.IsWindowVisible(hwnd):
+                window_title = win32gui.GetWindowText(hwnd)
+                if window_title.strip():  # 只考虑有标题的窗口
+                    _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
+                    windows.append((hwnd, window_pid, window_title))
+            return True
+
+        win32gui.EnumWindows(enum_windows_callback, windows)
+        return windows
+
+    def is_window_of(self, hwnd: int, pid: int) -> bool:
+        try:
+            if not win32gui.IsWindow(hwnd) or not win32gui.IsWindowVisible(hwnd):
+                return False
+            _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
+            return window_pid == pid
+        except Exception:
+            return False
+
+    def get_title(self, hwnd: int) -> str:
+        return win32gui.GetWindowText(hwnd)
+
+    def is_minimized(self, hwnd: int) -> bool:
+        return bool(win32gui.IsIconic(hwnd))
+
+    def is_maximized(self, hwnd: int) -> bool:
+        try:
+            # 使用 GetWindowPlacement 来检查窗口状态
+            placement = win32gui.GetWindowPlacement(hwnd)
+            # placement[1] 是 showCmd，SW_SHOWMAXIMIZED = 3
+            return placement[1] == win32con.SW_SHOWMAXIMIZED
+        except Exception as e:
+            print(f"检查窗口最大化状态错误: {e}")
+            return False
+
+    def minimize(self, hwnd: int):
+        # 直接最小化，不需要先切换前台窗口再等待
+        win32gui.ShowWindow(hwnd, win32con.SW_MINIMIZE)
+
+    def minimize_async(self, hwnd: int):
+        # ShowWindowAsync 只把请求投递给窗口所属线程，窗口无响应时也不会阻塞调用方
+        ctypes.windll.user32.ShowWindowAsync(hwnd, win32con.SW_MINIMIZE)
+
+    def force_minimize(self, hwnd: int):
+        win32gui.ShowWindow(hwnd, win32con.SW_FORCEMINIMIZE)
+
+    def restore(self, hwnd: int):
+        win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+
+
+class FakeWindowBackend(WindowBackend):
+    """内存中的模拟窗口后端，用于在非Windows平台上测试进程管理和守护流程"""
+
+    available = True
+
+    def __init__(self, minimize_delay: float = 0.0):
+        self.minimize_delay = minimize_delay  # 模拟窗口处理最小化请求的耗时（秒）
+        self.pending_minimize: Dict[int, float] = {}  # 异步最小化请求 {hwnd: 窗口处理完成的时间}
+        self.windows: Dict[int, Dict] = {}  # {hwnd: {'pid', 'title', 'visible', 'minimized', 'maximized', 'responsive'}}
+        self.enum_count = 0  # enum_windows 调用次数，用于验证缓存是否生效
+        self.handles = itertools.count(0x1000, 4)
+        self.lock = threading.Lock()
+
+    def add_window(self, pid: int, title: str, visible: bool = True,
+                   minimized: bool = False, maximized: bool = False, responsive: bool = True) -> int:
+        """添加一个模拟窗口，返回窗口句柄（responsive=False 的窗口忽略普通最小化，只响应强制最小化）"""
+        with self.lock:
+            hwnd = next(self.handles)
+            self.windows[hwnd] = {
+                'pid': pid, 'title': title, 'visible': visible,
+                'minimized': minimized, 'maximized': maximized, 'responsive': responsive
+            }
+            return hwnd
+
+    def close_window(self, hwnd: int):
+        """关闭模拟窗口，句柄随之失效"""
+        with self.lock:
+            self.windows.pop(hwnd, None)
+
+    def enum_windows(self) -> List[Tuple[int, int, str]]:
+        with self.lock:
+            self.enum_count += 1
+            return [
+                (hwnd, window['pid'], window['title'])
+                for hwnd, window in self.windows.items()
+                if window['visible'] and window['title'].strip()
+            ]
+
+    def is_window_of(self, hwnd: int, pid: int) -> bool:
+        with self.lock:
+            window = self.windows.get(hwnd)
+            return window is not None and window['visible'] and window['pid'] == pid
+
+    def _window(self, hwnd: int) -> Dict:
+        window = self.windows.get(hwnd)
+        if window is None:
+            raise OSError(f"无效的窗口句柄: {hwnd:#x}")
+
+        # 到时间的异步最小化请求视为已被窗口处理
+        done_time = self.pending_minimize.get(hwnd)
+        if done_time is not None and time.monotonic() >= done_time:
+            del self.pending_minimize[hwnd]
+            if window['responsive']:
+                window['minimized'] = True
+        return window
+
+    def get_title(self, hwnd: int) -> str:
+        with self.lock:
+            return self._window(hwnd)['title']
+
+    def is_minimized(self, hwnd: int) -> bool:
+        with self.lock:
+            return self._window(hwnd)['minimized']
+
+    def is_maximized(self, hwnd: int) -> bool:
+        with self.lock:
+            return self._window(hwnd)['maximized']
+
+    def minimize(self, hwnd: int):
+        if self.minimize_delay:
+            time.sleep(self.minimize_delay)
+        with self.lock:
+            window = self._window(hwnd)
+            if window['responsive']:
+                window['minimized'] = True
+
+    def minimize_async(self, hwnd: int):
+        with self.lock:
+            self._window(hwnd)
+            self.pending_minimize[hwnd] = time.monotonic() + self.minimize_delay
+
+    def force_minimize(self, hwnd: int):
+        with self.lock:
+            self._window(hwnd)['minimized'] = True
+
+    def restore(self, hwnd: int):
+        with self.lock:
+            self._window(hwnd)['minimized'] = False
+            self.pending_minimize.pop(hwnd, None)
+
+
+def create_window_backend() -> Optional[WindowBackend]:
+    """创建当前平台可用的窗口后端，不可用时返回None"""
+    if WIN32_AVAILABLE:
+        return Win32WindowBackend()
+    return None